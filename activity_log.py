@@ -0,0 +1,171 @@
+# activity_log.py
+"""Event-sourced EcoGamify user state: streaks, badges and redemptions.
+
+Every login, challenge completion and redemption is appended to the
+`activity` table. A user's state is never stored directly. It is the fold
+of apply() over their events, and a per-user snapshot is saved after every
+`snapshot_every` events:
+
+    state = fold(apply, events, initial=snapshot or new_state())
+
+so loading a user reads one snapshot row plus at most snapshot_every events,
+however long their history. States are also cached in memory, where a
+rerun only reads events newer than the cached one.
+
+The state is a few integers. Badges are a bitmask over BADGES plus one count
+per badge, so completing the daily challenge ten times is one bit and a 10,
+not ten list entries. Logins are unique per (user, day) in the table itself,
+so the daily bonus cannot be claimed twice from two tabs.
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LOGIN = "login"
+CHALLENGE = "challenge"
+REDEEM = "redeem"
+
+BADGES = ["Eco-Warrior", "Community Hero"]
+CHALLENGE_BADGES = {"daily": "Eco-Warrior", "weekly": "Community Hero"}
+
+
+def new_state():
+    return {"logins": 0, "streak": 0, "best_streak": 0, "last_day": 0,
+            "badges": 0, "badge_counts": [0] * len(BADGES), "redeemed": {}}
+
+
+def apply(state, kind, detail, day):
+    """Fold one event into state (in place); day is a date ordinal."""
+    if kind == LOGIN:
+        if day == state["last_day"]:
+            return state
+        state["streak"] = state["streak"] + 1 if day == state["last_day"] + 1 else 1
+        state["best_streak"] = max(state["best_streak"], state["streak"])
+        state["last_day"] = day
+        state["logins"] += 1
+    elif kind == CHALLENGE:
+        badge = CHALLENGE_BADGES.get(detail)
+        if badge is not None:
+            bit = BADGES.index(badge)
+            state["badges"] |= 1 << bit
+            state["badge_counts"][bit] += 1
+    elif kind == REDEEM:
+        state["redeemed"][detail] = state["redeemed"].get(detail, 0) + 1
+    return state
+
+
+def badge_list(state):
+    """[(badge, times earned)] for every badge the user holds."""
+    return [(name, state["badge_counts"][bit]) for bit, name in enumerate(BADGES) if state["badges"] >> bit & 1]
+
+
+def current_streak(state, today=None):
+    """The streak as of today: it only survives if the last login was today or yesterday."""
+    today = (today or datetime.date.today()).toordinal()
+    return state["streak"] if state["last_day"] >= today - 1 else 0
+
+
+class ActivityLog:
+    def __init__(self, path="ecogamify.db", snapshot_every=100, cache_size=10000):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()   # user -> [state, last event id, events since snapshot]
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS activity (
+                    id INTEGER PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    detail TEXT NOT NULL DEFAULT '',
+                    day INTEGER NOT NULL,
+                    ts REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS activity_user ON activity(user, id);
+                CREATE UNIQUE INDEX IF NOT EXISTS activity_one_login_per_day
+                    ON activity(user, day) WHERE kind = 'login';
+                CREATE TABLE IF NOT EXISTS activity_snapshots (
+                    user TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL,
+                    state TEXT NOT NULL
+                );
+            """)
+
+    def _conn(self):
+        # sqlite3 connections are per thread; Streamlit runs each session in its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def append(self, user, kind, detail="", ts=None):
+        """Append an event; returns True, or False if it was a repeat login for that day."""
+        ts = time.time() if ts is None else ts
+        day = datetime.date.fromtimestamp(ts).toordinal()
+        with self._conn() as conn:
+            cur = conn.execute("INSERT OR IGNORE INTO activity (user, kind, detail, day, ts) VALUES (?, ?, ?, ?, ?)",
+                               (user, kind, detail, day, ts))
+        return cur.rowcount == 1
+
+    def record_login(self, user, ts=None):
+        """Log today's login; True only for the first login of the day (across all sessions)."""
+        return self.append(user, LOGIN, ts=ts)
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def _tail(self, user, after_id):
+        return self._conn().execute(
+            "SELECT id, kind, detail, day FROM activity WHERE user = ? AND id > ? ORDER BY id", (user, after_id))
+
+    def rebuild(self, user, use_snapshot=True):
+        """(state, last event id, events replayed) straight from the database."""
+        state, last_id = new_state(), 0
+        if use_snapshot:
+            row = self._conn().execute(
+                "SELECT last_id, state FROM activity_snapshots WHERE user = ?", (user,)).fetchone()
+            if row is not None:
+                last_id, state = row[0], json.loads(row[1])
+        replayed = 0
+        for event_id, kind, detail, day in self._tail(user, last_id):
+            apply(state, kind, detail, day)
+            last_id = event_id
+            replayed += 1
+        return state, last_id, replayed
+
+    def state(self, user):
+        """Current state for user (a copy; safe to read after other sessions write)."""
+        with self._lock:
+            entry = self._cache.get(user)
+            if entry is None:
+                state, last_id, replayed = self.rebuild(user)
+                entry = self._cache[user] = [state, last_id, replayed]
+            else:
+                for event_id, kind, detail, day in self._tail(user, entry[1]):
+                    apply(entry[0], kind, detail, day)
+                    entry[1] = event_id
+                    entry[2] += 1
+            self._cache.move_to_end(user)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            if entry[2] >= self.snapshot_every:
+                self._save_snapshot(user, entry[0], entry[1])
+                entry[2] = 0
+            return json.loads(json.dumps(entry[0]))
+
+    def _save_snapshot(self, user, state, last_id):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO activity_snapshots (user, last_id, state) VALUES (?, ?, ?)",
+                         (user, last_id, json.dumps(state, separators=(",", ":"))))
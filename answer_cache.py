@@ -0,0 +1,180 @@
+# answer_cache.py
+"""Semantic answer cache for the Climate AI Tutor.
+
+Answers are keyed on (query embedding, age_group, language). A lookup returns
+a stored answer when the nearest cached question for the same age group and
+language has cosine similarity >= threshold, so near-identical questions from
+a classroom only reach the LLM once.
+
+Entries are bounded (LRU) and expire after a TTL; expiry pops from a queue
+kept in creation order, so a lookup only touches entries that expired. Empty
+answers are not stored. The cache persists to a single .npz file (vectors
+plus JSON metadata, in LRU order) and is reloaded on restart. store() and
+hits only mark the cache dirty; a background thread rewrites the file at
+most every save_interval seconds, outside the lookup lock, and on close().
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    def __init__(self, path, threshold=0.92, max_entries=2000, ttl_seconds=7 * 24 * 3600, save_interval=30.0):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()   # one writer of the file at a time
+        self._entries = OrderedDict()   # key -> entry dict, oldest access first
+        self._expiry = deque()          # (created, key), oldest first; keys may already be evicted
+        self._matrices = {}             # (age_group, language) -> (keys, normalized vectors)
+        self._next_key = 0
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self.saves = 0
+        self._load()
+        self._closed = threading.Event()
+        self._saver = threading.Thread(target=self._run, name="answer-cache-saver", daemon=True)
+        self._saver.start()
+        atexit.register(self.close)
+
+    # ---------------------------
+    # Lookup / store
+    # ---------------------------
+    def lookup(self, vector, age_group, language):
+        """Return the cached answer for a similar question, or None."""
+        t0 = time.perf_counter()
+        query = _normalize(vector)
+        with self._lock:
+            self._expire()
+            answer = None
+            keys, matrix = self._partition(age_group, language)
+            if keys:
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = keys[best]
+                    self._entries.move_to_end(key)
+                    self._dirty = True   # recency is saved too, so eviction survives a restart
+                    answer = self._entries[key]["answer"]
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.lookup_seconds += time.perf_counter() - t0
+        return answer
+
+    def store(self, vector, age_group, language, question, answer):
+        """Cache answer for question; empty or whitespace-only answers are ignored."""
+        if not answer or not answer.strip():
+            return
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            created = time.time()
+            self._entries[key] = {
+                "vector": _normalize(vector),
+                "age_group": age_group,
+                "language": language,
+                "question": question,
+                "answer": answer,
+                "created": created,
+            }
+            self._expiry.append((created, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrices.clear()
+            self._dirty = True
+
+    def flush(self):
+        """Write the cache to disk now if anything changed since the last save."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                # Entries are never mutated in place, so a shallow copy is a consistent snapshot
+                entries = list(self._entries.values())
+                self._dirty = False
+            self._save(entries)
+            self.saves += 1
+
+    def close(self):
+        if not self._closed.is_set():
+            self._closed.set()
+            self._saver.join()
+        self.flush()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_lookup_ms": 1000 * self.lookup_seconds / lookups if lookups else 0.0,
+        }
+
+    def _run(self):
+        while not self._closed.wait(self.save_interval):
+            self.flush()
+
+    # ---------------------------
+    # Internals (call with the lock held)
+    # ---------------------------
+    def _partition(self, age_group, language):
+        part = (age_group, language)
+        if part not in self._matrices:
+            keys = [k for k, e in self._entries.items()
+                    if e["age_group"] == age_group and e["language"] == language]
+            matrix = np.stack([self._entries[k]["vector"] for k in keys]) if keys else None
+            self._matrices[part] = (keys, matrix)
+        return self._matrices[part]
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = False
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, key = self._expiry.popleft()
+            if self._entries.pop(key, None) is not None:
+                expired = True
+        if expired:
+            self._matrices.clear()
+            self._dirty = True
+
+    def _save(self, entries):
+        # Called from flush() without the lookup lock: entries is a snapshot
+        vectors = np.stack([e["vector"] for e in entries]) if entries else np.zeros((0, 0), np.float32)
+        meta = [{f: e[f] for f in ("age_group", "language", "question", "answer", "created")} for e in entries]
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, vectors=vectors, meta=np.array(json.dumps(meta)))
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with np.load(self.path) as data:
+            vectors = data["vectors"]
+            meta = json.loads(str(data["meta"]))
+        for vector, entry in zip(vectors, meta):
+            entry["vector"] = vector
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+        # The file is in LRU order; expiry needs creation order
+        self._expiry.extend(sorted((e["created"], k) for k, e in self._entries.items()))
+        self._expire()
+
+
+def _normalize(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
@@ -1,10 +1,14 @@
 # awareness_hub.py
 
 import streamlit as st
-from groq import Groq
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from llm_client import LLMUnavailable, get_client
+from swr_cache import SWRCache
+
 # ---------------------------
 # 🔑 Load environment variables from .env
 # ---------------------------
@@ -16,8 +20,8 @@ if not GROQ_API_KEY:
     st.error("⚠️ Missing GROQ_API_KEY. Please create a .env file with GROQ_API_KEY=<your_key>")
     st.stop()
 
-# Initialize Groq client
-client = Groq(api_key=GROQ_API_KEY)
+# Shared, pooled Groq client (GROQ_BASE_URL can point at fake_llm_server.py for local testing)
+client = get_client()
 
 # ---------------------------
 # Streamlit Page Setup
@@ -27,46 +31,78 @@ st.set_page_config(page_title="📢 Awareness Hub", layout="wide")
 st.title("📢 Awareness Hub")
 st.write("Get climate news, tips, and campaign updates in one place — powered by AI 🌍")
 
+# ---------------------------
+# Content Prompts
+# ---------------------------
+PROMPTS = {
+    "🌍 Latest Climate News": "Give me the 3 most recent global climate news highlights with clear titles and short summaries.",
+    "🌱 Eco-Friendly Tips": "Share 5 practical eco-friendly lifestyle tips for individuals and households to reduce carbon footprint.",
+    "📢 Campaign Updates": "Summarize 3 ongoing climate action campaigns or movements worldwide, with a short call-to-action for each.",
+}
+
+REFRESH_SECONDS = float(os.getenv("AWARENESS_REFRESH_MINUTES", "30")) * 60
+
+
+def generate(option):
+    """One Groq call for an option's content."""
+    output = client.chat(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": "You are an expert climate journalist and sustainability advisor."},
+            {"role": "user", "content": PROMPTS[option]}
+        ],
+        temperature=0.7,
+        max_tokens=500
+    ).strip()
+    if not output:
+        raise ValueError("No response received from Groq API.")
+    return output
+
+
+# ---------------------------
+# Shared Content Cache + Background Refresher
+# ---------------------------
+# Content is regenerated per option on a schedule and served from a shared
+# stale-while-revalidate cache, so LLM calls scale with options x refreshes
+# rather than with users. Concurrent cold misses share one upstream call.
+@st.cache_resource
+def init_content_cache():
+    cache = SWRCache(ttl=2 * REFRESH_SECONDS, stale_ttl=24 * 3600)
+
+    def refresher():
+        while True:
+            for option in PROMPTS:
+                try:
+                    cache.refresh(option, lambda option=option: generate(option))
+                except Exception:
+                    pass  # keep serving the previous content; retry next cycle
+            time.sleep(REFRESH_SECONDS)
+
+    threading.Thread(target=refresher, name="awareness-refresher", daemon=True).start()
+    return cache
+
+content_cache = init_content_cache()
+
 # ---------------------------
 # User Options
 # ---------------------------
 option = st.selectbox(
     "What would you like to explore?",
-    ["🌍 Latest Climate News", "🌱 Eco-Friendly Tips", "📢 Campaign Updates"]
+    list(PROMPTS)
 )
 
 if st.button("Generate"):
-    with st.spinner("Fetching AI-powered insights..."):
-        try:
-            if option == "🌍 Latest Climate News":
-                prompt = "Give me the 3 most recent global climate news highlights with clear titles and short summaries."
-
-            elif option == "🌱 Eco-Friendly Tips":
-                prompt = "Share 5 practical eco-friendly lifestyle tips for individuals and households to reduce carbon footprint."
-
-            elif option == "📢 Campaign Updates":
-                prompt = "Summarize 3 ongoing climate action campaigns or movements worldwide, with a short call-to-action for each."
-
-            # ---------------------------
-            # Groq API Call
-            # ---------------------------
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are an expert climate journalist and sustainability advisor."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-
-            # Extract AI response safely
-            if response and response.choices:
-                output = response.choices[0].message.content.strip()
-                st.subheader(option)
-                st.write(output)
-            else:
-                st.error("⚠️ No response received from Groq API.")
-
-        except Exception as e:
-            st.error(f"⚠️ Error fetching data: {str(e)}")
+    try:
+        with st.spinner("Fetching AI-powered insights..."):  # only shown on a cold cache
+            output = content_cache.get(option, lambda: generate(option))
+
+        st.subheader(option)
+        st.write(output)
+        cached = content_cache.peek(option)
+        if cached:
+            st.caption(f"🕒 Updated {int(cached[1] // 60)} min ago · refreshed every {int(REFRESH_SECONDS // 60)} min")
+
+    except LLMUnavailable as e:
+        st.warning(e.user_message())
+    except Exception as e:
+        st.error(f"⚠️ Error fetching data: {str(e)}")
@@ -0,0 +1,81 @@
+# benchmarks/activity_log.py
+"""Load time of a long-history EcoGamify user: snapshot + tail vs. full replay.
+
+Run from the repo root:
+
+    python -m benchmarks.activity_log --years 3 --challenges-per-day 5
+
+Writes `years` of daily logins, challenge completions and occasional
+redemptions for one user, then times:
+
+- full replay: fold every event from the start (no snapshot)
+- snapshot + tail: what ActivityLog.state() does on a cold cache
+- warm rerun: state() with the user already cached
+
+and prints the size of the stored state.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from activity_log import CHALLENGE, LOGIN, REDEEM, ActivityLog, badge_list
+
+
+def timed(label, fn, repeat=20):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"  {label:<18} {(time.perf_counter() - t0) * 1000 / repeat:8.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--challenges-per-day", type=int, default=5)
+    parser.add_argument("--snapshot-every", type=int, default=100)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="activity_"), "activity.db")
+    log = ActivityLog(path, snapshot_every=args.snapshot_every)
+    rng = random.Random(0)
+    days = int(args.years * 365)
+    start = datetime.date.today() - datetime.timedelta(days=days)
+    rows = []
+    for d in range(days):
+        day = start + datetime.timedelta(days=d)
+        ts = time.mktime(day.timetuple()) + 9 * 3600
+        if rng.random() < 0.9:
+            rows.append(("veteran", LOGIN, "", day.toordinal(), ts))
+        for _ in range(rng.randint(0, args.challenges_per_day)):
+            rows.append(("veteran", CHALLENGE, rng.choice(["daily", "daily", "daily", "weekly"]),
+                         day.toordinal(), ts))
+        if rng.random() < 0.05:
+            rows.append(("veteran", REDEEM, "Eco Badge 🏅", day.toordinal(), ts))
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO activity (user, kind, detail, day, ts) VALUES (?, ?, ?, ?, ?)", rows)
+    print(f"{len(rows):,} events over {days:,} days")
+
+    state, _, replayed = timed("full replay", lambda: log.rebuild("veteran", use_snapshot=False))
+    print(f"{'':20}({replayed:,} events replayed)")
+    log.state("veteran")   # writes the first snapshot
+    # a few more days of activity after the snapshot
+    for _ in range(args.snapshot_every // 2):
+        log.append("veteran", CHALLENGE, "daily")
+    _, _, replayed = timed("snapshot + tail", lambda: log.rebuild("veteran"))
+    print(f"{'':20}({replayed:,} events replayed)")
+    timed("warm rerun", lambda: log.state("veteran"), repeat=1000)
+
+    state = log.state("veteran")
+    print(f"state: {len(json.dumps(state, separators=(',', ':')))} bytes as JSON")
+    print(f"badges: {badge_list(state)}, best streak {state['best_streak']}, logins {state['logins']:,}")
+
+
+if __name__ == "__main__":
+    main()
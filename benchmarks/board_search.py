@@ -0,0 +1,109 @@
+# benchmarks/board_search.py
+"""Indexing throughput and query latency of board_search at millions of posts.
+
+Run from the repo root:
+
+    python -m benchmarks.board_search --posts 2000000
+
+1. Fills a board with `posts` posts (a Zipf-like vocabulary plus hashtags)
+   and times the index catching up with them from the board, segments and
+   background merges included.
+2. Times keyword, hashtag, multi-term and prefix queries, and a linear scan
+   of the board for the same keyword, for comparison.
+3. Appends more posts to the live board and reports how long until they are
+   searchable (no rebuild), then restarts the index to show it resumes from
+   its segments.
+"""
+
+import argparse
+import itertools
+import random
+import resource
+import shutil
+import tempfile
+import time
+
+from board_search import BoardSearch, tokenize
+from community_board import CommunityBoard
+
+QUERIES = ["solar", "#zerowaste", "compost bus ocean", "sol*", "plastic* #ecowarrior", "word123"]
+
+
+def make_vocabulary(size=50_000):
+    """Words and their cumulative Zipf weights, for random.choices(cum_weights=...)."""
+    base = "climate tree cycle solar compost plastic bus reuse ocean plant energy water wind bike".split()
+    words = base + [f"word{i}" for i in range(size)]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return words, weights
+
+
+def fill(board, rng, words, weights, n):
+    for i in range(n):
+        text = " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(5, 25)))
+        if rng.random() < 0.3:
+            text += rng.choice([" #zerowaste", " #ecowarrior", " #solarpower", f" #tag{i % 500}"])
+        board.post(f"user{rng.randrange(100_000)}", text)
+    board.flush()
+
+
+def timed(label, fn, repeat=50):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"  {label:<26} {(time.perf_counter() - t0) * 1000 / repeat:8.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=2_000_000)
+    parser.add_argument("--live-posts", type=int, default=10_000)
+    parser.add_argument("--memtable-posts", type=int, default=20_000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="board_search_")
+    try:
+        rng = random.Random(0)
+        words, weights = make_vocabulary()
+        board = CommunityBoard(f"{root}/board", batch_size=4096)
+        t0 = time.perf_counter()
+        fill(board, rng, words, weights, args.posts)
+        print(f"board: {len(board):,} posts written in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        index = BoardSearch(board, f"{root}/index", memtable_posts=args.memtable_posts)
+        index.flush()
+        seconds = time.perf_counter() - t0
+        info = index.info()
+        print(f"indexed {info['posts']:,} posts in {seconds:.1f}s ({info['posts'] / seconds:,.0f} posts/s), "
+              f"{info['segments']} segments after {info['merges']} merges, {info['bytes'] / 2**20:,.1f} MB")
+
+        print("queries (top 20):")
+        for query in QUERIES:
+            timed(query, lambda: index.search(query, k=20))
+        t0 = time.perf_counter()
+        matches = sum("solar" in tokenize(p["text"]) for p in board.read_range(0, min(len(board), 200_000)))
+        scan = (time.perf_counter() - t0) * len(board) / min(len(board), 200_000)
+        print(f"  {'linear scan for solar':<26} {scan * 1000:8.0f} ms (extrapolated; {matches:,} hits in 200k)")
+
+        t0 = time.perf_counter()
+        fill(board, rng, words, weights, args.live_posts)
+        index.flush()
+        print(f"live: {args.live_posts:,} new posts searchable after {time.perf_counter() - t0:.2f}s")
+        assert index.info()["posts"] == len(board)
+        index.close()
+
+        t0 = time.perf_counter()
+        index = BoardSearch(board, f"{root}/index", memtable_posts=args.memtable_posts)
+        index.flush()
+        print(f"restart: resumed in {(time.perf_counter() - t0) * 1000:.0f} ms, "
+              f"{index.info()['indexed']:,} posts re-read from the board")
+        print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+        index.close()
+        board.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/chart_render.py
+"""Rerun cost and memory of the dashboard pie chart, before and after chart_cache.
+
+Run from the repo root:
+
+    python -m benchmarks.chart_render --reruns 2000 --distinct 20
+
+Simulates a long session: `reruns` page reruns cycling through `distinct`
+input combinations (users nudging a slider back and forth).
+
+- pyplot: the original page code, plt.subplots() + savefig, never closed
+- cached: ChartCache.png() on a standalone Figure
+
+Reports mean ms per rerun, open pyplot figures and RSS growth.
+"""
+
+import argparse
+import io
+import resource
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from chart_cache import ChartCache, chart_key
+from footprint_engine import compile_profile
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def breakdowns(distinct):
+    profile = compile_profile("climate_dashboard")
+    return [profile.breakdown(20 + i, 7 + i % 5, 300 + 10 * i, 10)[1] for i in range(distinct)]
+
+
+def pyplot_rerun(breakdown):
+    fig, ax = plt.subplots()
+    ax.pie(list(breakdown.values()), labels=list(breakdown), autopct="%1.1f%%", startangle=90)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")   # what st.pyplot does
+    return buf.getvalue()
+
+
+def cached_rerun(cache, breakdown):
+    def draw(fig):
+        ax = fig.subplots()
+        ax.pie(list(breakdown.values()), labels=list(breakdown), autopct="%1.1f%%", startangle=90)
+    return cache.png(chart_key("pie", breakdown), draw)[0]
+
+
+def run(name, rerun, inputs, reruns):
+    rss0 = rss_mb()
+    t0 = time.perf_counter()
+    for i in range(reruns):
+        rerun(inputs[i % len(inputs)])
+    ms = (time.perf_counter() - t0) * 1000 / reruns
+    print(f"{name:<8} {ms:>9.2f} ms/rerun   open figures {len(plt.get_fignums()):>5}   "
+          f"peak RSS +{rss_mb() - rss0:,.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=20)
+    args = parser.parse_args()
+
+    plt.rcParams["figure.max_open_warning"] = 0
+    inputs = breakdowns(args.distinct)
+    # cached first, so the pyplot leak does not inflate its RSS
+    cache = ChartCache(max_entries=256)
+    run("cached", lambda b: cached_rerun(cache, b), inputs, args.reruns)
+    print(f"         cache: {cache.stats()['entries']} entries, {cache.stats()['bytes'] / 1024:,.0f} KB")
+    run("pyplot", pyplot_rerun, inputs, args.reruns)
+
+
+if __name__ == "__main__":
+    main()
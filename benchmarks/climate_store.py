@@ -0,0 +1,85 @@
+# benchmarks/climate_store.py
+"""Write throughput and trend query latency for climate_store.
+
+Run from the repo root:
+
+    python -m benchmarks.climate_store --cities 20 --years 2 --interval-minutes 10
+
+Appends synthetic readings (a seasonal + daily temperature cycle with noise)
+for every city, flushes and compacts, then times the queries the Climate Hub
+runs: 24h / 7d / 30d downsampling, rolling means and a year of daily min/max.
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from climate_store import DAY_SECONDS, ClimateStore
+
+
+def synthetic(start, n, interval, seed):
+    rng = np.random.default_rng(seed)
+    ts = start + np.arange(n) * interval
+    temp = (15 + 10 * np.sin(2 * np.pi * ts / (365 * DAY_SECONDS))
+            + 5 * np.sin(2 * np.pi * ts / DAY_SECONDS) + rng.normal(0, 1.5, n))
+    return ts, temp, rng.uniform(20, 95, n), rng.gamma(2.0, 2.0, n)
+
+
+def timed(label, fn, repeat=20):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"  {label:<32} {(time.perf_counter() - t0) * 1000 / repeat:8.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--interval-minutes", type=float, default=10)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="climate_store_")
+    try:
+        store = ClimateStore(root, batch_size=args.batch_size, background=False)
+        interval = args.interval_minutes * 60
+        n = int(args.years * 365 * DAY_SECONDS / interval)
+        end = time.time()
+        start = end - n * interval
+
+        t0 = time.perf_counter()
+        for c in range(args.cities):
+            for row in zip(*synthetic(start, n, interval, c)):
+                store.append(f"City {c}", *(float(x) for x in row))
+        store.flush()
+        write_s = time.perf_counter() - t0
+        total = n * args.cities
+        print(f"appended {total:,} readings in {write_s:.1f}s ({total / write_s:,.0f}/s), "
+              f"{store.stats['segments']:,} segments")
+
+        t0 = time.perf_counter()
+        days = store.compact()
+        print(f"compacted {days:,} city-days in {time.perf_counter() - t0:.1f}s")
+
+        print("queries (City 0):")
+        timed("24h downsample (15 min)", lambda: store.downsample("City 0", end - DAY_SECONDS, end, 900))
+        timed("7d downsample (1 h)", lambda: store.downsample("City 0", end - 7 * DAY_SECONDS, end, 3600))
+        timed("30d downsample (6 h)", lambda: store.downsample("City 0", end - 30 * DAY_SECONDS, end, 6 * 3600))
+        timed("7d rolling mean (12 h window)",
+              lambda: store.rolling_mean("City 0", end - 7 * DAY_SECONDS, end, 12 * 3600))
+        timed("1y rolling mean (30 d window)",
+              lambda: store.rolling_mean("City 0", end - 365 * DAY_SECONDS, end, 30 * DAY_SECONDS))
+        timed("1y daily min/max", lambda: store.daily("City 0", end - 365 * DAY_SECONDS, end))
+        timed("full history weekly", lambda: store.downsample("City 0", start, end, 7 * DAY_SECONDS))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
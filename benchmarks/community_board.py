@@ -0,0 +1,85 @@
+# benchmarks/community_board.py
+"""Write throughput and page latency of community_board at 10M posts.
+
+Run from the repo root:
+
+    python -m benchmarks.community_board --posts 10000000 --threads 8
+
+1. `threads` writer sessions post concurrently until the board holds `posts`
+   posts; reports posts/s and the writer's batch sizes.
+2. Times the newest page, a page at a random cursor deep in the history and
+   the oldest page: each should cost the same, whatever the board's size.
+3. Reports peak RSS, which stays flat because no post is kept in memory.
+"""
+
+import argparse
+import random
+import resource
+import shutil
+import tempfile
+import threading
+import time
+
+from community_board import CommunityBoard
+
+WORDS = "climate tree cycle solar compost plastic bus reuse ocean plant energy water #zerowaste #ecowarrior".split()
+
+
+def timed(label, fn, repeat=2000):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    print(f"  {label:<24} {(time.perf_counter() - t0) * 1e6 / repeat:8.1f} µs/page")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="community_board_")
+    try:
+        board = CommunityBoard(root, batch_size=4096)
+        per_thread = args.posts // args.threads
+
+        def session(i):
+            rng = random.Random(i)
+            for n in range(per_thread):
+                board.post(f"user{rng.randrange(100_000)}",
+                           " ".join(rng.choices(WORDS, k=rng.randint(5, 25))) + f" #{n % 1000}")
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        board.flush()
+        seconds = time.perf_counter() - t0
+        total = len(board)
+        print(f"wrote {total:,} posts in {seconds:.1f}s ({total / seconds:,.0f} posts/s), "
+              f"{board.stats['batches']:,} batches, max {board.stats['max_batch']:,}")
+
+        rng = random.Random(0)
+        print(f"pages of {args.page_size}:")
+        timed("newest", lambda: board.page(limit=args.page_size))
+        timed("random deep cursor", lambda: board.page(before=rng.randrange(args.page_size, total),
+                                                       limit=args.page_size))
+        timed("oldest", lambda: board.page(before=args.page_size, limit=args.page_size))
+        # Walk 50 pages from the newest by cursor, as a user clicking "Older" would
+        cursor, walked = None, 0
+        t0 = time.perf_counter()
+        for _ in range(50):
+            posts, cursor = board.page(before=cursor, limit=args.page_size)
+            walked += len(posts)
+        print(f"  cursor walk: {walked} posts in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+        board.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# benchmarks/faiss_load.py
+"""Cold-start benchmark: pickled FAISS vectorstore vs. the faiss_store mmap format.
+
+Run from the repo root:
+
+    python -m benchmarks.faiss_load --chunks 120000 --workers 4
+
+Builds a synthetic corpus (random 384-d vectors, ~600 character chunks), writes
+it both as climate_faiss.pkl-style pickle and with faiss_store.save_vectorstore,
+then starts fresh interpreters that load each format and run one query.
+
+Reported per loader:
+  load_s    wall time from import to first query answered
+  rss_mb    resident set size after the query
+  anon_mb   private (heap) part of the RSS
+  file_mb   file-backed part of the RSS, shareable through the page cache
+  pss_mb    proportional share when --workers loaders are alive at once
+"""
+
+import argparse
+import json
+import os
+import pickle
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIM = 384
+WORDS = (
+    "carbon climate emissions warming ocean ice methane forest solar wind energy grid "
+    "policy adaptation drought flood heat coral glacier sea level renewable transport "
+    "diet waste recycling biodiversity agriculture soil water cities resilience"
+).split()
+
+
+# ---------------------------
+# Corpus
+# ---------------------------
+def build_corpus(n_chunks, workdir):
+    import faiss
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.embeddings import FakeEmbeddings
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    import faiss_store
+
+    rng = random.Random(0)
+    vectors = np.random.default_rng(0).standard_normal((n_chunks, DIM), dtype=np.float32)
+    index = faiss.IndexFlatL2(DIM)
+    index.add(vectors)
+
+    docs = {}
+    index_to_id = {}
+    for i in range(n_chunks):
+        _id = f"chunk-{i:08d}"
+        text = " ".join(rng.choice(WORDS) for _ in range(90))
+        docs[_id] = Document(page_content=text, metadata={"source": f"synthetic://{i // 40}"})
+        index_to_id[i] = _id
+    vectorstore = FAISS(FakeEmbeddings(size=DIM), index, InMemoryDocstore(docs), index_to_id)
+
+    pickle_path = os.path.join(workdir, "climate_faiss.pkl")
+    with open(pickle_path, "wb") as f:
+        pickle.dump(vectorstore, f)
+    index_dir = os.path.join(workdir, "climate_faiss")
+    faiss_store.save_vectorstore(vectorstore, index_dir)
+    return pickle_path, index_dir
+
+
+# ---------------------------
+# Child process: load + one query
+# ---------------------------
+def child(mode, path, hold):
+    t0 = time.perf_counter()
+    import numpy as np
+    from langchain_community.embeddings import FakeEmbeddings
+
+    if mode == "pickle":
+        with open(path, "rb") as f:
+            vectorstore = pickle.load(f)
+    else:
+        import faiss_store
+        vectorstore = faiss_store.load_vectorstore(path, FakeEmbeddings(size=DIM))
+
+    query = np.random.default_rng(1).standard_normal(DIM).astype("float32").tolist()
+    vectorstore.similarity_search_by_vector(query, k=3)
+    elapsed = time.perf_counter() - t0
+
+    status = _proc_kb("/proc/self/status", ("VmRSS", "RssAnon", "RssFile"))
+    print(json.dumps({
+        "load_s": elapsed,
+        "rss_mb": status["VmRSS"] / 1024,
+        "anon_mb": status["RssAnon"] / 1024,
+        "file_mb": status["RssFile"] / 1024,
+    }), flush=True)
+    if hold:
+        sys.stdin.read()  # stay resident until the parent has sampled PSS
+
+
+def _proc_kb(path, fields):
+    values = {}
+    with open(path) as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in fields:
+                values[name] = int(rest.split()[0])
+    return values
+
+
+# ---------------------------
+# Parent: spawn loaders and report
+# ---------------------------
+def run_loaders(mode, path, workers):
+    cmd = [sys.executable, "-m", "benchmarks.faiss_load", "--child", mode, path]
+    if workers > 1:
+        cmd.append("--hold")
+    procs = [subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    results = [json.loads(p.stdout.readline()) for p in procs]
+    for p, result in zip(procs, results):
+        result["pss_mb"] = _proc_kb(f"/proc/{p.pid}/smaps_rollup", ("Pss",))["Pss"] / 1024
+    for p in procs:
+        p.stdin.close()
+        p.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=120_000)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent loaders per format")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    parser.add_argument("--hold", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child, hold=args.hold)
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        t0 = time.perf_counter()
+        pickle_path, index_dir = build_corpus(args.chunks, workdir)
+        print(f"Built {args.chunks:,} synthetic chunks in {time.perf_counter() - t0:.1f}s")
+
+        print(f"{'loader':<8} {'load_s':>8} {'rss_mb':>8} {'anon_mb':>8} {'file_mb':>8} {'pss_mb':>8}")
+        for mode, path in (("pickle", pickle_path), ("mmap", index_dir)):
+            results = run_loaders(mode, path, args.workers)
+            row = {k: statistics.median(r[k] for r in results) for k in results[0]}
+            total_pss = sum(r["pss_mb"] for r in results)
+            print(f"{mode:<8} {row['load_s']:>8.2f} {row['rss_mb']:>8.0f} {row['anon_mb']:>8.0f} "
+                  f"{row['file_mb']:>8.0f} {row['pss_mb']:>8.0f}   (total PSS for {args.workers} workers: {total_pss:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/footprint_batch.py
+"""Throughput and memory benchmark for footprint_engine batch mode.
+
+Run from the repo root:
+
+    python -m benchmarks.footprint_batch --rows 1000000
+
+1. In-memory: rows/s of a per-row Python loop (carbon.py's original
+   calculate_footprint + footprint_tips logic) vs. footprint_engine.compute_columns
+   on NumPy arrays.
+2. Streaming: run_batch() over synthetic CSV files of increasing size in a fresh
+   process each, reporting rows/s and peak RSS. Peak RSS should stay flat as the
+   file grows, since only one chunk is resident at a time.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from footprint_engine import INPUT_COLUMNS, compute_columns
+
+
+def synthetic_inputs(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "km_driven": rng.gamma(2.0, 40.0, rows).round(1),
+        "flights": rng.poisson(2.0, rows).astype(np.float64),
+        "electricity": rng.gamma(3.0, 80.0, rows).round(1),
+        "meat_meals": rng.integers(0, 15, rows).astype(np.float64),
+    }
+
+
+def per_row(km_driven, flights, electricity, meat_meals):
+    """The original scalar code path, one person at a time."""
+    car = km_driven * 0.12 * 52
+    flight = flights * 250
+    elec = electricity * 0.5 * 12
+    diet = meat_meals * 7 * 2.5 * 52
+    tips = (km_driven > 50, flights > 2, electricity > 200, meat_meals > 5)
+    return car, flight, elec, diet, car + flight + elec + diet, tips, not any(tips)
+
+
+def bench_in_memory(rows):
+    data = synthetic_inputs(rows)
+    lists = [data[c].tolist() for c in INPUT_COLUMNS]
+
+    t0 = time.perf_counter()
+    for values in zip(*lists):
+        per_row(*values)
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    out = compute_columns(*(data[c] for c in INPUT_COLUMNS))
+    vec_s = time.perf_counter() - t0
+
+    # Same answers either way
+    sample = [per_row(*(lists[j][i] for j in range(4))) for i in range(1000)]
+    assert np.allclose(out["total_kg"][:1000], [s[4] for s in sample])
+    assert (out["tip_none"][:1000] == [s[6] for s in sample]).all()
+
+    print(f"in-memory, {rows:,} rows")
+    print(f"  per-row loop   {rows / loop_s:>14,.0f} rows/s")
+    print(f"  vectorized     {rows / vec_s:>14,.0f} rows/s   ({loop_s / vec_s:.0f}x)")
+
+
+def write_csv(path, rows, chunk=500_000):
+    import pandas as pd
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        pd.DataFrame(synthetic_inputs(n, seed=start)).to_csv(
+            path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def child(input_path, output_path, chunk_rows):
+    from footprint_engine import run_batch
+    rows, seconds = run_batch(input_path, output_path, chunk_rows)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"rows": rows, "seconds": seconds, "peak_rss_mb": peak_kb / 1024}))
+
+
+def bench_streaming(sizes, chunk_rows, fmt):
+    print(f"streaming CSV -> {fmt}, chunk {chunk_rows:,} rows")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            input_path = os.path.join(workdir, f"in_{rows}.csv")
+            output_path = os.path.join(workdir, f"out_{rows}.{fmt}")
+            write_csv(input_path, rows)
+            result = json.loads(subprocess.check_output([
+                sys.executable, "-m", "benchmarks.footprint_batch",
+                "--child", input_path, output_path, str(chunk_rows)]))
+            print(f"  {rows:>12,} rows  {result['rows'] / result['seconds']:>12,.0f} rows/s  "
+                  f"peak RSS {result['peak_rss_mb']:>7.0f} MB")
+            os.remove(input_path)
+            os.remove(output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows for the in-memory comparison")
+    parser.add_argument("--stream-sizes", default="500000,2000000,8000000")
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="parquet")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+    bench_in_memory(args.rows)
+    bench_streaming([int(s) for s in args.stream_sizes.split(",")], args.chunk_rows, args.format)
+
+
+if __name__ == "__main__":
+    main()
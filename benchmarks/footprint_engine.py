@@ -0,0 +1,51 @@
+# benchmarks/footprint_engine.py
+"""Micro-benchmarks for the shared footprint engine.
+
+Run from the repo root:
+
+    python -m benchmarks.footprint_engine
+
+Times a single-profile evaluation (the per-rerun cost of each page) and batch
+throughput. The golden parity cases live in tests/test_footprint_engine.py.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from footprint_engine import compile_profile
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(batch_sizes, repeat):
+    for name in ("carbon_tracker", "climate_dashboard"):
+        profile = compile_profile(name)
+        single = [10.0, 2.0, 300.0, 5.0]
+        calls = 10_000
+        t = timeit(lambda: [profile.breakdown(*single) for _ in range(calls)], repeat)
+        print(f"{name:<18} single profile   {1e6 * t / calls:>10.2f} us/call")
+        rng = np.random.default_rng(0)
+        for n in batch_sizes:
+            batch = rng.uniform(0, 100, size=(n, len(profile.coefficients)))
+            t = timeit(lambda: profile.evaluate(batch), repeat)
+            print(f"{name:<18} batch {n:>10,}  {n / t:>14,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", default="1000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    bench([int(n) for n in args.batch_sizes.split(",")], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
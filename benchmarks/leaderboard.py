@@ -0,0 +1,66 @@
+# benchmarks/leaderboard.py
+"""Leaderboard operations at 1M users: skip list vs. re-sorting a dict.
+
+Run from the repo root:
+
+    python -m benchmarks.leaderboard --users 1000000 --ops 100000
+
+1. Builds a Board with `users` players, then times score updates, top-10,
+   "my rank" and a +/-2 neighbour window on random users.
+2. Times the original approach, sorted() over the whole score dict, which
+   every rerun of the old leaderboard paid.
+3. Cross-checks top-100 and a sample of ranks against the sorted order.
+"""
+
+import argparse
+import random
+import time
+
+from leaderboard import Board
+
+
+def timed(label, fn, ops):
+    t0 = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    us = (time.perf_counter() - t0) * 1e6 / ops
+    print(f"  {label:<22} {us:10.2f} µs/op  ({1e6 / us:>10,.0f} ops/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    users = [f"user{i}" for i in range(args.users)]
+    board = Board(expected_size=args.users)
+
+    t0 = time.perf_counter()
+    for user in users:
+        board.add(user, rng.randint(1, 5000))
+    print(f"built board of {args.users:,} users in {time.perf_counter() - t0:.1f}s")
+
+    picks = [rng.choice(users) for _ in range(args.ops)]
+    print("skip list:")
+    timed("update (+points)", lambda i: board.add(picks[i], rng.randint(1, 100)), args.ops)
+    timed("top 10", lambda i: board.top(10), args.ops)
+    timed("my rank", lambda i: board.rank(picks[i]), args.ops)
+    timed("neighbours (+/-2)", lambda i: board.around(picks[i], 2), args.ops)
+
+    print("sorted() per rerun (old leaderboard):")
+    reruns = 5
+    t0 = time.perf_counter()
+    for _ in range(reruns):
+        ordered = sorted(board.scores.items(), key=lambda x: (-x[1], x[0]))
+    print(f"  {'sort all users':<22} {(time.perf_counter() - t0) * 1e6 / reruns:10.0f} µs/op")
+
+    ok = board.top(100) == ordered[:100]
+    for rank in rng.sample(range(1, args.users + 1), 1000):
+        ok &= board.rank(ordered[rank - 1][0]) == rank
+    print("cross-check:", "OK" if ok else "MISMATCH")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/points_ledger.py
+"""Load test for points_ledger: many concurrent sessions awarding points.
+
+Run from the repo root:
+
+    python -m benchmarks.points_ledger --threads 32 --events 5000 --users 2000
+
+Each thread plays a Streamlit session firing `events` awards (and some
+spends) at random users as fast as it can. Reports accepted events/s (how
+fast award() returns), committed events/s (until flush() returns) and the
+writer's batch sizes, then checks the ledger against the expected totals:
+every per-user balance and event count must match, and the materialized
+totals must equal the sum over the events table.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from points_ledger import PointsLedger
+
+REASONS = [(10, "daily_login"), (20, "daily_challenge"), (100, "weekly_challenge"), (-50, "redeem:Eco Badge 🏅")]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--events", type=int, default=5000, help="events per thread")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="ledger_"), "ledger.db")
+    ledger = PointsLedger(path, batch_size=args.batch_size)
+    expected = [Counter() for _ in range(args.threads)]
+    counts = [Counter() for _ in range(args.threads)]
+    start = threading.Barrier(args.threads + 1)
+
+    def session(i):
+        rng = random.Random(i)
+        start.wait()
+        for _ in range(args.events):
+            user = f"user{rng.randrange(args.users)}"
+            points, reason = rng.choice(REASONS)
+            ledger.award(user, points, reason)
+            expected[i][user] += points
+            counts[i][user] += 1
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    accepted_s = time.perf_counter() - t0
+    ledger.flush()
+    committed_s = time.perf_counter() - t0
+    ledger.close()
+
+    total = args.threads * args.events
+    stats = ledger.stats
+    print(f"{total:,} events from {args.threads} threads over {args.users:,} users")
+    print(f"accepted   {total / accepted_s:>12,.0f} events/s")
+    print(f"committed  {total / committed_s:>12,.0f} events/s  "
+          f"({stats['batches']:,} transactions, mean batch {total / stats['batches']:,.0f}, "
+          f"max {stats['max_batch']:,})")
+
+    balances, event_counts = Counter(), Counter()
+    for i in range(args.threads):
+        balances.update(expected[i])   # update() keeps negative balances; Counter + drops them
+        event_counts.update(counts[i])
+    conn = sqlite3.connect(path)
+    totals = {user: (points, events) for user, points, events in conn.execute("SELECT user, points, events FROM totals")}
+    summed = dict(conn.execute("SELECT user, SUM(delta) FROM events GROUP BY user"))
+    mismatches = [u for u in event_counts
+                  if totals.get(u) != (balances[u], event_counts[u]) or summed.get(u) != balances[u]]
+    (rows,) = conn.execute("SELECT COUNT(*) FROM events").fetchone()
+    print(f"events table rows: {rows:,} (expected {total:,})")
+    print("consistency: OK" if not mismatches and rows == total else f"consistency: {len(mismatches)} users differ")
+
+
+if __name__ == "__main__":
+    main()
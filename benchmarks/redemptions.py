@@ -0,0 +1,136 @@
+# benchmarks/redemptions.py
+"""Concurrency test for PointsLedger.redeem(): parallel shoppers, one database.
+
+Run from the repo root:
+
+    python -m benchmarks.redemptions --processes 4 --threads 16 --redemptions 2000 --users 200
+
+`processes` app processes (each with its own ledger and writer thread, as
+several Streamlit servers on one database would be) run `threads` sessions
+each. Every session keeps redeeming rewards for a small pool of shared users,
+re-sends a fraction of its requests with the same idempotency key (a double
+click or a retry), and awards points now and then. One reward has a small
+stock, so shoppers race for the last items.
+
+Reports redemptions/s, then checks the database:
+- no user balance is negative, and each materialized total equals the sum of
+  that user's events
+- every successful redemption has exactly one debit event, and no key was
+  charged twice
+- the limited reward was never oversold: redemptions + stock left = initial stock
+- every caller saw REDEEMED exactly once per key that was charged
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from points_ledger import ALREADY_REDEEMED, REDEEMED, PointsLedger
+
+REWARDS = {"Eco Badge 🏅": 50, "Tree Planting Credit 🌳": 100, "Community Shoutout 📢": 200}
+LIMITED = "Community Shoutout 📢"
+GRANT = 20_000
+
+
+def shopper_process(path, proc, args, results):
+    ledger = PointsLedger(path)
+    outcomes = [Counter() for _ in range(args.threads)]
+    charged = [[] for _ in range(args.threads)]
+
+    def session(i):
+        rng = random.Random(proc * 1000 + i)
+        for n in range(args.redemptions):
+            user = f"user{rng.randrange(args.users)}"
+            if rng.random() < 0.1:
+                ledger.award(user, 100, "weekly_challenge")
+            reward = rng.choice(list(REWARDS))
+            key = f"{proc}:{i}:{n}"
+            for _ in range(2 if rng.random() < args.retry_rate else 1):
+                status = ledger.redeem(user, reward, REWARDS[reward], key)
+                outcomes[i][status] += 1
+                if status == REDEEMED:
+                    charged[i].append(key)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ledger.flush()
+    ledger.close()
+    total = Counter()
+    for counter in outcomes:
+        total.update(counter)
+    results.put((dict(total), [key for keys in charged for key in keys]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--redemptions", type=int, default=2000, help="redemptions per session")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=300)
+    parser.add_argument("--retry-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="redemptions_"), "ledger.db")
+    ledger = PointsLedger(path)
+    for u in range(args.users):
+        ledger.award(f"user{u}", GRANT, "grant")
+    ledger.set_stock(LIMITED, args.stock)
+    ledger.close()
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=shopper_process, args=(path, p, args, results))
+             for p in range(args.processes)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    outcomes, charged = Counter(), []
+    for _ in procs:
+        counts, keys = results.get()
+        outcomes.update(counts)
+        charged += keys
+    for p in procs:
+        p.join()
+    seconds = time.perf_counter() - t0
+    calls = sum(outcomes.values())
+    print(f"{calls:,} redeem() calls from {args.processes} processes × {args.threads} sessions "
+          f"in {seconds:.1f}s: {calls / seconds:,.0f} decisions/s, "
+          f"{outcomes[REDEEMED] / seconds:,.0f} successful redemptions/s")
+    print("outcomes:", ", ".join(f"{status} {n:,}" for status, n in outcomes.most_common()))
+
+    conn = sqlite3.connect(path)
+    problems = []
+    negative = conn.execute("SELECT COUNT(*) FROM totals WHERE points < 0").fetchone()[0]
+    if negative:
+        problems.append(f"{negative} users with a negative balance")
+    drift = conn.execute("""
+        SELECT COUNT(*) FROM totals t
+        JOIN (SELECT user, SUM(delta) AS points, COUNT(*) AS n FROM events GROUP BY user) e USING (user)
+        WHERE t.points != e.points OR t.events != e.n
+    """).fetchone()[0]
+    if drift:
+        problems.append(f"{drift} users whose totals differ from their events")
+    redemptions = conn.execute("SELECT COUNT(*) FROM redemptions").fetchone()[0]
+    debits = conn.execute("SELECT COUNT(*) FROM events WHERE reason LIKE 'redeem:%'").fetchone()[0]
+    if not redemptions == debits == outcomes[REDEEMED] == len(charged) == len(set(charged)):
+        problems.append(f"{redemptions} redemptions, {debits} debits, {outcomes[REDEEMED]} REDEEMED replies, "
+                        f"{len(set(charged))}/{len(charged)} distinct keys charged")
+    sold = conn.execute("SELECT COUNT(*) FROM redemptions WHERE reward = ?", (LIMITED,)).fetchone()[0]
+    left = conn.execute("SELECT remaining FROM stock WHERE reward = ?", (LIMITED,)).fetchone()[0]
+    if sold + left != args.stock or left < 0:
+        problems.append(f"{LIMITED}: {sold} sold + {left} left != {args.stock}")
+    print(f"{LIMITED}: {sold} sold, {left} left; {outcomes[ALREADY_REDEEMED]:,} retries not charged again")
+    print("consistency: " + ("OK" if not problems else "FAILED\n  " + "\n  ".join(problems)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/story_analytics.py
+"""Ingest throughput and query cost of story_analytics at millions of playthroughs.
+
+Run from the repo root:
+
+    python -m benchmarks.story_analytics --playthroughs 2000000 --processes 4
+
+`processes` app processes each play their share of the playthroughs through
+the compiled story (random roles and choices, 10% quitting at each scene)
+and feed every event to their own StoryAnalytics shard, as several Streamlit
+servers would. Then:
+
+1. reports events/s across processes
+2. merges the shards like the educator view does and times the merge and the
+   summary() queries
+3. checks starts, finishes, choice counts and the score histogram exactly
+   against counts kept by the workers, and the distinct-player estimate
+   against the true number
+4. reports the size of the shards, which does not grow with playthroughs
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from story_analytics import StoryAnalytics, load_shards, summary
+from story_engine import STORY_PATH, compile_story
+
+
+def worker(graph, root, proc, args, results):
+    story = compile_story(graph)
+    analytics = StoryAnalytics(story, root, shard=f"proc{proc}", flush_interval=10.0)
+    rng = random.Random(proc)
+    # the worker's own exact counts, as plain lists (numpy scalar updates would dominate the timing)
+    chosen = [[0] * len(c) for c in story.choices]
+    low, high = story.score_range
+    scores = [0] * (high - low + 1)
+    players = [0] * (args.playthroughs // args.processes)
+    state, events, finished = {}, 0, 0
+    t0 = time.perf_counter()
+    for n in range(len(players)):
+        player = players[n] = rng.randrange(args.players)
+        role = rng.choice(story.roles)
+        story.start(state, role)
+        analytics.start(player, role)
+        events += 1
+        while not story.is_ending(state["step"]) and rng.random() >= args.quit_rate:
+            scene = state["step"]
+            choice = rng.randrange(len(story.choices[scene]))
+            story.choose(state, scene, choice)
+            analytics.choice(player, role, scene, choice)
+            chosen[scene][choice] += 1
+            events += 1
+        if story.is_ending(state["step"]):
+            analytics.finish(player, role, state["eco_score"])
+            scores[state["eco_score"] - low] += 1
+            finished += 1
+            events += 1
+    analytics.close()
+    chosen = np.array([count for counts in chosen for count in counts], dtype=np.int64)
+    results.put((events, time.perf_counter() - t0, len(players), finished, chosen, np.array(scores),
+                 np.unique(players)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--playthroughs", type=int, default=2_000_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--players", type=int, default=500_000, help="size of the player pool")
+    parser.add_argument("--quit-rate", type=float, default=0.1)
+    parser.add_argument("--graph", default=STORY_PATH)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="story_analytics_")
+    try:
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(args.graph, root, p, args, results))
+                 for p in range(args.processes)]
+        t0 = time.perf_counter()
+        for p in procs:
+            p.start()
+        parts = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - t0
+        events = sum(part[0] for part in parts)
+        print(f"ingested {sum(part[2] for part in parts):,} playthroughs ({events:,} events) in {wall:.1f}s: "
+              f"{events / wall:,.0f} events/s overall, "
+              f"{np.mean([part[0] / part[1] for part in parts]):,.0f} events/s per process")
+
+        story = compile_story(args.graph)
+        t0 = time.perf_counter()
+        agg = load_shards(root, story)
+        print(f"merged {args.processes} shards in {(time.perf_counter() - t0) * 1000:.1f} ms "
+              f"({sum(os.path.getsize(os.path.join(root, f)) for f in os.listdir(root)) / 1024:,.0f} KB on disk)")
+        for role in [None] + story.roles:
+            t0 = time.perf_counter()
+            stats = summary(agg, role)
+            print(f"  summary({role!r}): {(time.perf_counter() - t0) * 1000:.2f} ms, "
+                  f"{stats['started']:,} started, {stats['completion']:.1%} completed, "
+                  f"median score {stats['median_score']}")
+
+        stats = summary(agg)
+        exact_players = len(np.unique(np.concatenate([part[6] for part in parts])))
+        problems = []
+        if stats["started"] != sum(part[2] for part in parts) or stats["finished"] != sum(part[3] for part in parts):
+            problems.append("start/finish counts differ")
+        if not np.array_equal(agg.chosen.sum(axis=0), sum(part[4] for part in parts)):
+            problems.append("choice counts differ")
+        if not np.array_equal(stats["score_counts"], sum(part[5] for part in parts)):
+            problems.append("score histogram differs")
+        error = stats["players"] / exact_players - 1
+        print(f"distinct players: {stats['players']:,} estimated, {exact_players:,} exact ({error:+.2%})")
+        print("consistency: " + ("OK" if not problems else "FAILED: " + ", ".join(problems)))
+        print(f"peak RSS (main process) {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
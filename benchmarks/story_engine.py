@@ -0,0 +1,99 @@
+# benchmarks/story_engine.py
+"""Compile time and per-decision cost of the story engine on a large graph.
+
+Run from the repo root:
+
+    python -m benchmarks.story_engine --scenes 1000 --choices 3 --decisions 200
+
+1. Generates a graph of `scenes` scenes with `choices` choices each and times
+   loading, validating and compiling it (paid once per process).
+2. Times story.choose() alone over many random playthroughs.
+3. Plays story_game.py against the generated graph with Streamlit's AppTest
+   (STORY_GRAPH points the page at it) and reports script runs per decision
+   and the time from click to rendered page.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from story_engine import compile_story
+
+
+def make_graph(scenes, choices, rng):
+    """A layered graph: every choice leads further on, the last scenes are endings."""
+    endings = max(1, scenes // 50) if choices > 1 else 1
+    graph = {"version": "bench", "start": "s0", "initial_score": 50, "score_range": [0, 100],
+             "roles": ["Scientist", "Activist", "Mayor"], "scenes": {},
+             "outcomes": [{"min_score": 70, "level": "success", "text": "Thriving"},
+                          {"min_score": 40, "level": "warning", "text": "Mixed"},
+                          {"min_score": 0, "level": "error", "text": "Disaster"}]}
+    for i in range(scenes):
+        scene = {"title": f"Scene {i}", "text": f"Situation number {i}."}
+        if i < scenes - endings:
+            # the first choice leads to the next scene, so every scene is reachable
+            targets = [i + 1] + [rng.randrange(i + 1, min(scenes, i + 40)) for _ in range(choices - 1)]
+            scene["choices"] = [{"label": f"Option {c} of scene {i}", "delta": rng.randint(-20, 20),
+                                 "fact": f"Fact about option {c} of scene {i}.", "next": f"s{t}"}
+                                for c, t in enumerate(targets)]
+        graph["scenes"][f"s{i}"] = scene
+    for k in range(1, endings):
+        # and every ending is the last choice of some scene
+        graph["scenes"][f"s{scenes - endings - k}"]["choices"][-1]["next"] = f"s{scenes - endings + k}"
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenes", type=int, default=1000)
+    parser.add_argument("--choices", type=int, default=3)
+    parser.add_argument("--decisions", type=int, default=200, help="clicks to play through the page")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(prefix="story_"), "story_graph.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(make_graph(args.scenes, args.choices, rng), f)
+
+    t0 = time.perf_counter()
+    story = compile_story(path)
+    print(f"compiled {len(story):,} scenes, {sum(map(len, story.choices)):,} choices "
+          f"in {(time.perf_counter() - t0) * 1000:.1f} ms (once per process)")
+
+    state, decisions = {}, 0
+    t0 = time.perf_counter()
+    while decisions < 100_000:
+        story.start(state, "Mayor")
+        while not story.is_ending(state["step"]):
+            story.choose(state, state["step"], rng.randrange(len(story.choices[state["step"]])))
+            decisions += 1
+    print(f"story.choose(): {(time.perf_counter() - t0) * 1e6 / decisions:.2f} µs per decision")
+
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["STORY_GRAPH"] = path
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         "story_game.py"))
+    app.run()
+    runs, latencies = [], []
+    for _ in range(args.decisions):
+        before = app.session_state["runs"]
+        t0 = time.perf_counter()
+        if app.session_state["step"] is None or story.is_ending(app.session_state["step"]):
+            app.button[0].click().run()   # Start Adventure / Play Again
+        else:
+            app.button[rng.randrange(len(app.button))].click().run()
+        latencies.append(time.perf_counter() - t0)
+        runs.append(app.session_state["runs"] - before)
+    print(f"page: {statistics.mean(runs):.2f} script runs per click, "
+          f"click to rendered median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95 {sorted(latencies)[int(len(latencies) * 0.95)] * 1000:.1f} ms "
+          f"(the page's own measure: median {statistics.median(app.session_state['latencies']) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
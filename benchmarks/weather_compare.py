@@ -0,0 +1,69 @@
+# benchmarks/weather_compare.py
+"""Wall-clock time of a multi-city comparison, serial vs. concurrent.
+
+Run from the repo root:
+
+    python -m benchmarks.weather_compare --cities 50 --latency 0.3
+
+Starts fake_weather_server.py in-process with a fixed per-request latency and
+fetches `cities` distinct cities with a cold cache:
+
+- serial: one client.current() after another (the old one-city-per-click path)
+- concurrent: weather_client.compare_cities() at each concurrency limit
+
+With enough concurrency the total should approach a single round-trip.
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from fake_weather_server import make_server
+from weather_client import WeatherClient, compare_cities
+
+
+def fresh_client(base_url):
+    return WeatherClient("fake", base_url=base_url, disk_path=None)
+
+
+async def concurrent(client, cities, limit):
+    latencies = []
+    async for _, weather, error, seconds in compare_cities(client, cities, limit):
+        latencies.append(seconds)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--limits", default="4,16,50")
+    args = parser.parse_args()
+
+    server = make_server(port=0, latency=args.latency, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/data/2.5"
+    cities = [f"City {i}" for i in range(args.cities)]
+
+    client = fresh_client(base_url)
+    t0 = time.perf_counter()
+    for city in cities:
+        client.current(city)
+    print(f"serial              {time.perf_counter() - t0:6.2f}s")
+    client.close()
+
+    for limit in (int(x) for x in args.limits.split(",")):
+        client = fresh_client(base_url)
+        t0 = time.perf_counter()
+        latencies = asyncio.run(concurrent(client, cities, limit))
+        print(f"concurrent (limit {limit:>3}) {time.perf_counter() - t0:6.2f}s   "
+              f"max request {max(latencies) * 1000:,.0f} ms")
+        client.close()
+
+    print(f"one round-trip      {args.latency:6.2f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+# board_search.py
+"""Incremental full-text search over Community Board posts.
+
+An inverted index (term -> posts containing it) kept next to the board:
+
+    board_search/manifest.json     the live segments, in post-id order
+    board_search/seg-<gen>.terms   the segment's terms, sorted (JSON)
+    board_search/seg-<gen>.meta    per term: df, postings offset, ids bytes, tf bytes (int64)
+    board_search/seg-<gen>.post    postings: varint id gaps, then varint term counts
+    board_search/seg-<gen>.len     per post: its length in tokens (uint16)
+
+Each segment covers a contiguous range of post ids [lo, hi) and never
+changes once written. New posts arrive through CommunityBoard.subscribe()
+and go into an in-memory segment (the memtable), which is searchable at
+once and written out every `memtable_posts` posts. A background thread
+merges the newest `merge_factor` segments of the same size tier into one,
+so a board of millions of posts is a handful of segments. The memtable is
+not durable: on start the indexer re-reads whatever the board holds past
+the last segment, so nothing is ever rebuilt from scratch. If indexing or a
+merge fails, searches keep answering from what is indexed, flush() raises
+SearchIndexError and info()["error"] says why.
+
+Queries are lower-cased words and #hashtags, OR'ed and ranked with BM25;
+`word*` matches every term with that prefix (the `max_expansions` most
+common ones):
+
+    index = BoardSearch(board)
+    index.search("solar #zerowaste", k=20)   # [(post id, score), ...] best first
+"""
+
+import atexit
+import bisect
+import heapq
+import itertools
+import json
+import math
+import os
+import queue
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"#?\w+")
+K1, B = 1.2, 0.75
+_STOP = object()
+
+
+class SearchIndexError(RuntimeError):
+    """The indexer or merger failed; posts since then are not searchable (see __cause__)."""
+
+
+def tokenize(text):
+    """Lower-cased words; a hashtag counts as both '#tag' and 'tag'."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.casefold()):
+        tokens.append(token)
+        if token[0] == "#" and len(token) > 1:
+            tokens.append(token[1:])
+    return tokens
+
+
+def parse_query(text):
+    """(terms, prefixes) from a query string; 'sol*' is a prefix query.
+
+    '#tag' matches only the hashtag, while 'tag' also matches posts tagged #tag.
+    """
+    terms, prefixes = [], []
+    for raw in text.casefold().split():
+        if raw.endswith("*") and TOKEN_RE.fullmatch(raw[:-1]):
+            prefixes.append(raw[:-1])
+        else:
+            terms.extend(TOKEN_RE.findall(raw))
+    return list(dict.fromkeys(terms)), list(dict.fromkeys(prefixes))
+
+
+# -----------------------------
+# Varint coding (vectorized)
+# -----------------------------
+def varint_sizes(values):
+    """Encoded length in bytes of each value."""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+    return nbytes
+
+
+def encode_varints(values, nbytes=None):
+    """LEB128 bytes for an array of non-negative integers."""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b""
+    if nbytes is None:
+        nbytes = varint_sizes(values)
+    ends = np.cumsum(nbytes)
+    starts = ends - nbytes
+    out = np.empty(ends[-1], dtype=np.uint8)
+    pos = np.arange(ends[-1]) - np.repeat(starts, nbytes)
+    shifted = np.repeat(values, nbytes) >> (7 * pos).astype(np.uint64)
+    out[:] = (shifted & np.uint64(0x7F)).astype(np.uint8)
+    out[np.flatnonzero(pos < np.repeat(nbytes, nbytes) - 1)] |= 0x80
+    return out.tobytes()
+
+
+def decode_varints(buf):
+    """Inverse of encode_varints(); buf is bytes or a uint8 array."""
+    b = np.frombuffer(buf, dtype=np.uint8) if isinstance(buf, (bytes, bytearray)) else buf
+    if not len(b):
+        return np.zeros(0, dtype=np.int64)
+    ends = (b & 0x80) == 0
+    if ends.all():
+        return b.astype(np.int64)   # every value fit in one byte: the usual case for dense lists
+    starts = np.r_[0, np.flatnonzero(ends)[:-1] + 1]
+    group = np.r_[0, np.cumsum(ends[:-1])]
+    pos = np.arange(len(b)) - starts[group]
+    parts = (b & 0x7F).astype(np.int64) << (7 * pos)
+    return np.add.reduceat(parts, starts)
+
+
+def _layout(df):
+    """Per posting: its term number and its slot in the term's list."""
+    starts = np.cumsum(df) - df
+    term = np.repeat(np.arange(len(df)), df)
+    return starts, term, np.arange(len(term)) - starts[term]
+
+
+def pack_postings(df, ids, tfs):
+    """(blob, meta) for every term at once.
+
+    ids/tfs hold each term's postings back to back (df[t] of them for term t,
+    ids ascending). A term's bytes are its id gaps followed by its tfs, and
+    meta has one (df, offset, ids bytes, tf bytes) row per term.
+    """
+    df = np.asarray(df, dtype=np.int64)
+    if not len(df):
+        return b"", np.zeros((0, 4), dtype=np.int64)
+    ids = np.asarray(ids, dtype=np.int64)
+    starts, term, slot = _layout(df)
+    gaps = np.diff(ids, prepend=0)
+    gaps[starts] = ids[starts]   # each list starts from 0
+    values = np.empty(2 * len(ids), dtype=np.uint64)
+    values[2 * starts[term] + slot] = gaps
+    values[2 * starts[term] + df[term] + slot] = tfs
+    nbytes = varint_sizes(values)
+    offsets = np.r_[0, np.cumsum(nbytes)]
+    begin, middle, end = offsets[2 * starts], offsets[2 * starts + df], offsets[2 * (starts + df)]
+    meta = np.stack([df, begin, middle - begin, end - middle], axis=1)
+    return encode_varints(values, nbytes), meta
+
+
+def unpack_postings(blob, df):
+    """Inverse of pack_postings(): (ids, tfs) for every term, back to back."""
+    df = np.asarray(df, dtype=np.int64)
+    values = decode_varints(blob)
+    starts, term, slot = _layout(df)
+    gaps = values[2 * starts[term] + slot]
+    tfs = values[2 * starts[term] + df[term] + slot]
+    total = np.cumsum(gaps)
+    return total - np.repeat(total[starts] - gaps[starts], df), tfs
+
+
+def _save(path, data):
+    # write-then-rename, so readers never see half a file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# Segments
+# -----------------------------
+class _Segment:
+    """A read-only segment on disk; postings are memory-mapped."""
+
+    def __init__(self, root, info):
+        self.gen, self.lo, self.hi, self.total_len = info["gen"], info["lo"], info["hi"], info["total_len"]
+        base = os.path.join(root, f"seg-{self.gen:06d}")
+        self.paths = [base + ext for ext in (".terms", ".meta", ".post", ".len")]
+        with open(self.paths[0], encoding="utf-8") as f:
+            self.terms = json.load(f)
+        self.meta = np.fromfile(self.paths[1], dtype="<i8").reshape(-1, 4)   # df, offset, ids bytes, tf bytes
+        self.postings = (np.memmap(self.paths[2], dtype=np.uint8, mode="r")
+                         if os.path.getsize(self.paths[2]) else np.zeros(0, dtype=np.uint8))
+        self.lengths = np.fromfile(self.paths[3], dtype="<u2")
+
+    @property
+    def docs(self):
+        return self.hi - self.lo
+
+    def info(self):
+        return {"gen": self.gen, "lo": self.lo, "hi": self.hi, "total_len": self.total_len}
+
+    def find(self, term):
+        i = bisect.bisect_left(self.terms, term)
+        return i if i < len(self.terms) and self.terms[i] == term else None
+
+    def with_prefix(self, prefix):
+        """{term: df} for every term starting with prefix."""
+        i = bisect.bisect_left(self.terms, prefix)
+        found = {}
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            found[self.terms[i]] = int(self.meta[i, 0])
+            i += 1
+        return found
+
+    def df(self, term):
+        i = self.find(term)
+        return 0 if i is None else int(self.meta[i, 0])
+
+    def read(self, i):
+        """(ids relative to lo, term counts) of term number i."""
+        _, offset, id_bytes, tf_bytes = self.meta[i]
+        ids = np.cumsum(decode_varints(self.postings[offset:offset + id_bytes]))
+        tfs = decode_varints(self.postings[offset + id_bytes:offset + id_bytes + tf_bytes])
+        return ids, tfs
+
+
+def _write_segment(root, gen, lo, hi, terms, df, ids, tfs, lengths):
+    """Write a segment (sorted terms, postings as for pack_postings()); returns its manifest entry."""
+    base = os.path.join(root, f"seg-{gen:06d}")
+    blob, meta = pack_postings(df, ids, tfs)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    # data files first, the manifest names the segment only once they are all in place
+    _save(base + ".post", blob)
+    _save(base + ".len", np.minimum(lengths, 65535).astype("<u2").tobytes())
+    _save(base + ".meta", meta.astype("<i8").tobytes())
+    _save(base + ".terms", json.dumps(terms, ensure_ascii=False).encode("utf-8"))
+    return {"gen": gen, "lo": lo, "hi": hi, "total_len": int(lengths.sum())}
+
+
+class _Memtable:
+    """The newest posts, indexed in memory."""
+
+    def __init__(self, lo):
+        self.lo = self.hi = lo
+        self.postings = {}   # term -> ([ids relative to lo], [tfs])
+        self.lengths = []
+        self.total_len = 0
+
+    @property
+    def docs(self):
+        return self.hi - self.lo
+
+    def add(self, text):
+        tokens = tokenize(text)
+        doc = self.hi - self.lo
+        for term, tf in Counter(tokens).items():
+            ids, tfs = self.postings.setdefault(term, ([], []))
+            ids.append(doc)
+            tfs.append(tf)
+        self.lengths.append(len(tokens))
+        self.total_len += len(tokens)
+        self.hi += 1
+
+    def with_prefix(self, prefix):
+        return {term: len(p[0]) for term, p in self.postings.items() if term.startswith(prefix)}
+
+    def df(self, term):
+        p = self.postings.get(term)
+        return len(p[0]) if p else 0
+
+    def arrays(self):
+        """(sorted terms, df, ids, tfs) as _write_segment() takes them."""
+        terms = sorted(self.postings)
+        lists = [self.postings[term] for term in terms]
+        df = [len(ids) for ids, _ in lists]
+        ids = np.fromiter(itertools.chain.from_iterable(ids for ids, _ in lists), dtype=np.int64, count=sum(df))
+        tfs = np.fromiter(itertools.chain.from_iterable(tfs for _, tfs in lists), dtype=np.int64, count=sum(df))
+        return terms, df, ids, tfs
+
+
+def _bm25(ids, tfs, idf, lengths, avg_len):
+    norm = K1 * (1 - B + B * lengths[ids] / avg_len)
+    return idf * tfs * (K1 + 1) / (tfs + norm)
+
+
+class BoardSearch:
+    def __init__(self, board, root="board_search", memtable_posts=20000, merge_factor=8,
+                 max_expansions=50, backfill_batch=10000):
+        self.board = board
+        self.root = root
+        self.memtable_posts = memtable_posts
+        self.merge_factor = merge_factor
+        self.max_expansions = max_expansions
+        self.backfill_batch = backfill_batch
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        manifest = self._load_manifest()
+        self._segments = [_Segment(root, info) for info in manifest["segments"]]
+        self._next_gen = manifest["next_gen"]
+        self._remove_orphans()
+        start = self._segments[-1].hi if self._segments else 0
+        self._mem = _Memtable(start)
+        self.stats = {"indexed": 0, "segments_written": 0, "merges": 0}
+        self.error = None   # the exception that stopped indexing or merging, if any
+        self._queue = queue.Queue()
+        self._merge_wanted = threading.Event()
+        self._closing = False
+        self._indexer = threading.Thread(target=self._run, name="board-search-indexer", daemon=True)
+        self._merger = threading.Thread(target=self._merge_loop, name="board-search-merger", daemon=True)
+        board.subscribe(lambda first_id, posts: self._queue.put((first_id, posts)))
+        self._indexer.start()
+        self._merger.start()
+        self._merge_wanted.set()
+        atexit.register(self.close)
+
+    # -----------------------------
+    # Manifest
+    # -----------------------------
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.root, "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segments": [], "next_gen": 0}
+
+    def _write_manifest(self):
+        # Called with the lock held
+        manifest = {"segments": [seg.info() for seg in self._segments], "next_gen": self._next_gen}
+        _save(os.path.join(self.root, "manifest.json"), json.dumps(manifest).encode("utf-8"))
+
+    def _remove_orphans(self):
+        """Delete segment files a crash left behind (written but never named in the manifest)."""
+        live = {f"seg-{seg.gen:06d}" for seg in self._segments}
+        for name in os.listdir(self.root):
+            if name.startswith("seg-") and name.split(".")[0] not in live:
+                os.remove(os.path.join(self.root, name))
+
+    def _new_gen(self):
+        with self._lock:
+            gen = self._next_gen
+            self._next_gen += 1
+            return gen
+
+    # -----------------------------
+    # Indexing
+    # -----------------------------
+    def flush(self, timeout=None):
+        """Block until every post the board had published before this call is searchable.
+
+        Returns False on timeout or once the index is closed; raises
+        SearchIndexError if indexing failed.
+        """
+        self._check()
+        if not self._indexer.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            return False
+        self._check()
+        return True
+
+    def _check(self):
+        if self.error is not None:
+            raise SearchIndexError(f"board search index failed: {self.error}") from self.error
+
+    def close(self):
+        """Stop the threads and write out the memtable, so the next start has nothing to re-read."""
+        if self._indexer.is_alive():
+            self._queue.put(_STOP)
+            self._indexer.join()
+        self._closing = True
+        self._merge_wanted.set()
+        self._merger.join()
+
+    def _run(self):
+        try:
+            self._catch_up(len(self.board))
+        except Exception as e:
+            self.error = e
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                if self.error is None:
+                    self._write_memtable()
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            if self.error is not None:
+                continue   # keep draining so the board's writer never waits on us
+            first_id, posts = item
+            try:
+                if first_id > self._mem.hi:
+                    self._catch_up(first_id)
+                skip = self._mem.hi - first_id   # posts already read by a catch-up
+                if skip < len(posts):
+                    self._add(posts[max(skip, 0):])
+            except Exception as e:
+                self.error = e
+
+    def _catch_up(self, target):
+        """Index posts from the board itself up to target (at start, or after a missed batch)."""
+        while self._mem.hi < target:
+            self._add(self.board.read_range(self._mem.hi, min(target, self._mem.hi + self.backfill_batch)))
+
+    def _add(self, posts):
+        i = 0
+        while i < len(posts):
+            n = min(len(posts) - i, self.memtable_posts - self._mem.docs)
+            with self._lock:
+                for post in posts[i:i + n]:
+                    self._mem.add(post["text"])
+                self.stats["indexed"] += n
+            i += n
+            if self._mem.docs >= self.memtable_posts:
+                self._write_memtable()
+
+    def _write_memtable(self):
+        mem = self._mem
+        if not mem.docs:
+            return
+        # Only this thread changes the memtable, so it can be read without the lock while searches go on
+        info = _write_segment(self.root, self._new_gen(), mem.lo, mem.hi, *mem.arrays(), mem.lengths)
+        segment = _Segment(self.root, info)
+        with self._lock:
+            self._segments.append(segment)
+            self._write_manifest()
+            self._mem = _Memtable(mem.hi)
+            self.stats["segments_written"] += 1
+        self._merge_wanted.set()
+
+    # -----------------------------
+    # Background merge
+    # -----------------------------
+    def _tier(self, segment):
+        return int(math.log(max(segment.docs / self.memtable_posts, 1), self.merge_factor) + 1e-9)
+
+    def _merge_loop(self):
+        while True:
+            self._merge_wanted.wait()
+            self._merge_wanted.clear()
+            if self._closing:
+                return
+            while not self._closing and self.error is None:
+                with self._lock:
+                    run = self._segments[-self.merge_factor:]
+                if len(run) < self.merge_factor or len({self._tier(seg) for seg in run}) > 1:
+                    break
+                try:
+                    self._merge(run)
+                except Exception as e:
+                    self.error = e   # the run is still live; searches are unaffected
+
+    def _merge(self, run):
+        """Replace adjacent segments `run` with one segment holding all their postings."""
+        lo = run[0].lo
+        terms = sorted(set().union(*(seg.terms for seg in run)))
+        number = {term: i for i, term in enumerate(terms)}
+        term_ids, ids, tfs = [], [], []
+        for seg in run:
+            seg_ids, seg_tfs = unpack_postings(seg.postings, seg.meta[:, 0])
+            renumber = np.fromiter((number[term] for term in seg.terms), dtype=np.int32, count=len(seg.terms))
+            term_ids.append(np.repeat(renumber, seg.meta[:, 0]))
+            ids.append((seg_ids + (seg.lo - lo)).astype(np.int32))
+            tfs.append(seg_tfs.astype(np.int32))
+        term_ids = np.concatenate(term_ids)
+        # Segments are in id order, so a stable sort by term keeps each list ascending
+        order = np.argsort(term_ids, kind="stable")
+        info = _write_segment(self.root, self._new_gen(), lo, run[-1].hi, terms,
+                              np.bincount(term_ids, minlength=len(terms)), np.concatenate(ids)[order],
+                              np.concatenate(tfs)[order], np.concatenate([seg.lengths for seg in run]))
+        merged = _Segment(self.root, info)
+        with self._lock:
+            # Only this thread removes segments and the indexer only appends, so the run is still in place
+            start = self._segments.index(run[0])
+            self._segments[start:start + len(run)] = [merged]
+            self._write_manifest()
+            self.stats["merges"] += 1
+        for seg in run:
+            for path in seg.paths:
+                os.remove(path)   # open memmaps keep the data alive for searches still reading it
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def search(self, query, k=20):
+        """[(post id, BM25 score)] for the k best matches, best first."""
+        terms, prefixes = parse_query(query)
+        if not terms and not prefixes:
+            return []
+        with self._lock:
+            segments = list(self._segments)
+            mem = self._mem
+            docs = sum(seg.docs for seg in segments) + mem.docs
+            total_len = sum(seg.total_len for seg in segments) + mem.total_len
+            sources = segments + [mem]
+            for prefix in prefixes:
+                expanded = Counter()
+                for source in sources:
+                    expanded.update(source.with_prefix(prefix))
+                terms += [term for term, _ in expanded.most_common(self.max_expansions) if term not in terms]
+            df = {term: sum(source.df(term) for source in sources) for term in terms}
+            # The memtable changes under the indexer, so its part is scored inside the lock
+            best = self._score_memtable(mem, terms, df, docs, total_len, k)
+        if not docs:
+            return []
+        avg_len = max(total_len / docs, 1)
+        idf = {term: math.log(1 + (docs - n + 0.5) / (n + 0.5)) for term, n in df.items() if n}
+        for seg in segments:
+            ids, scores = [], []
+            for term in idf:
+                i = seg.find(term)
+                if i is not None:
+                    term_ids, tfs = seg.read(i)
+                    ids.append(term_ids)
+                    scores.append(_bm25(term_ids, tfs, idf[term], seg.lengths, avg_len))
+            if not ids:
+                continue
+            ids, scores = self._top_k(ids, scores, seg.docs, k)
+            best += zip(scores.tolist(), (ids + seg.lo).tolist())
+        return [(post_id, score) for score, post_id in heapq.nlargest(k, best)]
+
+    @staticmethod
+    def _top_k(ids, scores, docs, k):
+        """(post ids, scores) of the k best posts, summing scores over several terms' postings."""
+        if len(ids) == 1:
+            ids, scores = ids[0], scores[0]
+        elif sum(map(len, ids)) > docs // 8:
+            # Many postings: a dense accumulator is cheaper than sorting them
+            dense = np.bincount(np.concatenate(ids), weights=np.concatenate(scores), minlength=docs)
+            ids = np.flatnonzero(dense)
+            scores = dense[ids]
+        else:
+            ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(scores))
+        if len(ids) > k:
+            top = np.argpartition(scores, -k)[-k:]
+            ids, scores = ids[top], scores[top]
+        return ids, scores
+
+    def _score_memtable(self, mem, terms, df, docs, total_len, k):
+        if not mem.docs:
+            return []
+        avg_len = max(total_len / docs, 1)
+        lengths = np.asarray(mem.lengths)
+        scores = {}
+        for term in terms:
+            postings = mem.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (docs - df[term] + 0.5) / (df[term] + 0.5))
+            ids, tfs = np.asarray(postings[0]), np.asarray(postings[1])
+            for i, score in zip(ids.tolist(), _bm25(ids, tfs, idf, lengths, avg_len).tolist()):
+                scores[i] = scores.get(i, 0.0) + score
+        return heapq.nlargest(k, ((score, mem.lo + i) for i, score in scores.items()))
+
+    def info(self):
+        """Index size for the UI: posts, segments, memtable size and counters."""
+        with self._lock:
+            return {"posts": self._mem.hi, "segments": len(self._segments), "memtable": self._mem.docs,
+                    "bytes": sum(os.path.getsize(p) for seg in self._segments for p in seg.paths),
+                    "error": None if self.error is None else str(self.error), **self.stats}
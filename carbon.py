@@ -3,6 +3,9 @@
 import streamlit as st
 import requests
 
+from chart_cache import bar_chart_spec, chart_key, get_chart_cache
+from footprint_engine import calculate_footprint, tip_flags
+
 # Optional: Climate news API (e.g., NewsAPI.org)
 NEWS_API_KEY = "your_api_key_here"  # Replace with your key or leave empty
 
@@ -18,26 +21,19 @@ def get_climate_news():
     except:
         return []
 
-def calculate_footprint(km_driven, flights, electricity, meat_meals):
-    """Calculate annual CO2 emissions (kg)."""
-    car_emission = km_driven * 0.12 * 52
-    flight_emission = flights * 250
-    electricity_emission = electricity * 0.5 * 12
-    diet_emission = meat_meals * 7 * 2.5 * 52
-    return car_emission, flight_emission, electricity_emission, diet_emission
-
 def footprint_tips(km_driven, flights, electricity, meat_meals):
     """Generate personalized tips."""
+    car, flight, elec, diet, none = tip_flags(km_driven, flights, electricity, meat_meals)
     tips = []
-    if km_driven > 50:
+    if car:
         tips.append("🚲 Use public transport, cycle, or carpool to cut down car emissions.")
-    if flights > 2:
+    if flight:
         tips.append("✈️ Reduce air travel or choose trains for shorter trips.")
-    if electricity > 200:
+    if elec:
         tips.append("💡 Switch to energy-efficient appliances and renewable energy.")
-    if meat_meals > 5:
+    if diet:
         tips.append("🥗 Try adding more plant-based meals each week.")
-    if not tips:
+    if none:
         tips.append("✅ You’re already keeping your footprint low. Great job!")
     return tips
 
@@ -63,14 +59,10 @@ if submitted:
 
     # Breakdown chart
     st.write("### Emission Breakdown")
-    st.bar_chart({
-        "Emissions (kg CO₂)": {
-            "Car": car,
-            "Flights": flight,
-            "Electricity": elec,
-            "Diet": diet
-        }
-    })
+    breakdown = {"Car": car, "Flights": flight, "Electricity": elec, "Diet": diet}
+    spec, _ = get_chart_cache().spec(chart_key("bars", "Emissions (kg CO₂)", breakdown),
+                                     lambda: bar_chart_spec(breakdown, "Emissions (kg CO₂)"))
+    st.vega_lite_chart(spec, use_container_width=True)
 
     # Personalized tips
     st.write("### ✅ Tips to Reduce Your Footprint")
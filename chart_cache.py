@@ -0,0 +1,130 @@
+# chart_cache.py
+"""Render cache for the footprint pages' charts.
+
+Charts are keyed on everything they show (labels, titles and values,
+rounded so float noise does not split entries) and kept in a bounded LRU
+shared by every page of the process:
+
+    charts = get_chart_cache()
+    png, info = charts.png(chart_key("pie", breakdown), draw_pie)             # draw_pie(fig)
+    spec, info = charts.spec(chart_key("bars", title, breakdown), build_spec)  # build_spec() -> dict
+
+Matplotlib charts are drawn on a standalone Figure (never registered with
+pyplot, so nothing accumulates in its global figure list), saved to PNG and
+cleared in a finally block. A rerun with the same inputs only pays for the
+dict lookup. `info` says whether it was a hit and how long the render took.
+"""
+
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from matplotlib.figure import Figure
+
+KEY_DIGITS = 6
+
+
+def chart_key(name, *values):
+    """Cache key for chart `name` showing `values` (floats rounded to KEY_DIGITS).
+
+    Dicts contribute their labels as well as their values, in order, so two
+    charts with the same numbers under different labels never share an entry.
+    """
+    return (name,) + tuple(_key_part(v) for v in values)
+
+
+def _key_part(value):
+    if isinstance(value, dict):
+        return tuple((k, _key_part(v)) for k, v in value.items())
+    if isinstance(value, (tuple, list)):
+        return tuple(_key_part(v) for v in value)
+    return round(float(value), KEY_DIGITS) if isinstance(value, float) else value
+
+
+class ChartCache:
+    def __init__(self, max_entries=256, dpi=100):
+        self.max_entries = max_entries
+        self.dpi = dpi
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> rendered PNG bytes or spec dict
+        self.hits = 0
+        self.misses = 0
+        self.render_ms = {}             # chart name -> last render time (ms)
+
+    def _get(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], {"hit": True, "render_ms": 0.0}
+            self.misses += 1
+        t0 = time.perf_counter()
+        value = render()
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.render_ms[key[0]] = ms
+        return value, {"hit": False, "render_ms": ms}
+
+    def png(self, key, draw, figsize=(6.4, 4.8)):
+        """PNG bytes for `key`; on a miss, draw(fig) fills a fresh Figure that is then discarded."""
+        def render():
+            fig = Figure(figsize=figsize, dpi=self.dpi)
+            try:
+                draw(fig)
+                buf = io.BytesIO()
+                fig.savefig(buf, format="png", bbox_inches="tight")
+                return buf.getvalue()
+            finally:
+                fig.clear()
+        return self._get(key, render)
+
+    def spec(self, key, build):
+        """Chart spec (e.g. a Vega-Lite dict) for `key`; build() runs only on a miss."""
+        return self._get(key, build)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(v) for v in self._entries.values() if isinstance(v, bytes)),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "render_ms": dict(self.render_ms),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chart_cache():
+    """Process-wide ChartCache shared by the footprint pages, sized by CHART_CACHE_SIZE."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ChartCache(max_entries=int(os.getenv("CHART_CACHE_SIZE", "256")))
+        return _cache
+
+
+def bar_chart_spec(breakdown, value_title):
+    """Vega-Lite bar chart of {category: value}, in the given category order."""
+    return {
+        "data": {"values": [{"Category": k, value_title: v} for k, v in breakdown.items()]},
+        "mark": "bar",
+        "encoding": {
+            "x": {"field": "Category", "type": "nominal", "sort": list(breakdown)},
+            "y": {"field": value_title, "type": "quantitative"},
+        },
+    }
+
+
+def render_caption(info):
+    return "⚡ cached" if info["hit"] else f"🖌️ rendered in {info['render_ms']:.0f} ms"
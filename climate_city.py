@@ -1,16 +1,84 @@
 # climate_hub.py
 
+import asyncio
 import os
+import time
+
+import pandas as pd
 import streamlit as st
-import requests
 from dotenv import load_dotenv
 
+import weather_client
+from climate_store import ClimateStore, city_key
+from weather_client import WeatherError
+
 # --------------------------
 # Load environment variables
 # --------------------------
 load_dotenv()
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
+@st.cache_resource
+def init_weather_client():
+    # One pooled session and cache shared by every session in this process
+    return weather_client.from_env()
+
+@st.cache_resource
+def init_climate_store():
+    # Every fetched reading is kept for trend queries
+    return ClimateStore(
+        os.getenv("CLIMATE_STORE_DIR", "climate_store"),
+        batch_size=int(os.getenv("CLIMATE_STORE_BATCH", "256")),
+        compact_interval=float(os.getenv("CLIMATE_STORE_COMPACT_SECONDS", "300")),
+    )
+
+def record(weather):
+    init_climate_store().append(weather["name"], weather["fetched_at"], weather["temp"],
+                                weather["humidity"], weather["wind_speed"])
+
+# Trend range -> (seconds of history, bucket seconds, rolling window seconds);
+# whole-day windows are answered per day from the store's daily rollup
+TREND_RANGES = {
+    "Last 24 hours": (86400, 900, 3 * 3600),
+    "Last 7 days": (7 * 86400, 3600, 12 * 3600),
+    "Last 30 days": (30 * 86400, 6 * 3600, 3 * 86400),
+    "Last year": (365 * 86400, 7 * 86400, 30 * 86400),
+}
+
+def show_trends(city):
+    store = init_climate_store()
+    choice = st.selectbox("Trend range", list(TREND_RANGES), index=1)
+    history, bucket, window = TREND_RANGES[choice]
+    end = time.time()
+    start = end - history
+
+    t0 = time.perf_counter()
+    buckets = store.downsample(city, start, end, bucket)
+    roll_ts, roll_mean = store.rolling_mean(city, start, end, window)
+    daily = store.daily(city, start, end)
+    query_ms = (time.perf_counter() - t0) * 1000
+
+    if not len(buckets["ts"]):
+        st.info("No readings stored for this city in that range yet. Fetch it to start a history.")
+        return
+
+    series = pd.DataFrame({
+        "Mean °C": buckets["temp_mean"],
+        "Min °C": buckets["temp_min"],
+        "Max °C": buckets["temp_max"],
+    }, index=pd.to_datetime(buckets["ts"], unit="s"))
+    st.write(f"**Temperature** ({len(buckets['ts'])} buckets)")
+    st.line_chart(series)
+
+    if len(roll_ts):
+        st.write("**Rolling mean**")
+        st.line_chart(pd.DataFrame({"Rolling mean °C": roll_mean}, index=pd.to_datetime(roll_ts, unit="s")))
+
+    st.write("**Daily min / max**")
+    st.line_chart(pd.DataFrame({"Daily min °C": daily["temp_min"], "Daily max °C": daily["temp_max"]},
+                               index=pd.to_datetime(daily["ts"], unit="s")))
+    st.caption(f"{int(daily['count'].sum())} readings over {len(daily['ts'])} days, queried in {query_ms:.1f} ms")
+
 # --------------------------
 # Streamlit app setup
 # --------------------------
@@ -74,7 +142,7 @@ st.subheader("Track your local climate, learn eco-friendly tips, and take action
 st.sidebar.header("📌 Quick Actions")
 feature = st.sidebar.radio(
     "Choose a feature:",
-    ["Local Climate Dashboard", "Environmental Tips", "Gamification Challenges"]
+    ["Local Climate Dashboard", "Compare Cities", "Environmental Tips", "Gamification Challenges"]
 )
 
 # 1️⃣ Local Climate Dashboard
@@ -88,19 +156,90 @@ if feature == "Local Climate Dashboard":
         if not OPENWEATHER_API_KEY:
             st.error("❌ OpenWeatherMap API key is missing! Please set it in your .env file or environment variables.")
         else:
+            client = init_weather_client()
             try:
-                url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-                resp = requests.get(url).json()
-
-                if resp.get("cod") != 200:
-                    st.error(f"API Error: {resp.get('message', 'Unknown error')}")
-                else:
-                    st.write(f"🌡️ Temperature: {resp['main']['temp']}°C")
-                    st.write(f"💨 Wind Speed: {resp['wind']['speed']} m/s")
-                    st.write(f"🌫️ Weather: {resp['weather'][0]['description'].title()}")
-                    st.write(f"📍 Location: {resp['name']}, {resp['sys']['country']}")
-            except Exception as e:
-                st.error(f"Error fetching data: {e}")
+                weather = client.current(city)
+            except WeatherError as e:
+                st.error(f"API Error: {e}" if e.status else f"Error fetching data: {e}")
+            else:
+                st.write(f"🌡️ Temperature: {weather['temp']}°C")
+                st.write(f"💨 Wind Speed: {weather['wind_speed']} m/s")
+                st.write(f"🌫️ Weather: {weather['description'].title()}")
+                st.write(f"📍 Location: {weather['name']}, {weather['country']}")
+                age = client.age(weather)
+                st.caption("Updated just now" if age < 60 else f"Updated {age / 60:.0f} min ago")
+                record(weather)
+                # The API's name for the city ("NYC" -> "New York") is what the store is keyed on
+                st.session_state.setdefault("trend_names", {})[city_key(city)] = weather["name"]
+
+    st.subheader("📈 Temperature Trends")
+    show_trends(st.session_state.get("trend_names", {}).get(city_key(city), city))
+
+    with st.sidebar.expander("🌦️ Weather cache"):
+        stats = init_weather_client().stats()
+        st.write(f"Hits: **{stats['hits']}** (stale: {stats['stale_hits']}, coalesced: {stats['coalesced']})")
+        st.write(f"Upstream calls: **{stats['upstream_calls']}**, shared-disk hits: {stats['disk_hits']}, "
+                 f"rate limited: {stats['rate_limited']}")
+        st.write(f"Served stale on error: {stats['stale_on_error']}")
+
+    with st.sidebar.expander("🗃️ Reading store"):
+        store_stats = init_climate_store().stats
+        st.write(f"Readings recorded: **{store_stats['appended']}** across {len(init_climate_store().cities())} cities")
+        st.write(f"Segments written: {store_stats['segments']}, day compactions: {store_stats['compactions']}")
+
+# 🗺️ Multi-city comparison
+elif feature == "Compare Cities":
+    st.header("🗺️ Compare Cities")
+    st.write("Enter cities separated by commas or new lines, e.g. to prepare a class comparison.")
+
+    text = st.text_area("Cities", "Delhi, Mumbai, London, New York, Tokyo, Nairobi, São Paulo, Sydney")
+    concurrency = int(os.getenv("WEATHER_CONCURRENCY", "16"))
+
+    if st.button("Compare"):
+        cities = weather_client.parse_city_list(text)
+        if not OPENWEATHER_API_KEY:
+            st.error("❌ OpenWeatherMap API key is missing! Please set it in your .env file or environment variables.")
+        elif not cities:
+            st.warning("Please enter at least one city.")
+        else:
+            progress = st.progress(0.0, text=f"Fetching {len(cities)} cities...")
+            table_slot = st.empty()
+            chart_slot = st.empty()
+            rows, failures = [], []
+
+            async def run_comparison():
+                t0 = time.perf_counter()
+                async for city, weather, error, seconds in weather_client.compare_cities(
+                        init_weather_client(), cities, concurrency):
+                    if error is None:
+                        record(weather)
+                        rows.append({
+                            "City": weather["name"],
+                            "Country": weather["country"],
+                            "Temp (°C)": weather["temp"],
+                            "Humidity (%)": weather["humidity"],
+                            "Wind (m/s)": weather["wind_speed"],
+                            "Weather": weather["description"].title(),
+                            "Latency (ms)": round(seconds * 1000),
+                        })
+                        # st.dataframe columns are sortable by clicking their headers
+                        table_slot.dataframe(rows, use_container_width=True, hide_index=True)
+                        chart_slot.bar_chart({"Temp (°C)": {r["City"]: r["Temp (°C)"] for r in rows}})
+                    else:
+                        failures.append((city, error, seconds))
+                    done = len(rows) + len(failures)
+                    progress.progress(done / len(cities), text=f"{done}/{len(cities)} cities")
+                return time.perf_counter() - t0
+
+            elapsed = asyncio.run(run_comparison())
+            progress.empty()
+            latencies = sorted(r["Latency (ms)"] for r in rows)
+            summary = f"{len(rows)} of {len(cities)} cities in {elapsed:.2f}s"
+            if latencies:
+                summary += f" (slowest {latencies[-1]} ms, median {latencies[len(latencies) // 2]} ms)"
+            st.caption(summary)
+            for city, error, seconds in failures:
+                st.error(f"{city}: {error} ({seconds * 1000:.0f} ms)")
 
 # 2️⃣ Environmental Tips
 elif feature == "Environmental Tips":
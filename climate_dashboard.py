@@ -1,26 +1,76 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
+
+from chart_cache import bar_chart_spec, chart_key, get_chart_cache, render_caption
+from footprint_engine import compile_profile, sweep
 
 # -------------------------
 # Helper functions
 # -------------------------
 
 def calculate_footprint(miles, meat_meals, electricity, waste_kg):
-    # Very simplified emission factors (tons CO2e/year)
-    transport = miles * 0.000404 * 365   # 0.404 kg CO₂ per mile (car)
-    diet = meat_meals * 1.5 * 52         # 1.5 kg CO₂ per meat meal
-    energy = electricity * 0.92 * 12     # 0.92 kg CO₂ per kWh
-    waste = waste_kg * 0.002 * 52        # 2 g CO₂ per kg waste (weekly)
-
-    total = (transport + diet + energy + waste) / 1000  # convert kg → tons
-    breakdown = {
-        "Transport": transport / 1000,
-        "Diet": diet / 1000,
-        "Energy": energy / 1000,
-        "Waste": waste / 1000
+    # Factors (tons CO2e/year) come from emission_factors.json, "climate_dashboard" profile
+    return compile_profile("climate_dashboard").breakdown(miles, meat_meals, electricity, waste_kg)
+
+@st.cache_resource(max_entries=16)
+def scenario_grid(max_miles, miles_step, max_meat, max_kwh, kwh_step):
+    """Totals (tons/year, waste excluded) for every miles x meat x kWh combination.
+
+    Memoized per input range only: the current sidebar values never enter the
+    key, so moving them reuses the grid instead of recomputing it. The arrays
+    are shared by every session without copying, so they are made read-only.
+    """
+    axes = {
+        "miles": np.arange(0, max_miles + miles_step, miles_step, dtype=np.float64),
+        "meat_meals": np.arange(0, max_meat + 1, 1, dtype=np.float64),
+        "electricity": np.arange(0, max_kwh + kwh_step, kwh_step, dtype=np.float64),
     }
-    return total, breakdown
+    totals = sweep(compile_profile("climate_dashboard"), axes)[..., 0]  # drop the fixed waste axis
+    for array in (*axes.values(), totals):
+        array.flags.writeable = False
+    return axes, totals
+
+def cheapest_path(axes, totals, current, target):
+    """Grid point under `target` needing the smallest total cut, as a share of each input's range.
+
+    Only reductions from the current values are considered. Returns
+    (miles, meat_meals, electricity, total) or None if the target is out of reach.
+    """
+    miles, meat, kwh = np.meshgrid(axes["miles"], axes["meat_meals"], axes["electricity"], indexing="ij")
+    feasible = (totals <= target) & (miles <= current[0]) & (meat <= current[1]) & (kwh <= current[2])
+    if not feasible.any():
+        return None
+    effort = ((current[0] - miles) / max(axes["miles"][-1], 1)
+              + (current[1] - meat) / max(axes["meat_meals"][-1], 1)
+              + (current[2] - kwh) / max(axes["electricity"][-1], 1))
+    best = np.unravel_index(np.argmin(np.where(feasible, effort, np.inf)), totals.shape)
+    return miles[best], meat[best], kwh[best], totals[best]
+
+def nearest(values, x):
+    return int(np.abs(values - x).argmin())
+
+def show_png(key, draw):
+    png, info = get_chart_cache().png(key, draw)
+    st.image(png, use_container_width=True)
+    st.caption(render_caption(info))
+
+def pie_chart(breakdown):
+    def draw(fig):
+        ax = fig.subplots()
+        ax.pie(list(breakdown.values()), labels=list(breakdown), autopct="%1.1f%%", startangle=90)
+    show_png(chart_key("pie", breakdown), draw)
+
+def heatmap(key, z, x_values, y_values, x_label, y_label, target):
+    def draw(fig):
+        ax = fig.subplots()
+        im = ax.imshow(z, origin="lower", aspect="auto", cmap="RdYlGn_r",
+                       extent=[x_values[0], x_values[-1], y_values[0], y_values[-1]])
+        if z.min() <= target <= z.max():
+            ax.contour(x_values, y_values, z, levels=[target], colors="black", linewidths=1.5)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        fig.colorbar(im, ax=ax, label="Tons CO₂/year")
+    show_png(key, draw)
 
 def eco_tips(breakdown):
     tips = []
@@ -75,17 +125,72 @@ with col1:
 
 with col2:
     st.subheader("📊 Emission Breakdown")
-    df = pd.DataFrame(list(breakdown.items()), columns=["Category", "Tons CO₂"])
-    fig, ax = plt.subplots()
-    ax.pie(df["Tons CO₂"], labels=df["Category"], autopct="%1.1f%%", startangle=90)
-    st.pyplot(fig)
+    pie_chart(breakdown)
 
 # Extra visualization
 st.subheader("📈 Category Comparison")
-st.bar_chart(df.set_index("Category"))
+spec, _ = get_chart_cache().spec(chart_key("bars", "Tons CO₂", breakdown),
+                                 lambda: bar_chart_spec(breakdown, "Tons CO₂"))
+st.vega_lite_chart(spec, use_container_width=True)
 
 # Eco Tips
 st.subheader("💡 Personalized Eco-Tips")
 tips = eco_tips(breakdown)
 for tip in tips:
     st.write(tip)
+
+# -------------------------
+# Scenario Mode
+# -------------------------
+st.sidebar.markdown("---")
+scenario_mode = st.sidebar.checkbox("🔬 Scenario mode (what-if sweep)")
+
+if scenario_mode:
+    with st.sidebar.expander("Sweep ranges"):
+        max_miles = st.number_input("Max daily miles", 10, 200, 200, step=10)
+        miles_step = st.number_input("Miles step", 1, 20, 1)
+        max_kwh = st.number_input("Max monthly kWh", 100, 2000, 2000, step=100)
+        kwh_step = st.number_input("kWh step", 5, 200, 25, step=5)
+
+    st.subheader("🔬 What-if Scenarios")
+    axes, grid = scenario_grid(max_miles, miles_step, 21, max_kwh, kwh_step)
+    # The model is linear, so the fixed weekly waste just shifts the whole grid; it is added
+    # to the slices shown (and taken off the target) rather than to the shared grid
+    waste_total, _ = compile_profile("climate_dashboard").breakdown(0, 0, 0, waste_kg)
+    st.caption(f"{grid.size:,} scenarios evaluated (waste fixed at {waste_kg} kg/week)")
+
+    i_miles = nearest(axes["miles"], miles)
+    i_meat = nearest(axes["meat_meals"], meat_meals)
+    i_kwh = nearest(axes["electricity"], electricity)
+
+    # Each slice is fully determined by the sweep ranges, the slice index and waste
+    ranges = (max_miles, miles_step, max_kwh, kwh_step, waste_kg)
+    col3, col4 = st.columns(2)
+    with col3:
+        st.write(f"**Travel × meat meals** (electricity {axes['electricity'][i_kwh]:.0f} kWh)")
+        heatmap(chart_key("heat_meat", *ranges, i_kwh), grid[:, :, i_kwh] + waste_total, axes["meat_meals"], axes["miles"],
+                "Meat meals per week", "Daily travel (miles)", target_paris)
+    with col4:
+        st.write(f"**Travel × electricity** ({axes['meat_meals'][i_meat]:.0f} meat meals)")
+        heatmap(chart_key("heat_kwh", *ranges, i_meat), grid[:, i_meat, :] + waste_total, axes["electricity"], axes["miles"],
+                "Monthly electricity (kWh)", "Daily travel (miles)", target_paris)
+
+    st.write("### 🎯 Cheapest path to the 2-ton Paris target")
+    path = cheapest_path(axes, grid, (miles, meat_meals, electricity), target_paris - waste_total)
+    if path is None:
+        st.warning("Even cutting travel, meat and electricity to zero does not reach the target within this range.")
+    elif total <= target_paris:
+        st.success("You're already within the Paris target. 🌱")
+    else:
+        p_miles, p_meat, p_kwh, p_total = path
+        st.write(f"- 🚗 Daily travel: **{miles} → {p_miles:.0f} miles**")
+        st.write(f"- 🍖 Meat meals: **{meat_meals} → {p_meat:.0f} per week**")
+        st.write(f"- 💡 Electricity: **{electricity} → {p_kwh:.0f} kWh/month**")
+        st.write(f"Resulting footprint: **{p_total + waste_total:.2f} tons/year**")
+
+with st.sidebar.expander("🖼️ Chart cache"):
+    chart_stats = get_chart_cache().stats()
+    st.write(f"Entries: **{chart_stats['entries']}** ({chart_stats['bytes'] / 1024:.0f} KB)")
+    st.write(f"Hit rate: **{chart_stats['hit_rate']:.0%}** ({chart_stats['hits']} hits / {chart_stats['misses']} misses)")
+    for name, ms in chart_stats["render_ms"].items():
+        st.write(f"Last `{name}` render: {ms:.0f} ms")
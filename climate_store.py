@@ -0,0 +1,376 @@
+# climate_store.py
+"""Local columnar time-series store for city weather readings.
+
+Every reading the Climate Hub fetches is appended here and trend queries are
+answered from disk. Layout, one directory per city and UTC day:
+
+    climate_store/<city>/2026-10-17/seg-<ns>.npy   small append-only segments
+    climate_store/<city>/2026-10-17/day.npy        the day, compacted and sorted
+    climate_store/<city>/daily.npy                 one rollup row per compacted day
+
+Files are NumPy structured arrays (READING_DTYPE). append() only buffers in
+memory; the buffer is written out as one segment per (city, day) when it
+reaches batch_size or every flush_interval seconds. A background thread folds
+a day's segments into day.npy and updates the city's daily rollup once the
+day is over, or earlier if it has piled up max_segments segments. append()
+skips a repeat of the city's last reading (a cached reading shown again), and
+any other duplicates (same timestamp) are dropped during compaction and
+queries. Rows stay buffered until their segment has been written.
+
+Queries:
+- series(): raw readings in a time range
+- rolling_mean(): time-window moving average over the raw series; windows of
+  whole days are averaged per day from the rollup instead
+- daily(): per-day count/mean/min/max, read from the rollup for compacted days
+- downsample(): fixed-width buckets; buckets of a day or more come from the
+  rollup, so a year of history costs one small file read per city
+
+The store assumes one writing process per root directory.
+"""
+
+import calendar
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+FIELDS = ("temp", "humidity", "wind_speed")
+READING_DTYPE = np.dtype([("ts", "<f8")] + [(f, "<f4") for f in FIELDS])
+ROLLUP_DTYPE = np.dtype([("day", "<i8"), ("n", "<i8")] + [
+    (f"{f}_{stat}", "<i8" if stat == "count" else "<f8")
+    for f in FIELDS for stat in ("sum", "count", "min", "max")])
+DAY_SECONDS = 86400
+
+
+def city_key(city):
+    """Directory name for a city: case-folded, non-word characters collapsed to _."""
+    return re.sub(r"\W+", "_", city.casefold()).strip("_") or "_"
+
+
+def _day_name(day):
+    return time.strftime("%Y-%m-%d", time.gmtime(day * DAY_SECONDS))
+
+
+def _parse_day(name):
+    return calendar.timegm(time.strptime(name, "%Y-%m-%d")) // DAY_SECONDS
+
+
+def _save(path, array):
+    """Write an .npy file atomically (readers never see a partial file)."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _sorted_unique(readings):
+    """Sort by timestamp and keep the last reading per timestamp."""
+    readings = readings[np.argsort(readings["ts"], kind="stable")]
+    if len(readings) > 1:
+        keep = np.r_[readings["ts"][1:] != readings["ts"][:-1], True]
+        readings = readings[keep]
+    return readings
+
+
+# --------------------------
+# Bucketed aggregation
+# --------------------------
+def _as_rollup(readings, ids):
+    """One rollup-shaped row per reading, keyed by bucket id."""
+    rows = np.zeros(len(readings), dtype=ROLLUP_DTYPE)
+    rows["day"] = ids
+    rows["n"] = 1
+    for f in FIELDS:
+        v = readings[f].astype(np.float64)
+        valid = ~np.isnan(v)
+        rows[f"{f}_sum"] = np.where(valid, v, 0.0)
+        rows[f"{f}_count"] = valid
+        rows[f"{f}_min"] = v
+        rows[f"{f}_max"] = v
+    return rows
+
+
+def _combine(rows, ids):
+    """Merge rollup rows sharing a bucket id; ids must be non-decreasing."""
+    if not len(rows):
+        return np.zeros(0, dtype=ROLLUP_DTYPE)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    out = np.zeros(len(starts), dtype=ROLLUP_DTYPE)
+    out["day"] = ids[starts]
+    out["n"] = np.add.reduceat(rows["n"], starts)
+    for f in FIELDS:
+        out[f"{f}_sum"] = np.add.reduceat(rows[f"{f}_sum"], starts)
+        out[f"{f}_count"] = np.add.reduceat(rows[f"{f}_count"], starts)
+        # fmin/fmax skip NaN unless the whole bucket is NaN
+        out[f"{f}_min"] = np.fmin.reduceat(rows[f"{f}_min"], starts)
+        out[f"{f}_max"] = np.fmax.reduceat(rows[f"{f}_max"], starts)
+    return out
+
+
+def summarize(rows, bucket_seconds):
+    """Rollup rows -> {"ts", "count", "<field>_mean", "<field>_min", "<field>_max"} arrays."""
+    out = {"ts": rows["day"].astype(np.float64) * bucket_seconds, "count": rows["n"]}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for f in FIELDS:
+            out[f"{f}_mean"] = rows[f"{f}_sum"] / rows[f"{f}_count"]
+            out[f"{f}_min"] = rows[f"{f}_min"]
+            out[f"{f}_max"] = rows[f"{f}_max"]
+    return out
+
+
+class ClimateStore:
+    def __init__(self, root="climate_store", batch_size=256, flush_interval=5.0,
+                 compact_interval=60.0, max_segments=16, background=True):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.max_segments = max_segments
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()   # buffer, segment writes and compaction swaps
+        self._buffer = {}                # city key -> [reading tuple]
+        self._buffered = 0
+        self._last_ts = {}               # city key -> timestamp of the last appended reading
+        self._rollups = {}               # city key -> ROLLUP_DTYPE array sorted by day
+        self._layouts = {}               # city key -> {day: [segment names]}, mirrors the directories
+        self._seq = 0
+        self._stop = threading.Event()
+        self.stats = {"appended": 0, "repeats": 0, "flushes": 0, "segments": 0, "compactions": 0}
+        if background:
+            threading.Thread(target=self._background, name="climate-store", daemon=True).start()
+
+    # --------------------------
+    # Writes
+    # --------------------------
+    def append(self, city, ts, temp, humidity=None, wind_speed=None):
+        """Buffer a reading; returns False if it repeats the city's last reading."""
+        row = (ts, temp, np.nan if humidity is None else humidity, np.nan if wind_speed is None else wind_speed)
+        key = city_key(city)
+        with self._lock:
+            if self._last_ts.get(key) == ts:
+                self.stats["repeats"] += 1
+                return False
+            self._last_ts[key] = ts
+            self._buffer.setdefault(key, []).append(row)
+            self._buffered += 1
+            self.stats["appended"] += 1
+            full = self._buffered >= self.batch_size
+        if full:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write buffered readings out as one segment per (city, day).
+
+        If a write fails, the rows not yet written go back into the buffer
+        and the error is raised; the next flush retries them.
+        """
+        with self._lock:
+            buffer, self._buffer, self._buffered = self._buffer, {}, 0
+            flushed = False
+            try:
+                for key in list(buffer):
+                    layout = self._days(key)   # loaded before writing, so the new segment is added once
+                    readings = np.array(buffer[key], dtype=READING_DTYPE)
+                    days = (readings["ts"] // DAY_SECONDS).astype(np.int64)
+                    for day in np.unique(days):
+                        day_dir = self._day_dir(key, day)
+                        os.makedirs(day_dir, exist_ok=True)
+                        self._seq += 1
+                        name = f"seg-{time.time_ns()}-{self._seq}.npy"
+                        _save(os.path.join(day_dir, name), readings[days == day])
+                        layout.setdefault(int(day), []).append(name)
+                        self.stats["segments"] += 1
+                        buffer[key] = readings[days > day].tolist()   # np.unique is ascending
+                    del buffer[key]
+                    flushed = True
+                if flushed:
+                    self.stats["flushes"] += 1
+            finally:
+                for key, rows in buffer.items():
+                    self._buffer[key] = rows + self._buffer.get(key, [])
+                    self._buffered += len(rows)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    # --------------------------
+    # Compaction
+    # --------------------------
+    def compact(self, force=False):
+        """Compact finished days (and any day with too many segments); returns days compacted."""
+        today = int(time.time() // DAY_SECONDS)
+        compacted = 0
+        for key in self._cities():
+            with self._lock:
+                days = [(day, len(segments)) for day, segments in self._days(key).items()]
+            for day, segments in days:
+                if segments and (force or day < today or segments >= self.max_segments):
+                    self._compact_day(key, day)
+                    compacted += 1
+        return compacted
+
+    def _compact_day(self, key, day):
+        with self._lock:
+            day_dir = self._day_dir(key, day)
+            segments = self._days(key)[day]
+            readings = self._read_files(day_dir, segments)
+            _save(os.path.join(day_dir, "day.npy"), readings)
+            for name in segments:
+                os.remove(os.path.join(day_dir, name))
+            self._layouts[key][day] = []
+
+            row = _combine(_as_rollup(readings, np.full(len(readings), day)), np.full(len(readings), day))
+            rollup = self._rollup(key)
+            rollup = np.concatenate([rollup[rollup["day"] != day], row])
+            rollup = rollup[np.argsort(rollup["day"], kind="stable")]
+            _save(os.path.join(self.root, key, "daily.npy"), rollup)
+            self._rollups[key] = rollup
+            self.stats["compactions"] += 1
+
+    def _background(self):
+        last_compaction = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    self.compact()
+                    last_compaction = time.monotonic()
+            except OSError:
+                pass  # disk trouble; unwritten rows stay buffered and compaction is retried next round
+
+    # --------------------------
+    # Reads
+    # --------------------------
+    def _day_dir(self, key, day):
+        return os.path.join(self.root, key, _day_name(day))
+
+    def _cities(self):
+        return [d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d))]
+
+    @staticmethod
+    def _segments(day_dir):
+        return sorted(n for n in os.listdir(day_dir) if n.startswith("seg-") and n.endswith(".npy"))
+
+    def _days(self, key):
+        """{day: [segment names]} for every day directory of a city (call with the lock held).
+
+        Read from disk once per city, then kept current by flush() and
+        compaction, so queries do not list hundreds of day directories.
+        """
+        layout = self._layouts.get(key)
+        if layout is None:
+            city_dir = os.path.join(self.root, key)
+            names = os.listdir(city_dir) if os.path.isdir(city_dir) else []
+            layout = self._layouts[key] = {
+                _parse_day(name): self._segments(os.path.join(city_dir, name))
+                for name in names if os.path.isdir(os.path.join(city_dir, name))}
+        return layout
+
+    def _read_files(self, day_dir, segments):
+        parts = [np.load(os.path.join(day_dir, name)) for name in segments]
+        if os.path.exists(os.path.join(day_dir, "day.npy")):
+            parts.insert(0, np.load(os.path.join(day_dir, "day.npy")))
+        return _sorted_unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=READING_DTYPE)
+
+    def _rollup(self, key):
+        rollup = self._rollups.get(key)
+        if rollup is None:
+            path = os.path.join(self.root, key, "daily.npy")
+            rollup = np.load(path) if os.path.exists(path) else np.zeros(0, dtype=ROLLUP_DTYPE)
+            self._rollups[key] = rollup
+        return rollup
+
+    def _buffered_readings(self, key):
+        rows = self._buffer.get(key)
+        return np.array(rows, dtype=READING_DTYPE) if rows else np.zeros(0, dtype=READING_DTYPE)
+
+    def series(self, city, start, end):
+        """Readings with start <= ts < end, sorted by time."""
+        key = city_key(city)
+        first, last = int(start // DAY_SECONDS), int(end // DAY_SECONDS)
+        with self._lock:
+            parts = [self._read_files(self._day_dir(key, day), segments)
+                     for day, segments in sorted(self._days(key).items()) if first <= day <= last]
+            parts.append(self._buffered_readings(key))
+        readings = _sorted_unique(np.concatenate(parts))
+        return readings[(readings["ts"] >= start) & (readings["ts"] < end)]
+
+    def rolling_mean(self, city, start, end, window_seconds, field="temp"):
+        """(ts, mean of `field` over the trailing window_seconds) for each reading in range.
+
+        Windows of whole days give one point per day instead (ts = start of the
+        day, mean over that day and the window's earlier days), computed from
+        the daily rollup so a year-long range never reads the raw segments.
+        """
+        if window_seconds >= DAY_SECONDS and window_seconds % DAY_SECONDS == 0:
+            return self._rolling_daily_mean(city_key(city), start, end, int(window_seconds // DAY_SECONDS), field)
+        readings = self.series(city, start - window_seconds, end)
+        ts = readings["ts"]
+        v = readings[field].astype(np.float64)
+        valid = ~np.isnan(v)
+        sums = np.r_[0.0, np.cumsum(np.where(valid, v, 0.0))]
+        counts = np.r_[0, np.cumsum(valid)]
+        lo = np.searchsorted(ts, ts - window_seconds, side="right")
+        hi = np.arange(1, len(ts) + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
+        keep = ts >= start
+        return ts[keep], means[keep]
+
+    def _rolling_daily_mean(self, key, start, end, days, field):
+        first, last = int(start // DAY_SECONDS), int((end - 1) // DAY_SECONDS)
+        rows = self._daily_rows(key, first - days + 1, last)
+        day = rows["day"]
+        sums = np.r_[0.0, np.cumsum(rows[f"{field}_sum"])]
+        counts = np.r_[0, np.cumsum(rows[f"{field}_count"])]
+        lo = np.searchsorted(day, day - days, side="right")
+        hi = np.arange(1, len(day) + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
+        keep = day >= first
+        return day[keep].astype(np.float64) * DAY_SECONDS, means[keep]
+
+    def _daily_rows(self, key, first, last):
+        """Rollup rows for days first..last; days with unflushed or uncompacted data are recomputed."""
+        with self._lock:
+            days = self._days(key)
+            buffered = self._buffered_readings(key)
+            pending = {d for d, segments in days.items() if segments and first <= d <= last}
+            pending.update(int(d) for d in np.unique(buffered["ts"] // DAY_SECONDS) if first <= d <= last)
+            rollup = self._rollup(key)
+            rollup = rollup[(rollup["day"] >= first) & (rollup["day"] <= last)]
+            rollup = rollup[~np.isin(rollup["day"], list(pending))]
+            parts = [rollup]
+            for day in sorted(pending):
+                readings = self._read_files(self._day_dir(key, day), days.get(day, []))
+                readings = _sorted_unique(np.concatenate(
+                    [readings, buffered[(buffered["ts"] // DAY_SECONDS) == day]]))
+                ids = np.full(len(readings), day)
+                parts.append(_combine(_as_rollup(readings, ids), ids))
+        rows = np.concatenate(parts)
+        return rows[np.argsort(rows["day"], kind="stable")]
+
+    def daily(self, city, start, end):
+        """Per-UTC-day count/mean/min/max for days overlapping [start, end)."""
+        rows = self._daily_rows(city_key(city), int(start // DAY_SECONDS), int((end - 1) // DAY_SECONDS))
+        return summarize(rows, DAY_SECONDS)
+
+    def downsample(self, city, start, end, bucket_seconds):
+        """Buckets of bucket_seconds (aligned to the epoch) with count/mean/min/max."""
+        if bucket_seconds >= DAY_SECONDS and bucket_seconds % DAY_SECONDS == 0:
+            # Whole-day buckets come straight from the daily rollup
+            rows = self._daily_rows(city_key(city), int(start // DAY_SECONDS), int((end - 1) // DAY_SECONDS))
+            k = bucket_seconds // DAY_SECONDS
+            return summarize(_combine(rows, rows["day"] // k), bucket_seconds)
+        readings = self.series(city, start, end)
+        ids = (readings["ts"] // bucket_seconds).astype(np.int64)
+        return summarize(_combine(_as_rollup(readings, ids), ids), bucket_seconds)
+
+    def cities(self):
+        """City keys that have readings on disk or in the buffer."""
+        with self._lock:
+            return sorted(set(self._cities()) | set(self._buffer))
@@ -0,0 +1,281 @@
+# community_board.py
+"""Shared, append-only post log for the EcoGamify Community Board.
+
+Posts are numbered 0, 1, 2, ... and stored in fixed-size segments of
+`segment_posts` posts each:
+
+    community_board/seg-000000.log   the posts, UTF-8 JSON, back to back
+    community_board/seg-000000.idx   one (offset, length) entry per post, 12 bytes each
+
+Post n lives in segment n // segment_posts at slot n % segment_posts, so
+finding it is arithmetic. A page of consecutive posts costs one read of
+their index entries and one read of their bytes, whatever the board's size:
+
+    posts, cursor = board.page(limit=20)                 # newest 20
+    posts, cursor = board.page(before=cursor, limit=20)  # the 20 before those
+
+Writes are batched: post() queues and returns (blocking only if max_pending
+posts are already waiting), and one writer thread appends everything queued
+so far to the data and index files (data first, so a crash can only leave
+unindexed bytes, which are trimmed on the next start). A post becomes
+readable only once both writes are done; flush() waits for it. subscribe()
+registers a callback that receives each appended batch, e.g. for search.
+
+If an append fails (disk full, I/O error) the board stops taking posts: the
+writer keeps draining the queue so nobody blocks, drops what it drains, and
+post() and flush() raise BoardError with the cause.
+
+A board directory has a single writer: post ids come from an in-memory
+counter and appends are positioned by this process's view of the files, so
+two processes appending would hand out the same ids and interleave segments.
+The board holds an exclusive lock on <root>/writer.lock while it is open, and
+opening a second CommunityBoard on the same directory, in this process or
+another, raises BoardError. Run the pages that post in one server process.
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+INDEX_ENTRY = struct.Struct("<QI")   # offset, length
+_STOP = object()
+
+
+class BoardError(RuntimeError):
+    """The board cannot take posts: its writer failed (see __cause__), or another writer holds the directory."""
+
+
+def _lock_writer(root):
+    """Open and exclusively lock root/writer.lock, or raise BoardError if another board holds it."""
+    f = open(os.path.join(root, "writer.lock"), "a+")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.seek(0)
+        holder = f.read().strip() or "unknown"
+        f.close()
+        raise BoardError(f"{root} is already open for writing by pid {holder}; "
+                         "a board directory supports a single writing process") from None
+    f.seek(0)
+    f.truncate()
+    f.write(str(os.getpid()))
+    f.flush()
+    return f
+
+
+class CommunityBoard:
+    def __init__(self, root="community_board", segment_posts=65536, batch_size=512, open_segments=64,
+                 max_pending=65536):
+        self.root = root
+        self.segment_posts = segment_posts
+        self.batch_size = batch_size
+        self.open_segments = open_segments
+        os.makedirs(root, exist_ok=True)
+        self._writer_lock = _lock_writer(root)   # held until close()
+        self._lock = threading.Lock()
+        self._count = self._recover()   # only the writer thread changes it after this
+        self._readers = OrderedDict()   # segment -> (data fd, index fd)
+        self._writer_files = None       # (segment, data file, index file, data size)
+        self._queue = queue.Queue(maxsize=max_pending)   # post() blocks when the writer falls this far behind
+        self.stats = {"posts": 0, "batches": 0, "max_batch": 0, "dropped": 0}
+        self.error = None   # the exception that stopped the writer, if any
+        self._subscribers = []
+        self._writer = threading.Thread(target=self._run, name="community-board-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _paths(self, segment):
+        base = os.path.join(self.root, f"seg-{segment:06d}")
+        return base + ".log", base + ".idx"
+
+    def _recover(self):
+        """Post count from the files on disk, trimming any half-written tail."""
+        segments = sorted(int(name[4:10]) for name in os.listdir(self.root)
+                          if name.startswith("seg-") and name.endswith(".idx"))
+        if not segments:
+            return 0
+        last = segments[-1]
+        data_path, index_path = self._paths(last)
+        entries = os.path.getsize(index_path) // INDEX_ENTRY.size
+        end = 0
+        with open(index_path, "r+b") as f:
+            f.truncate(entries * INDEX_ENTRY.size)
+            if entries:
+                f.seek((entries - 1) * INDEX_ENTRY.size)
+                offset, length = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+                end = offset + length
+        with open(data_path, "ab") as f:
+            f.truncate(end)
+        return last * self.segment_posts + entries
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def post(self, user, text, ts=None):
+        """Queue a post; it is readable once the writer has appended it (see flush())."""
+        self._check()
+        if not self._writer.is_alive():
+            raise RuntimeError("the board is closed")
+        self._queue.put({"user": user, "text": text, "ts": time.time() if ts is None else ts})
+
+    def subscribe(self, callback):
+        """Call callback(first_id, posts) in the writer thread after each batch is readable."""
+        self._subscribers.append(callback)
+
+    def flush(self, timeout=None):
+        """Block until every post queued before this call is readable.
+
+        Returns False on timeout, or if the board is closed with posts still
+        queued; raises BoardError if the writer failed.
+        """
+        self._check()
+        if not self._writer.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            return False
+        self._check()
+        return True
+
+    def _check(self):
+        if self.error is not None:
+            raise BoardError(f"community board writer failed: {self.error}") from self.error
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        if self._writer_files:
+            self._writer_files[1].close()
+            self._writer_files[2].close()
+        with self._lock:
+            for data_fd, index_fd in self._readers.values():
+                os.close(data_fd)
+                os.close(index_fd)
+            self._readers.clear()
+        self._writer_lock.close()   # closing the file releases the lock
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            posts = [item for item in batch if isinstance(item, dict)]
+            if posts and self.error is None:
+                try:
+                    self._append(posts)
+                except Exception as e:
+                    self.error = e   # the files may end mid-batch; _recover() trims them on the next start
+            if posts and self.error is not None:
+                with self._lock:
+                    self.stats["dropped"] += len(posts)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if _STOP in batch:
+                return
+
+    def _segment_files(self, segment):
+        if self._writer_files is None or self._writer_files[0] != segment:
+            if self._writer_files:
+                self._writer_files[1].close()
+                self._writer_files[2].close()
+            data_path, index_path = self._paths(segment)
+            data = open(data_path, "ab")
+            self._writer_files = [segment, data, open(index_path, "ab"), data.tell()]
+        return self._writer_files
+
+    def _append(self, posts):
+        first_id = next_id = self._count   # only this thread changes the count
+        i = 0
+        while i < len(posts):
+            segment, slot = divmod(next_id, self.segment_posts)
+            chunk = posts[i:i + self.segment_posts - slot]
+            files = self._segment_files(segment)
+            data, index = bytearray(), bytearray()
+            for post in chunk:
+                record = json.dumps(post, ensure_ascii=False).encode("utf-8")
+                index += INDEX_ENTRY.pack(files[3] + len(data), len(record))
+                data += record
+            files[1].write(data)
+            files[1].flush()
+            files[2].write(index)
+            files[2].flush()
+            files[3] += len(data)
+            next_id += len(chunk)
+            i += len(chunk)
+        with self._lock:
+            self._count = next_id
+            self.stats["posts"] += len(posts)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(posts))
+        for callback in self._subscribers:
+            try:
+                callback(first_id, posts)
+            except Exception:
+                pass  # a broken subscriber must not stop the board
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def _fds(self, segment):
+        # Called with the lock held, so an evicted descriptor is never closed mid-read
+        fds = self._readers.get(segment)
+        if fds is None:
+            data_path, index_path = self._paths(segment)
+            fds = self._readers[segment] = (os.open(data_path, os.O_RDONLY), os.open(index_path, os.O_RDONLY))
+            while len(self._readers) > self.open_segments:
+                for fd in self._readers.popitem(last=False)[1]:
+                    os.close(fd)
+        self._readers.move_to_end(segment)
+        return fds
+
+    def read_range(self, lo, hi):
+        """Posts lo..hi-1 in id order; two reads per segment touched."""
+        posts = []
+        while lo < hi:
+            segment, slot = divmod(lo, self.segment_posts)
+            n = min(hi - lo, self.segment_posts - slot)
+            with self._lock:
+                data_fd, index_fd = self._fds(segment)
+                raw = os.pread(index_fd, n * INDEX_ENTRY.size, slot * INDEX_ENTRY.size)
+                entries = list(INDEX_ENTRY.iter_unpack(raw))
+                start = entries[0][0]
+                blob = os.pread(data_fd, entries[-1][0] + entries[-1][1] - start, start)
+            for i, (offset, length) in enumerate(entries):
+                post = json.loads(blob[offset - start:offset - start + length])
+                post["id"] = lo + i
+                posts.append(post)
+            lo += n
+        return posts
+
+    def get(self, post_id):
+        if not 0 <= post_id < len(self):
+            raise IndexError(post_id)
+        return self.read_range(post_id, post_id + 1)[0]
+
+    def page(self, before=None, limit=20):
+        """(posts newest first, cursor for the next older page or None).
+
+        `before` is the cursor returned by the previous call (None = newest).
+        """
+        total = len(self)
+        hi = total if before is None else min(before, total)
+        lo = max(0, hi - limit)
+        posts = self.read_range(lo, hi)
+        posts.reverse()
+        return posts, (lo if lo > 0 else None)
@@ -0,0 +1,402 @@
+# corpus_ingest.py
+"""Incremental corpus ingestion for the Climate AI Tutor index.
+
+    python corpus_ingest.py --source-dir corpus/            # offline, local HTML/text
+    python corpus_ingest.py --source-dir corpus/ --url https://climate.nasa.gov/evidence/
+    python corpus_ingest.py --source-dir corpus/ --full     # rebuild from scratch
+
+The index directory (see faiss_store.py) gets a manifest.json next to it:
+
+    {"version": 1,
+     "sources": {"corpus/nasa.html": {"hash": "<sha256>", "chunks": ["<chunk id>", ...]}}}
+
+Ingestion runs as a three-stage pipeline (parse in a process pool, diff into
+a bounded queue, embed in fixed-size batches) and prints chunks/s per stage,
+so large local corpora are indexed here rather than inside the Streamlit app.
+
+Sources whose content hash is unchanged are skipped without being parsed.
+Changed sources are re-split, and chunk ids are derived from the chunk text,
+so only chunks whose text actually changed are embedded. Chunks that
+disappeared are deleted from the index, new ones are appended. An index
+without a manifest (e.g. one migrated from the old pickle) is rebuilt in full.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from bs4 import BeautifulSoup
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import WebBaseLoader
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+
+import faiss_store
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+INDEX_DIR = "climate_faiss"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+DEFAULT_URLS = [
+    "https://climate.nasa.gov/evidence/",
+    "https://www.ipcc.ch/report/ar6/syr/",
+    "https://www.unep.org/resources/emissions-gap-report-2023"
+]
+
+HTML_EXTENSIONS = {".html", ".htm"}
+TEXT_EXTENSIONS = {".txt", ".md"}
+
+
+class IngestError(ValueError):
+    """The index cannot be brought up to date as asked (main() turns it into an exit message)."""
+
+
+# ---------------------------
+# Sources
+# ---------------------------
+def list_sources(source_dir=None, urls=()):
+    """Return source names: local HTML/text files under source_dir, then URLs."""
+    sources = []
+    if source_dir:
+        for root, _, files in os.walk(source_dir):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in HTML_EXTENSIONS | TEXT_EXTENSIONS:
+                    sources.append(os.path.join(root, name))
+    sources.extend(urls)
+    return sources
+
+
+def read_source(source):
+    """Return (content_hash, raw) for a source; raw is bytes for files, text for URLs."""
+    if source.startswith(("http://", "https://")):
+        raw = "\n".join(d.page_content for d in WebBaseLoader(source).load())
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest(), raw
+    with open(source, "rb") as f:
+        raw = f.read()
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def extract_text(source, raw):
+    """Plain text of a source: HTML is stripped to its visible text."""
+    if isinstance(raw, str):
+        return raw
+    if os.path.splitext(source)[1].lower() in HTML_EXTENSIONS:
+        return BeautifulSoup(raw, "html.parser").get_text()
+    return raw.decode("utf-8", errors="replace")
+
+
+def chunk_ids(source, chunks):
+    """Stable ids from chunk content; repeated chunks in one source get a suffix."""
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.sha256(f"{source}\0{chunk}".encode("utf-8")).hexdigest()[:24]
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        ids.append(digest if n == 0 else f"{digest}-{n}")
+    return ids
+
+
+# ---------------------------
+# Manifest
+# ---------------------------
+def has_manifest(index_dir):
+    return os.path.exists(os.path.join(index_dir, MANIFEST_FILE))
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "sources": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise IngestError(f"Unsupported manifest version in {path}; rerun with --full.")
+    return manifest
+
+
+def save_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+# ---------------------------
+# Pipeline stages
+# ---------------------------
+# 1. parse:  read, hash, strip HTML and split, in a process pool
+# 2. diff:   compare against the manifest and stream new chunks into a bounded queue
+# 3. embed:  embed fixed-size batches and append each one to the index as it arrives
+#
+# At most `workers * 2` parse results and `queue_size` chunks are in flight, so
+# peak memory is bounded by those and the index itself, not by corpus size.
+
+_DONE = object()
+_PUT_POLL = 0.1
+_text_splitter = None
+
+
+def parse_source(source, old_hash):
+    """Stage 1 worker: return (source, hash, chunks), chunks=None if unchanged."""
+    global _text_splitter
+    content_hash, raw = read_source(source)
+    if content_hash == old_hash:
+        return source, content_hash, None
+    if _text_splitter is None:
+        _text_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
+    return source, content_hash, _text_splitter.split_text(extract_text(source, raw))
+
+
+def _parse_stage(sources, old_sources, workers, timer):
+    """Yield stage 1 results with a bounded number of futures in flight."""
+    pending = set()
+    sources = iter(sources)
+    timer.count("parse", 0)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    source = next(sources, None)
+                    if source is None:
+                        break
+                    old = old_sources.get(source)
+                    pending.add(pool.submit(parse_source, source, old["hash"] if old else None))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source, content_hash, chunks = future.result()
+                    timer.count("parse", len(chunks) if chunks is not None else 0)
+                    yield source, content_hash, chunks
+        except BaseException:
+            # A failed parse or a consumer that stopped early: drop queued parses
+            # instead of waiting for them on the way out of the pool.
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _put(chunk_queue, item, stop):
+    """Put onto the bounded queue, giving up once the consumer has stopped."""
+    while not stop.is_set():
+        try:
+            chunk_queue.put(item, timeout=_PUT_POLL)
+            return
+        except queue.Full:
+            pass
+    raise _Stopped
+
+
+def _drain(chunk_queue):
+    try:
+        while True:
+            chunk_queue.get_nowait()
+    except queue.Empty:
+        pass
+
+
+def _diff_stage(parsed, old_sources, new_sources, stale_ids, stats, chunk_queue, timer, stop):
+    """Stage 2: manifest diff; puts (text, metadata, id) records on chunk_queue."""
+    timer.count("diff", 0)
+    try:
+        for source, content_hash, chunks in parsed:
+            old = old_sources.get(source)
+            if chunks is None:
+                new_sources[source] = old
+                stats["sources_unchanged"] += 1
+                stats["chunks_kept"] += len(old["chunks"])
+                continue
+            ids = chunk_ids(source, chunks)
+            old_ids = set(old["chunks"]) if old else set()
+            for chunk, _id in zip(chunks, ids):
+                if _id not in old_ids:
+                    _put(chunk_queue, (chunk, {"source": source}, _id), stop)
+                    timer.count("diff", 1)
+            current = set(ids)
+            stale_ids.extend(_id for _id in old_ids if _id not in current)
+            stats["chunks_kept"] += len(old_ids & current)
+            new_sources[source] = {"hash": content_hash, "chunks": ids}
+            stats["sources_changed"] += 1
+        _put(chunk_queue, _DONE, stop)
+    except _Stopped:
+        pass
+    except BaseException as e:
+        try:
+            _put(chunk_queue, e, stop)
+        except _Stopped:
+            pass
+    finally:
+        parsed.close()
+
+
+class StageTimer:
+    """Per-stage chunk counts and busy intervals, reported as chunks/s."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chunks = {"parse": 0, "diff": 0, "embed": 0}
+        self.start = {}
+        self.end = {}
+        self.embed_seconds = 0.0
+
+    def count(self, stage, n):
+        now = time.perf_counter()
+        with self._lock:
+            self.start.setdefault(stage, now)
+            self.end[stage] = now
+            self.chunks[stage] += n
+
+    def report(self):
+        rates = {}
+        for stage, n in self.chunks.items():
+            if stage == "embed":
+                seconds = self.embed_seconds
+            else:
+                seconds = self.end.get(stage, 0) - self.start.get(stage, 0)
+            rates[stage] = {"chunks": n, "seconds": round(seconds, 2),
+                            "chunks_per_s": round(n / seconds, 1) if seconds > 0 else None}
+        return rates
+
+
+# ---------------------------
+# Ingestion
+# ---------------------------
+def ingest(source_dir=None, urls=(), index_dir=INDEX_DIR, embeddings=None, full=False,
+           workers=None, batch_size=64, queue_size=1024, progress=None):
+    """Bring the index in index_dir up to date with the sources. Returns a stats dict."""
+    t0 = time.perf_counter()
+    embeddings = embeddings or HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    workers = workers or os.cpu_count() or 1
+
+    vectorstore = None
+    manifest = {"version": MANIFEST_VERSION, "sources": {}}
+    # Without a manifest nothing in the index can be matched to a source, so rebuild it
+    full = full or not has_manifest(index_dir)
+    if not full and faiss_store.exists(index_dir):
+        manifest = load_manifest(index_dir)
+        vectorstore = faiss_store.load_vectorstore(index_dir, embeddings, mmap_index=False)
+        known = sum(len(entry["chunks"]) for entry in manifest["sources"].values())
+        if known != vectorstore.index.ntotal:
+            raise IngestError(f"Manifest lists {known} chunks but the index holds "
+                             f"{vectorstore.index.ntotal}; rerun with --full.")
+
+    stats = {"sources_unchanged": 0, "sources_changed": 0, "sources_removed": 0,
+             "chunks_kept": 0, "chunks_added": 0, "chunks_removed": 0}
+    old_sources = manifest["sources"]
+    new_sources = {}
+    stale_ids = []
+    timer = StageTimer()
+    chunk_queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    parsed = _parse_stage(list_sources(source_dir, urls), old_sources, workers, timer)
+    producer = threading.Thread(
+        target=_diff_stage,
+        args=(parsed, old_sources, new_sources, stale_ids, stats, chunk_queue, timer, stop),
+        daemon=True,
+    )
+    producer.start()
+
+    # Stage 3 runs here, pulling fixed-size batches off the queue. On failure the
+    # stop event plus a drain unblock the diff thread, which cancels queued parses.
+    batch = []
+    try:
+        while True:
+            item = chunk_queue.get()
+            if isinstance(item, BaseException):
+                raise item
+            if item is not _DONE:
+                batch.append(item)
+            if batch and (len(batch) >= batch_size or item is _DONE):
+                vectorstore = _embed_batch(vectorstore, embeddings, batch, timer)
+                stats["chunks_added"] += len(batch)
+                batch = []
+                if progress:
+                    progress(stats["chunks_added"], timer.report())
+            if item is _DONE:
+                break
+    except IngestError:
+        raise
+    except Exception as e:
+        raise IngestError(f"Ingestion failed: {e}") from e
+    finally:
+        stop.set()
+        _drain(chunk_queue)
+        producer.join()
+
+    for source, old in old_sources.items():
+        if source not in new_sources:
+            stale_ids.extend(old["chunks"])
+            stats["sources_removed"] += 1
+    if vectorstore is None:
+        raise IngestError("No sources found to index.")
+    if stale_ids:
+        vectorstore.delete(stale_ids)
+
+    stats["chunks_removed"] = len(stale_ids)
+    if stale_ids or stats["chunks_added"] or full or not faiss_store.exists(index_dir):
+        faiss_store.save_vectorstore(vectorstore, index_dir)
+    manifest["sources"] = new_sources
+    save_manifest(index_dir, manifest)
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    stats["stages"] = timer.report()
+    return stats
+
+
+def _embed_batch(vectorstore, embeddings, batch, timer):
+    texts = [text for text, _, _ in batch]
+    metadatas = [metadata for _, metadata, _ in batch]
+    ids = [_id for _, _, _id in batch]
+    t0 = time.perf_counter()
+    pairs = list(zip(texts, embeddings.embed_documents(texts)))
+    if vectorstore is None:
+        vectorstore = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas, ids=ids)
+    else:
+        vectorstore.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+    timer.embed_seconds += time.perf_counter() - t0
+    timer.count("embed", len(batch))
+    return vectorstore
+
+
+def _print_progress(added, rates):
+    line = "  ".join(f"{stage} {r['chunks_per_s'] or 0:>8.1f} chunks/s" for stage, r in rates.items())
+    print(f"[{added:>8} embedded]  {line}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally (re)build the Climate AI Tutor index.")
+    parser.add_argument("--source-dir", help="directory of .html/.htm/.txt/.md files")
+    parser.add_argument("--url", action="append", default=[], help="extra URL source (repeatable)")
+    parser.add_argument("--default-urls", action="store_true", help="also ingest the tutor's built-in URLs")
+    parser.add_argument("--index", default=INDEX_DIR, help="index directory (default: %(default)s)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-embed everything")
+    parser.add_argument("--workers", type=int, default=None, help="parse processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embedding batch")
+    parser.add_argument("--queue-size", type=int, default=1024, help="max chunks waiting to be embedded")
+    parser.add_argument("--quiet", action="store_true", help="no per-batch throughput lines")
+    args = parser.parse_args()
+
+    urls = args.url + (DEFAULT_URLS if args.default_urls else [])
+    if not args.source_dir and not urls:
+        parser.error("give --source-dir and/or --url/--default-urls")
+    try:
+        stats = ingest(args.source_dir, urls, args.index, full=args.full,
+                       workers=args.workers, batch_size=args.batch_size, queue_size=args.queue_size,
+                       progress=None if args.quiet else _print_progress)
+    except IngestError as e:
+        raise SystemExit(str(e))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# faiss_store.py
+"""On-disk format for the Climate AI Tutor vector index.
+
+climate_faiss.pkl pickles the whole LangChain FAISS object, so every Streamlit
+worker deserializes its own private copy of the vectors and the docstore. This
+module writes the pieces separately instead:
+
+    climate_faiss/
+        current            name of the live build directory
+        v<timestamp>-<pid>/
+            index.faiss    raw FAISS index (faiss.write_index)
+            docs.jsonl     one JSON document per vector, in index order
+            docs.offsets   native uint64 byte offset of each line in docs.jsonl
+            meta.json      format version, vector count and dimension
+
+Every save writes a fresh build directory and then publishes it by replacing
+`current` with os.replace, so a loader sees either the old build or the new
+one, never a mix. The previous build is kept for loaders that resolved
+`current` just before the swap; older ones are removed.
+
+For serving, index.faiss is opened with IO_FLAG_MMAP and the docstore files
+are mmap'd, so all workers share one page-cached copy. For rebuilding, the
+same files load into a regular writable FAISS object.
+"""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import time
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+FORMAT_VERSION = 1
+
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.jsonl"
+OFFSETS_FILE = "docs.offsets"
+META_FILE = "meta.json"
+CURRENT_FILE = "current"
+KEEP_BUILDS = 2
+BUILD_NAME = re.compile(r"v(\d+)-\d+")
+
+
+# ---------------------------
+# Read-only, memory-mapped docstore
+# ---------------------------
+class _PositionalIds:
+    """index_to_docstore_id stand-in: vector position i maps to docstore id i."""
+
+    def __init__(self, count):
+        self._count = count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise KeyError(i)
+        return int(i)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, i):
+        return isinstance(i, int) and 0 <= i < self._count
+
+    def __iter__(self):
+        return iter(range(self._count))
+
+    def keys(self):
+        return range(self._count)
+
+    def values(self):
+        return range(self._count)
+
+    def items(self):
+        return ((i, i) for i in range(self._count))
+
+
+class MmapDocstore(Docstore):
+    """Docstore that reads documents lazily from mmap'd docs.jsonl by position."""
+
+    def __init__(self, path):
+        self._docs_file = open(os.path.join(path, DOCS_FILE), "rb")
+        self._offsets_file = open(os.path.join(path, OFFSETS_FILE), "rb")
+        self._docs = _map(self._docs_file)
+        self._offsets_map = _map(self._offsets_file)
+        self._offsets = memoryview(self._offsets_map).cast("Q") if self._offsets_map else []
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def search(self, search):
+        row = int(search)
+        if not 0 <= row < len(self._offsets):
+            return f"ID {search} not found."
+        start = self._offsets[row]
+        end = self._offsets[row + 1] if row + 1 < len(self._offsets) else len(self._docs)
+        record = json.loads(self._docs[start:end])
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+
+def _map(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ---------------------------
+# Save / load
+# ---------------------------
+def exists(path):
+    """True if `path` holds a complete index in this format."""
+    build = _current_build(path)
+    return build is not None and os.path.exists(os.path.join(build, META_FILE))
+
+
+def save_vectorstore(vectorstore, path):
+    """Write a LangChain FAISS vectorstore to `path` in the split format."""
+    os.makedirs(path, exist_ok=True)
+    name = f"v{time.time_ns()}-{os.getpid()}"
+    build = os.path.join(path, name)
+    os.makedirs(build)
+    index = vectorstore.index
+
+    offsets = bytearray()
+    with open(os.path.join(build, DOCS_FILE), "wb") as f:
+        for i in range(index.ntotal):
+            _id = vectorstore.index_to_docstore_id[i]
+            doc = vectorstore.docstore.search(_id)
+            offsets += f.tell().to_bytes(8, sys.byteorder)
+            line = json.dumps(
+                {"id": str(_id), "page_content": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False,
+            )
+            f.write(line.encode("utf-8") + b"\n")
+        _sync(f)
+    with open(os.path.join(build, OFFSETS_FILE), "wb") as f:
+        f.write(offsets)
+        _sync(f)
+    faiss.write_index(index, os.path.join(build, INDEX_FILE))
+    with open(os.path.join(build, META_FILE), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "ntotal": index.ntotal, "dim": index.d}, f)
+        _sync(f)
+
+    # Publish the whole build with one atomic pointer swap.
+    pointer = os.path.join(path, CURRENT_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(name)
+        _sync(f)
+    os.replace(pointer + ".tmp", pointer)
+    _prune(path, keep=name)
+
+
+def load_vectorstore(path, embeddings, mmap_index=True):
+    """Load an index written by save_vectorstore().
+
+    With mmap_index=True (the serving path) the FAISS index and docstore are
+    memory-mapped and read-only. With mmap_index=False everything is read into
+    a normal, writable FAISS object keyed by the stored chunk ids.
+    """
+    build = _current_build(path)
+    if build is None:
+        raise FileNotFoundError(f"No index has been published in {path}")
+    path = build
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version {meta.get('version')} in {path}")
+
+    index_path = os.path.join(path, INDEX_FILE)
+    if not mmap_index:
+        index = faiss.read_index(index_path)
+        docstore, index_to_id = _read_docs(path)
+        return FAISS(embeddings, index, docstore, index_to_id)
+
+    # IO_FLAG_MMAP_IFC maps flat (IndexFlatCodes) storage on newer FAISS builds;
+    # older builds only honour IO_FLAG_MMAP for IVF lists and fall back to a read.
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    try:
+        index = faiss.read_index(index_path, flags)
+    except RuntimeError:
+        index = faiss.read_index(index_path)
+    docstore = MmapDocstore(path)
+    return FAISS(embeddings, index, docstore, _PositionalIds(len(docstore)))
+
+
+def _read_docs(path):
+    docs = {}
+    index_to_id = {}
+    with open(os.path.join(path, DOCS_FILE), encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            record = json.loads(line)
+            docs[record["id"]] = Document(page_content=record["page_content"], metadata=record["metadata"])
+            index_to_id[i] = record["id"]
+    return InMemoryDocstore(docs), index_to_id
+
+
+def _current_build(path):
+    """Directory of the published build, or None if nothing has been published."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        # Indexes written before builds were versioned keep their files in `path`
+        return path if os.path.exists(os.path.join(path, META_FILE)) else None
+    return os.path.join(path, name)
+
+
+def _prune(path, keep):
+    """Remove all but the newest KEEP_BUILDS builds (never the live one)."""
+    builds = sorted((n for n in os.listdir(path) if BUILD_NAME.fullmatch(n) and
+                     os.path.isdir(os.path.join(path, n))),
+                    key=lambda n: int(BUILD_NAME.fullmatch(n).group(1)))
+    for name in builds[:-KEEP_BUILDS]:
+        if name != keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
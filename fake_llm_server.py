@@ -0,0 +1,150 @@
+# fake_llm_server.py
+"""Local stand-in for the Groq chat completions API, for testing without a key.
+
+    python fake_llm_server.py --port 8787 --ttft 0.3 --token-delay 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8787 GROQ_API_KEY=fake streamlit run awareness_hub.py
+
+Serves POST /openai/v1/chat/completions in both the plain JSON and the
+`stream=True` server-sent-events shape. Replies echo the last user message,
+or are a JSON array of quiz questions when the prompt asks for them.
+--throttle answers a fraction of requests with 429 + Retry-After to exercise
+llm_client's backoff and circuit breaker.
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+def reply_for(messages):
+    """Canned reply text for a chat request."""
+    prompt = messages[-1]["content"] if messages else ""
+    if "multiple-choice questions" in prompt:
+        match = re.search(r"Generate (\d+)", prompt)
+        n = int(match.group(1)) if match else 5
+        questions = [{
+            "question": f"Sample climate question {i + 1}?",
+            "options": ["A) Carbon dioxide", "B) Oxygen", "C) Nitrogen", "D) Argon"],
+            "answer": "A",
+        } for i in range(n)]
+        return json.dumps(questions, indent=2)
+    return ("This is a locally generated answer from the fake LLM server. "
+            f"You asked: {prompt.strip()[:200]} "
+            "Climate change is driven mainly by greenhouse gas emissions from burning fossil fuels.")
+
+
+def tokenize(text):
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class FakeCompletionsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != COMPLETIONS_PATH:
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = body.get("model", "fake-model")
+        if random.random() < self.server.throttle:
+            self._rate_limited()
+            return
+        text = reply_for(body.get("messages", []))
+        time.sleep(self.server.ttft)
+        if body.get("stream"):
+            self._stream(model, text)
+        else:
+            self._json(model, text)
+
+    def _rate_limited(self):
+        payload = json.dumps({"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                                        "code": "rate_limit_exceeded"}}).encode()
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Retry-After", str(self.server.retry_after))
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self, model, text):
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokenize(text)), "total_tokens": len(tokenize(text))},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, model, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for token in tokenize(text):
+                self._event(model, {"content": token}, None)
+                time.sleep(self.server.token_delay)
+            self._event(model, {}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-stream (cancelled request)
+        self.close_connection = True
+
+    def _event(self, model, delta, finish_reason):
+        chunk = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8787, ttft=0.3, token_delay=0.02, quiet=False,
+                throttle=0.0, retry_after=1):
+    server = ThreadingHTTPServer((host, port), FakeCompletionsHandler)
+    server.ttft = ttft
+    server.token_delay = token_delay
+    server.throttle = throttle
+    server.retry_after = retry_after
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument("--throttle", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.ttft, args.token_delay, args.quiet,
+                         args.throttle, args.retry_after)
+    print(f"Fake LLM server on http://{args.host}:{args.port}{COMPLETIONS_PATH}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# fake_weather_server.py
+"""Local stand-in for the OpenWeatherMap current weather API, for testing without a key.
+
+    python fake_weather_server.py --port 8788 --latency 0.2
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8788/data/2.5 OPENWEATHER_API_KEY=fake streamlit run climate_city.py
+
+Serves GET /data/2.5/weather?q=<city> with a deterministic reading per city
+(same city, same numbers). Cities named "nowhere..." get OpenWeatherMap's
+404 "city not found". --fail-rate answers a fraction of requests with 503 and
+--throttle-rate with 429 plus Retry-After: --retry-after, to exercise
+weather_client's stale-on-error and rate-limit paths. GET /stats returns how many
+weather requests were served, so tests can count upstream calls.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WEATHER_PATH = "/data/2.5/weather"
+DESCRIPTIONS = ["clear sky", "few clouds", "scattered clouds", "light rain", "haze", "mist"]
+
+
+def reading_for(city):
+    """Deterministic OpenWeatherMap-shaped payload for a city."""
+    h = int(hashlib.sha1(city.casefold().encode()).hexdigest(), 16)
+    return {
+        "cod": 200,
+        "name": city.title(),
+        "sys": {"country": ["IN", "US", "GB", "DE", "BR", "JP"][h % 6]},
+        "main": {"temp": round(-5 + (h % 4000) / 100, 1), "humidity": 20 + h % 75},
+        "wind": {"speed": round((h >> 12) % 150 / 10, 1)},
+        "weather": [{"description": DESCRIPTIONS[(h >> 20) % len(DESCRIPTIONS)]}],
+    }
+
+
+class FakeWeatherHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self._json(200, {"requests": self.server.requests})
+            return
+        if url.path != WEATHER_PATH:
+            self._json(404, {"cod": "404", "message": "Internal error"})
+            return
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        if random.random() < self.server.fail_rate:
+            self._json(503, {"cod": 503, "message": "Service Unavailable"})
+            return
+        if random.random() < self.server.throttle_rate:
+            self._json(429, {"cod": 429, "message": "Your account is temporary blocked due to exceeding of "
+                                                    "requests limitation of your subscription type."},
+                       {"Retry-After": str(self.server.retry_after)})
+            return
+        city = parse_qs(url.query).get("q", [""])[0]
+        if not city or city.casefold().startswith("nowhere"):
+            self._json(404, {"cod": "404", "message": "city not found"})
+            return
+        self._json(200, reading_for(city))
+
+    def _json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet:
+            super().log_message(fmt, *args)
+
+
+class FakeWeatherServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # the default backlog of 5 drops bursts of concurrent connects (1 s SYN retry)
+
+
+def make_server(host="127.0.0.1", port=8788, latency=0.2, fail_rate=0.0, quiet=False,
+                throttle_rate=0.0, retry_after=30):
+    server = FakeWeatherServer((host, port), FakeWeatherHandler)
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.throttle_rate = throttle_rate
+    server.retry_after = retry_after
+    server.quiet = quiet
+    server.requests = 0
+    server.lock = threading.Lock()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenWeatherMap server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=30, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency, args.fail_rate, args.quiet,
+                         args.throttle_rate, args.retry_after)
+    print(f"Fake weather server on http://{args.host}:{args.port}{WEATHER_PATH}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# footprint_engine.py
+"""Shared, data-driven carbon footprint engine.
+
+Emission factors live in emission_factors.json, a versioned table of
+kg CO2e per (category, unit, region). Each page has a profile there that
+says which inputs it asks for, in which unit and period, for which region
+and in which output unit. compile_profile() folds all of that into one
+coefficient array, so a single profile and a batch of millions go through
+the same `inputs * coefficients` NumPy expression:
+
+    profile = compile_profile("climate_dashboard")
+    components, total = profile.evaluate([20, 7, 300, 10])        # one person
+    components, total = profile.evaluate(matrix_of_shape_n_by_4)  # a batch
+
+The Carbon Footprint Tracker (carbon.py) uses the "carbon_tracker" profile;
+the Personal Climate Dashboard uses "climate_dashboard". run_batch() streams
+CSV or Parquet input through the carbon_tracker profile in chunks and writes
+results as it goes, so memory stays bounded by the chunk size:
+
+    python footprint_engine.py people.csv footprints.parquet --chunk-rows 500000
+
+Batch input columns: km_driven (per week), flights (per year), electricity
+(kWh per month), meat_meals (per week). Missing values count as 0.
+"""
+
+import argparse
+import json
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+FACTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "emission_factors.json")
+
+INPUT_COLUMNS = ["km_driven", "flights", "electricity", "meat_meals"]
+EMISSION_COLUMNS = ["car_kg", "flight_kg", "electricity_kg", "diet_kg"]
+
+# Tips fire above these inputs (see carbon.py footprint_tips)
+TIP_THRESHOLDS = {"km_driven": 50, "flights": 2, "electricity": 200, "meat_meals": 5}
+TIP_COLUMNS = ["tip_car", "tip_flights", "tip_electricity", "tip_diet", "tip_none"]
+
+
+# ---------------------------
+# Factor table
+# ---------------------------
+@lru_cache(maxsize=None)
+def load_factor_table(path=FACTORS_PATH):
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    table["index"] = {(e["category"], e["unit"], e["region"]): e["kg_co2e"] for e in table["factors"]}
+    return table
+
+
+class CompiledProfile:
+    """A profile's factors, unit and period conversions folded into one array."""
+
+    def __init__(self, name, version, input_names, labels, coefficients, output_unit):
+        self.name = name
+        self.version = version
+        self.input_names = input_names
+        self.labels = labels
+        self.coefficients = coefficients   # float64, shape (n_inputs,)
+        self.output_unit = output_unit
+
+    def evaluate(self, inputs):
+        """inputs shape (..., n_inputs) -> (components same shape, total shape (...))."""
+        components = np.asarray(inputs, dtype=np.float64) * self.coefficients
+        return components, components.sum(axis=-1)
+
+    def breakdown(self, *values):
+        """One profile: (total, {label: component}) as Python floats."""
+        components, total = self.evaluate(values)
+        return float(total), {label: float(c) for label, c in zip(self.labels, components)}
+
+
+@lru_cache(maxsize=None)
+def compile_profile(name, path=FACTORS_PATH):
+    table = load_factor_table(path)
+    profile = table["profiles"][name]
+    region = profile["region"]
+    scale = table["output_units"][profile["output_unit"]]
+    coefficients = []
+    for spec in profile["inputs"]:
+        key = (spec["category"], spec["unit"])
+        factor = table["index"].get(key + (region,), table["index"].get(key + ("global",)))
+        if factor is None:
+            raise KeyError(f"No emission factor for {key} in region {region!r} or 'global'")
+        coefficients.append(factor * table["periods_per_year"][spec["per"]] / scale)
+    return CompiledProfile(
+        name=name,
+        version=table["version"],
+        input_names=[spec["name"] for spec in profile["inputs"]],
+        labels=[spec["label"] for spec in profile["inputs"]],
+        coefficients=np.array(coefficients, dtype=np.float64),
+        output_unit=profile["output_unit"],
+    )
+
+
+def sweep(profile, axes):
+    """Totals over the full grid of `axes` ({input name: 1-D values}) in one pass.
+
+    Inputs not named in `axes` are held at 0 (the model is linear, so callers
+    can add their contribution afterwards). The result has one dimension per
+    profile input, in profile order, with size 1 for the fixed ones.
+    """
+    grids = np.meshgrid(*[np.asarray(axes.get(n, [0.0]), dtype=np.float64) for n in profile.input_names],
+                        indexing="ij")
+    _, totals = profile.evaluate(np.stack(grids, axis=-1))
+    return totals
+
+
+def calculate_footprint(km_driven, flights, electricity, meat_meals):
+    """Calculate annual CO2 emissions (kg): (car, flights, electricity, diet)."""
+    inputs = np.stack(np.broadcast_arrays(km_driven, flights, electricity, meat_meals), axis=-1)
+    components, _ = compile_profile("carbon_tracker").evaluate(inputs)
+    if components.ndim == 1:
+        return tuple(float(c) for c in components)
+    return tuple(components[..., i] for i in range(components.shape[-1]))
+
+
+def tip_flags(km_driven, flights, electricity, meat_meals):
+    """Which tips apply: (car, flights, electricity, diet, none) booleans or bool arrays."""
+    car = np.greater(km_driven, TIP_THRESHOLDS["km_driven"])
+    flight = np.greater(flights, TIP_THRESHOLDS["flights"])
+    elec = np.greater(electricity, TIP_THRESHOLDS["electricity"])
+    diet = np.greater(meat_meals, TIP_THRESHOLDS["meat_meals"])
+    none = ~(car | flight | elec | diet)
+    return car, flight, elec, diet, none
+
+
+def compute_columns(km_driven, flights, electricity, meat_meals):
+    """All output columns for arrays of inputs, as a dict of NumPy arrays."""
+    inputs = np.column_stack((km_driven, flights, electricity, meat_meals))
+    components, total = compile_profile("carbon_tracker").evaluate(inputs)
+    out = {c: components[:, i] for i, c in enumerate(EMISSION_COLUMNS)}
+    out["total_kg"] = total
+    out.update(zip(TIP_COLUMNS, tip_flags(km_driven, flights, electricity, meat_meals)))
+    return out
+
+
+# ---------------------------
+# Streaming batch mode
+# ---------------------------
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def iter_input_chunks(path, chunk_rows):
+    """Yield dicts of float64 input arrays, chunk_rows rows at a time, missing values as 0."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=INPUT_COLUMNS):
+            yield {c: np.nan_to_num(batch.column(c).to_numpy(zero_copy_only=False).astype(np.float64))
+                   for c in INPUT_COLUMNS}
+    else:
+        import pandas as pd
+        for frame in pd.read_csv(path, usecols=INPUT_COLUMNS, chunksize=chunk_rows):
+            # to_numpy() may return a read-only view (pandas 3), so fill in pandas, not in place
+            yield {c: frame[c].fillna(0).to_numpy(dtype=np.float64, copy=True) for c in INPUT_COLUMNS}
+
+
+class _Writer:
+    """Incremental CSV or Parquet writer for result chunks."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, columns):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table(columns)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            import pandas as pd
+            pd.DataFrame(columns).to_csv(self.path, mode="w" if self._first else "a",
+                                         header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def run_batch(input_path, output_path, chunk_rows=250_000, keep_inputs=True):
+    """Stream input_path through the engine into output_path; returns (rows, seconds)."""
+    t0 = time.perf_counter()
+    rows = 0
+    writer = _Writer(output_path)
+    try:
+        for chunk in iter_input_chunks(input_path, chunk_rows):
+            out = compute_columns(*(chunk[c] for c in INPUT_COLUMNS))
+            writer.write({**chunk, **out} if keep_inputs else out)
+            rows += len(chunk[INPUT_COLUMNS[0]])
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute carbon footprints for a CSV/Parquet file of people.")
+    parser.add_argument("input", help=".csv or .parquet with columns " + ", ".join(INPUT_COLUMNS))
+    parser.add_argument("output", help=".csv or .parquet to write")
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--results-only", action="store_true", help="do not copy input columns to the output")
+    args = parser.parse_args()
+    rows, seconds = run_batch(args.input, args.output, args.chunk_rows, keep_inputs=not args.results_only)
+    print(f"{rows:,} rows in {seconds:.2f}s ({rows / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
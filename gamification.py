@@ -1,20 +1,54 @@
+import os
+import time
+import uuid
 import streamlit as st
 import random
-import datetime
 
-# -----------------------------
-# Initialize session state
-# -----------------------------
-if "points" not in st.session_state:
-    st.session_state.points = 0
-if "badges" not in st.session_state:
-    st.session_state.badges = []
-if "redeemed" not in st.session_state:
-    st.session_state.redeemed = []
-if "streak" not in st.session_state:
-    st.session_state.streak = 0
-if "last_login" not in st.session_state:
-    st.session_state.last_login = None
+import activity_log
+import community_board
+import points_ledger
+from activity_log import ActivityLog
+from board_search import BoardSearch
+from community_board import CommunityBoard
+from leaderboard import Leaderboard
+from points_ledger import PointsLedger
+
+@st.cache_resource
+def init_ledger():
+    # One ledger (and one writer thread) shared by every session in this process
+    ledger = PointsLedger(os.getenv("ECOGAMIFY_DB", "ecogamify.db"))
+    for reward, quantity in REWARD_STOCK.items():
+        ledger.set_stock(reward, quantity)   # first start only; afterwards the ledger keeps count
+    return ledger
+
+@st.cache_resource
+def init_leaderboard():
+    # Loaded from the ledger once, then kept current by its commit callback
+    board = Leaderboard()
+    init_ledger().subscribe(board.record_events, on_subscribe=board.load)
+    return board
+
+@st.cache_resource
+def init_activity_log():
+    # Streaks, badges and redemptions are derived from this event log
+    return ActivityLog(os.getenv("ECOGAMIFY_DB", "ecogamify.db"),
+                       snapshot_every=int(os.getenv("ECOGAMIFY_SNAPSHOT_EVERY", "100")))
+
+@st.cache_resource
+def init_community_board():
+    return CommunityBoard(os.getenv("COMMUNITY_BOARD_DIR", "community_board"))
+
+@st.cache_resource
+def init_board_search():
+    # Indexes new posts as the board appends them; catches up with older ones on start
+    return BoardSearch(init_community_board(), os.getenv("BOARD_SEARCH_DIR", "board_search"))
+
+BOARD_PAGE_SIZE = 20
+REWARD_STOCK = {"Reusable Bottle ♻️": 500, "Community Shoutout 📢": 50}   # limited rewards
+
+ledger = init_ledger()
+leaderboard = init_leaderboard()
+activity = init_activity_log()
 
 # -----------------------------
 # Data
@@ -46,22 +80,20 @@ st.title("🌍 EcoGamify – Gamification for Climate Action")
 # Sidebar – User Dashboard
 # -----------------------------
 st.sidebar.header("Your Dashboard")
-st.sidebar.write(f"🌱 Eco-Points: **{st.session_state.points}**")
-st.sidebar.write(f"🏅 Badges: {', '.join(st.session_state.badges) if st.session_state.badges else 'None'}")
-st.sidebar.write(f"🔥 Streak: {st.session_state.streak} days")
+username = st.sidebar.text_input("👤 Your name", key="username").strip()
+if not username:
+    st.info("👋 Enter your name in the sidebar to start earning Eco-Points.")
+    st.stop()
+
+dashboard_slot = st.sidebar.empty()   # filled at the end of the run, after this run's events
 
 # -----------------------------
 # Daily Login Streak
 # -----------------------------
-today = datetime.date.today()
-if st.session_state.last_login != today:
-    if st.session_state.last_login == today - datetime.timedelta(days=1):
-        st.session_state.streak += 1
-    else:
-        st.session_state.streak = 1
-    st.session_state.last_login = today
-    st.session_state.points += 10
-    st.success(f"✅ Daily Login Bonus! +10 points. Current streak: {st.session_state.streak} days")
+if activity.record_login(username):
+    ledger.award(username, 10, "daily_login")
+    streak = activity_log.current_streak(activity.state(username))
+    st.success(f"✅ Daily Login Bonus! +10 points. Current streak: {streak} days")
 
 # -----------------------------
 # Section Navigation
@@ -77,8 +109,8 @@ if menu == "🎯 Daily Challenge":
     st.info(challenge)
 
     if st.button("✅ Mark as Completed"):
-        st.session_state.points += 20
-        st.session_state.badges.append("Eco-Warrior")
+        ledger.award(username, 20, "daily_challenge")
+        activity.append(username, activity_log.CHALLENGE, "daily")
         st.success("Great job! You earned +20 points and an Eco-Warrior badge! 🏅")
 
 # -----------------------------
@@ -86,38 +118,80 @@ if menu == "🎯 Daily Challenge":
 # -----------------------------
 elif menu == "🏫 Leaderboard":
     st.subheader("🏆 Community Leaderboard")
-    leaderboard = {
-        "Green School": 820,
-        "Eco Club": 740,
-        "Climate Warriors": 690,
-        "You": st.session_state.points
-    }
-    sorted_lb = dict(sorted(leaderboard.items(), key=lambda x: x[1], reverse=True))
-    for name, score in sorted_lb.items():
-        st.write(f"{name}: {score} points")
+    periods = {"Today": "daily", "This week": "weekly", "All time": "all_time"}
+    period = periods[st.radio("Period", list(periods), horizontal=True)]
+    ledger.flush(timeout=1.0)   # include this session's latest awards
+
+    st.write(f"**Top 10** of {leaderboard.size(period):,} players (points earned)")
+    for position, (name, score) in enumerate(leaderboard.top(period, 10), start=1):
+        you = " ← you" if name == username else ""
+        st.write(f"{position}. {name}: {score} points{you}")
+
+    rank = leaderboard.rank(period, username)
+    if rank is None:
+        st.info("Earn some points to join this leaderboard!")
+    elif rank > 10:
+        st.write(f"Your rank: **#{rank}**")
+        for position, name, score in leaderboard.around(period, username, 2):
+            marker = "**" if name == username else ""
+            st.write(f"{marker}{position}. {name}: {score} points{marker}")
 
 # -----------------------------
 # Reward Shop
 # -----------------------------
 elif menu == "🎁 Reward Shop":
     st.subheader("🎁 Reward Shop")
+
+    def offer_key(user, reward):
+        # One idempotency key per offer, kept across reruns until a redemption uses it, so a
+        # click retried after any rerun is still charged once
+        slot = f"redeem_nonce:{reward}"
+        if slot not in st.session_state:
+            st.session_state[slot] = uuid.uuid4().hex
+        return f"{user}:{reward}:{st.session_state[slot]}"
+
+    def redeem_reward(user, reward, cost, key):
+        # on_click runs once per click, before the rerun; the ledger decides atomically
+        try:
+            status = ledger.redeem(user, reward, cost, key)
+        except (points_ledger.LedgerError, TimeoutError) as e:
+            st.session_state["redeem_result"] = (reward, "error", e)
+            return
+        if status == points_ledger.REDEEMED:
+            activity.append(user, activity_log.REDEEM, reward)
+        if status in (points_ledger.REDEEMED, points_ledger.ALREADY_REDEEMED):
+            # The key is spent; the next click is a new purchase
+            st.session_state.pop(f"redeem_nonce:{reward}", None)
+        st.session_state["redeem_result"] = (reward, status, None)
+
+    result = st.session_state.pop("redeem_result", None)
+    if result:
+        reward, status, error = result
+        if status == "error":
+            st.error(f"⚠️ Could not redeem {reward} right now, please try again. ({error})")
+        elif status == points_ledger.REDEEMED:
+            st.success(f"🎉 You redeemed {reward}!")
+        elif status == points_ledger.ALREADY_REDEEMED:
+            st.info("That click was already redeemed; you were not charged twice.")
+        elif status == points_ledger.OUT_OF_STOCK:
+            st.warning(f"Sorry, {reward} is out of stock.")
+        else:
+            st.error("Not enough points!")
+
     for reward, cost in rewards.items():
         col1, col2 = st.columns([3, 1])
+        left = ledger.stock(reward) if reward in REWARD_STOCK else None
         with col1:
-            st.write(f"{reward} - {cost} points")
+            st.write(f"{reward} - {cost} points" + (f" ({left} left)" if left is not None else ""))
         with col2:
-            if st.button(f"Redeem {reward}", key=reward):
-                if st.session_state.points >= cost:
-                    st.session_state.points -= cost
-                    st.session_state.redeemed.append(reward)
-                    st.success(f"🎉 You redeemed {reward}!")
-                else:
-                    st.error("Not enough points!")
-
-    if st.session_state.redeemed:
+            st.button(f"Redeem {reward}", key=reward, disabled=left == 0, on_click=redeem_reward,
+                      args=(username, reward, cost, offer_key(username, reward)))
+
+    redeemed = activity.state(username)["redeemed"]
+    if redeemed:
         st.subheader("🛒 Redeemed Items")
-        for item in st.session_state.redeemed:
-            st.write(f"- {item}")
+        for item, count in redeemed.items():
+            st.write(f"- {item}" + (f" ×{count}" if count > 1 else ""))
 
 # -----------------------------
 # Weekly Challenge
@@ -128,8 +202,8 @@ elif menu == "📅 Weekly Challenge":
     st.info(weekly_challenge)
 
     if st.button("✅ Mark Weekly Challenge Completed"):
-        st.session_state.points += 100
-        st.session_state.badges.append("Community Hero")
+        ledger.award(username, 100, "weekly_challenge")
+        activity.append(username, activity_log.CHALLENGE, "weekly")
         st.success("Amazing! You earned +100 points and a Community Hero badge! 🌟")
 
 # -----------------------------
@@ -139,14 +213,61 @@ elif menu == "💬 Community Board":
     st.subheader("💬 Eco Community Board")
     st.write("Share your eco-achievements and inspire others!")
 
-    post = st.text_input("Write your post:")
-    if st.button("📢 Post"):
-        if "posts" not in st.session_state:
-            st.session_state.posts = []
-        st.session_state.posts.append(post)
-        st.success("Posted successfully!")
-
-    if "posts" in st.session_state and st.session_state.posts:
-        st.subheader("🌍 Community Posts")
-        for p in reversed(st.session_state.posts):
-            st.write(f"🔹 {p}")
+    try:
+        board = init_community_board()
+    except community_board.BoardError as e:
+        # The board directory is held by another server process (see community_board.py)
+        board = None
+        st.error(f"The community board is unavailable on this server: {e}")
+    if board is not None:
+        # Stack of page cursors; the last one is the page being shown (None = newest)
+        cursors = st.session_state.setdefault("board_cursors", [None])
+
+        post = st.text_input("Write your post:")
+        if st.button("📢 Post"):
+            if post.strip():
+                try:
+                    board.post(username, post.strip())
+                    board.flush(timeout=1.0)   # show it on the next page render
+                    cursors[:] = [None]
+                    st.success("Posted successfully!")
+                except community_board.BoardError as e:
+                    st.error(f"Posting is unavailable right now: {e}")
+            else:
+                st.warning("Write something first!")
+
+        search = init_board_search()
+        query = st.text_input("🔎 Search posts", placeholder="solar, #zerowaste, compost*")
+        if query.strip():
+            t0 = time.perf_counter()
+            hits = search.search(query, k=BOARD_PAGE_SIZE)
+            seconds = time.perf_counter() - t0
+            st.subheader(f"🔎 {len(hits)} best matches")
+            for post_id, _ in hits:
+                p = board.get(post_id)
+                st.write(f"🔹 **{p['user']}**: {p['text']}")
+            info = search.info()
+            if info["error"]:
+                st.warning(f"Search is not picking up new posts: {info['error']}")
+            st.caption(f"{info['posts']:,} posts indexed in {info['segments']} segments · {seconds * 1000:.1f} ms")
+        else:
+            posts, older = board.page(before=cursors[-1], limit=BOARD_PAGE_SIZE)
+            if posts:
+                st.subheader("🌍 Community Posts")
+                for p in posts:
+                    st.write(f"🔹 **{p['user']}**: {p['text']}")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if len(cursors) > 1:
+                        st.button("⬅️ Newer", on_click=cursors.pop)
+                with col2:
+                    if older is not None:
+                        st.button("Older ➡️", on_click=cursors.append, args=(older,))
+                st.caption(f"{len(board):,} posts")
+
+state = activity.state(username)
+badges = activity_log.badge_list(state)
+with dashboard_slot.container():
+    st.write(f"🌱 Eco-Points: **{ledger.balance(username)}**")
+    st.write(f"🏅 Badges: {', '.join(f'{b} ×{n}' if n > 1 else b for b, n in badges) if badges else 'None'}")
+    st.write(f"🔥 Streak: {activity_log.current_streak(state)} days (best {state['best_streak']})")
@@ -1,10 +1,13 @@
 # climate_explorer.py
 
 import streamlit as st
-from groq import Groq
 import os
 from dotenv import load_dotenv
 
+from llm_client import LLMUnavailable, get_client
+from llm_stream import write_stream
+from query_cache import QueryCache
+
 # ---------------------------
 # 🔑 Load Environment Variables
 # ---------------------------
@@ -15,7 +18,7 @@ if not GROQ_API_KEY:
     st.error("⚠️ Missing GROQ_API_KEY. Please set it as an environment variable or in a .env file.")
     st.stop()
 
-client = Groq(api_key=GROQ_API_KEY)
+client = get_client()  # shared, pooled client; GROQ_BASE_URL -> fake_llm_server.py for local testing
 
 # ---------------------------
 # Streamlit Page Setup
@@ -24,6 +27,19 @@ st.set_page_config(page_title="🌍 Climate Initiatives Explorer", layout="wide"
 st.title("🌍 Climate Initiatives Explorer")
 st.write("Enter the name of a project, initiative, city, or country to learn about climate-related efforts.")
 
+# ---------------------------
+# Persistent Response Cache (SQLite WAL, shared by all workers)
+# ---------------------------
+@st.cache_resource
+def init_query_cache():
+    return QueryCache(
+        "initiatives_cache.db",
+        ttl_seconds=float(os.getenv("INITIATIVES_CACHE_TTL_HOURS", "168")) * 3600,
+        max_entries=int(os.getenv("INITIATIVES_CACHE_SIZE", "5000")),
+    )
+
+query_cache = init_query_cache()
+
 # ---------------------------
 # User Input
 # ---------------------------
@@ -31,9 +47,13 @@ query = st.text_input("🔍 Search for a project, initiative, city, or country:"
 
 if st.button("Get Information"):
     if query.strip():
-        with st.spinner("Fetching information..."):
-            try:
-                response = client.chat.completions.create(
+        try:
+            cached = query_cache.get(query)
+            st.subheader(f"🌱 AI-Generated Summary for: {query}")
+            if cached is not None:
+                st.write(cached)
+            else:
+                tokens = client.stream_chat(
                     model="llama-3.3-70b-versatile",  # ✅ supported model
                     messages=[
                         {"role": "system", "content": "You are an expert on global climate initiatives, sustainability, and clean energy projects."},
@@ -42,10 +62,24 @@ if st.button("Get Information"):
                     temperature=0.6,
                     max_tokens=400
                 )
-                summary = response.choices[0].message.content.strip()
-                st.subheader(f"🌱 AI-Generated Summary for: {query}")
-                st.write(summary)
-            except Exception as e:
-                st.error(f"⚠️ Error generating info: {str(e)}")
+                summary = write_stream(tokens, page="global_initiatives")
+                if summary.strip():
+                    query_cache.put(query, summary.strip())
+        except LLMUnavailable as e:
+            st.warning(e.user_message())
+        except Exception as e:
+            st.error(f"⚠️ Error generating info: {str(e)}")
     else:
-        st.warning("⚠️ Please enter a project, city, or country first.")
\ No newline at end of file
+        st.warning("⚠️ Please enter a project, city, or country first.")
+
+# ---------------------------
+# Cache Admin
+# ---------------------------
+with st.sidebar.expander("🗄️ Cache admin"):
+    stats = query_cache.stats()
+    st.metric("Hit rate", f"{stats['hit_rate']:.0%}", help=f"{stats['hits']} hits / {stats['lookups']} lookups")
+    st.write(f"Cached queries: {stats['entries']}")
+    top = query_cache.top_queries(10)
+    if top:
+        st.write("**Top queries**")
+        st.table({"Query": [q for q, _ in top], "Requests": [n for _, n in top]})
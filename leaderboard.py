@@ -0,0 +1,279 @@
+# leaderboard.py
+"""Ranked EcoGamify leaderboards with O(log n) updates, rank and top-K.
+
+Each board keeps every user in an indexable skip list ordered by
+(-score, user): besides its forward pointers, each node stores how many
+positions each pointer skips, so "what is at position i" and "what position
+is this key" are answered with the same O(log n) descent as a lookup.
+
+    board = Board()
+    board.add("asha", 20)
+    board.top(10)           # [(user, score)]
+    board.rank("asha")      # 1-based
+    board.around("asha", 2) # [(rank, user, score)] for ranks r-2 .. r+2
+
+Leaderboard keeps a daily, a weekly and an all-time Board, ranked by points
+earned (spending on rewards never costs a place). It is loaded once from the
+points ledger and then fed each committed batch via PointsLedger.subscribe().
+Only the latest `retain` daily/weekly buckets are kept in memory.
+"""
+
+import datetime
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+PERIODS = ("daily", "weekly", "all_time")
+
+
+class _Infinity:
+    """Key of the tail sentinel: greater than every real key."""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __ge__(self, other):
+        return True
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level   # positions skipped by next[i]
+
+
+class IndexableSkipList:
+    """Sorted multiset of keys with positional access."""
+
+    def __init__(self, expected_size=1 << 20, seed=None):
+        self.levels = max(1, int(1 + math.log2(max(expected_size, 2))))
+        self._tail = _Node(_Infinity(), 0)
+        self._head = _Node(None, self.levels)
+        self._head.next = [self._tail] * self.levels
+        self._random = random.Random(seed)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _level(self):
+        level = 1
+        while level < self.levels and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        chain = [None] * self.levels
+        steps_at_level = [0] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        new = _Node(key, self._level())
+        steps = 0
+        for level in range(len(new.next)):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(len(new.next), self.levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain = [None] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is self._tail or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def index(self, key):
+        """0-based position of key; KeyError if absent."""
+        node = self._head
+        position = 0
+        for level in reversed(range(self.levels)):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        if node.next[0] is self._tail or node.next[0].key != key:
+            raise KeyError(key)
+        return position
+
+    def _node_at(self, i):
+        node = self._head
+        i += 1
+        for level in reversed(range(self.levels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return self._node_at(i).key
+
+    def slice(self, start, count):
+        """Up to `count` keys from position `start`: O(log n + count)."""
+        start = max(start, 0)
+        if start >= self.size or count <= 0:
+            return []
+        node = self._node_at(start)
+        keys = []
+        while node is not self._tail and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Board:
+    def __init__(self, expected_size=1 << 16):
+        self.scores = {}
+        self._ranked = IndexableSkipList(expected_size)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def add(self, user, delta):
+        old = self.scores.get(user)
+        if old is not None:
+            self._ranked.remove((-old, user))
+        new = (old or 0) + delta
+        self.scores[user] = new
+        self._ranked.insert((-new, user))
+        return new
+
+    def top(self, k):
+        return [(user, -neg) for neg, user in self._ranked.slice(0, k)]
+
+    def rank(self, user):
+        """1-based rank, or None if the user has no points on this board."""
+        score = self.scores.get(user)
+        return None if score is None else self._ranked.index((-score, user)) + 1
+
+    def around(self, user, n):
+        """[(rank, user, score)] for up to n places above and below the user, clamped at both ends."""
+        rank = self.rank(user)
+        if rank is None:
+            return []
+        first = max(rank - n, 1)
+        last = min(rank + n, len(self))
+        return [(first + i, u, -neg) for i, (neg, u) in enumerate(self._ranked.slice(first - 1, last - first + 1))]
+
+
+# -----------------------------
+# Daily / weekly / all-time boards
+# -----------------------------
+def bucket_key(period, ts):
+    day = datetime.date.fromtimestamp(ts)
+    if period == "daily":
+        return day.isoformat()
+    if period == "weekly":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return "all"
+
+
+def bucket_start(period, ts):
+    """Epoch seconds at which the bucket containing ts began (local time)."""
+    day = datetime.date.fromtimestamp(ts)
+    if period == "weekly":
+        day -= datetime.timedelta(days=day.weekday())
+    elif period == "all_time":
+        return 0.0
+    return time.mktime(day.timetuple())
+
+
+class Leaderboard:
+    def __init__(self, expected_size=1 << 16, retain=2):
+        self.expected_size = expected_size
+        self.retain = retain
+        self._lock = threading.RLock()
+        self._boards = {period: OrderedDict() for period in PERIODS}   # period -> bucket key -> Board
+
+    def _board(self, period, key, create=False):
+        boards = self._boards[period]
+        board = boards.get(key)
+        if board is None and create:
+            board = boards[key] = Board(self.expected_size)
+            while len(boards) > self.retain:
+                boards.popitem(last=False)
+        return board
+
+    def record(self, user, points, ts=None):
+        """Count `points` earned by user at ts on every board (spends are ignored)."""
+        if points <= 0:
+            return
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for period in PERIODS:
+                self._board(period, bucket_key(period, ts), create=True).add(user, points)
+
+    def record_events(self, events):
+        """PointsLedger.subscribe() callback: events are (user, delta, reason, ts)."""
+        for user, delta, _, ts in events:
+            self.record(user, delta, ts)
+
+    def load(self, conn, now=None):
+        """Fill the current buckets from the ledger database (see PointsLedger.subscribe)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            for period in PERIODS:
+                if period == "all_time":
+                    rows = conn.execute("SELECT user, earned FROM totals WHERE earned > 0")
+                else:
+                    rows = conn.execute(
+                        "SELECT user, SUM(delta) FROM events WHERE delta > 0 AND ts >= ? GROUP BY user",
+                        (bucket_start(period, now),))
+                board = self._board(period, bucket_key(period, now), create=True)
+                for user, points in rows:
+                    board.add(user, points)
+
+    def _current(self, period):
+        return self._board(period, bucket_key(period, time.time()))
+
+    def top(self, period, k=10):
+        with self._lock:
+            board = self._current(period)
+            return board.top(k) if board else []
+
+    def rank(self, period, user):
+        with self._lock:
+            board = self._current(period)
+            return board.rank(user) if board else None
+
+    def around(self, period, user, n=2):
+        with self._lock:
+            board = self._current(period)
+            return board.around(user, n) if board else []
+
+    def size(self, period):
+        with self._lock:
+            board = self._current(period)
+            return len(board) if board else 0
@@ -0,0 +1,350 @@
+# llm_client.py
+"""Shared Groq client for all pages.
+
+One process-wide client (get_client()) replaces the per-page Groq/ChatGroq
+instances:
+
+- keep-alive connection pool (httpx) reused by every session
+- per-call timeouts
+- jittered exponential backoff on 429/5xx/connection errors, honouring the
+  provider's Retry-After header
+- a per-model circuit breaker, so a throttled provider is not hammered by
+  every concurrent user
+- per-model latency histograms (total and time-to-first-token)
+- an asyncio variant (astream_chat) with the same retry and breaker policy,
+  for fanning out concurrent requests from one script run
+
+Failures that survive the retries surface as LLMUnavailable, which pages show
+as a friendly "try again in N seconds" message instead of a raw error.
+"""
+
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+import weakref
+
+import groq
+import httpx
+from groq import AsyncGroq, Groq
+
+from llm_stream import agroq_tokens, groq_tokens
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.InternalServerError,
+                    groq.APIConnectionError, groq.APITimeoutError)
+
+
+class LLMUnavailable(Exception):
+    """The provider is throttling or down; retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    def user_message(self):
+        wait = f" in about {int(self.retry_after) + 1} seconds" if self.retry_after else " in a moment"
+        return f"🌧️ The AI service is busy right now. Please try again{wait}."
+
+
+# ---------------------------
+# Circuit breaker
+# ---------------------------
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, probes again after `reset_timeout`."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Raise LLMUnavailable if calls are currently being shed.
+
+        Returns True if this call is the half-open probe; the caller must then
+        call release_probe() once the call is over, however it ended.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "open":
+                raise LLMUnavailable("circuit open",
+                                     self.reset_timeout - (time.monotonic() - self._opened_at))
+            if state == "half-open":
+                if self._probing:
+                    raise LLMUnavailable("circuit half-open, probe in flight", 1.0)
+                self._probing = True
+                return True
+            return False
+
+    def release_probe(self):
+        """End a probe that recorded neither outcome (a client-side error, KeyboardInterrupt,
+        cancellation); the next call probes again."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+# ---------------------------
+# Latency histogram
+# ---------------------------
+class LatencyHistogram:
+    BOUNDS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, float("inf"))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * len(self.BOUNDS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            for i, bound in enumerate(self.BOUNDS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+            self.total += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-quantile."""
+        with self._lock:
+            if not self.total:
+                return None
+            target = q * self.total
+            running = 0
+            for bound, count in zip(self.BOUNDS, self.counts):
+                running += count
+                if running >= target:
+                    return bound
+        return self.BOUNDS[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.total,
+            "mean_s": self.sum / self.total if self.total else None,
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "buckets": {f"<={b}s": c for b, c in zip(self.BOUNDS, self.counts)},
+        }
+
+
+# ---------------------------
+# Client
+# ---------------------------
+class LLMClient:
+    def __init__(self, api_key, base_url=None, timeout=30.0, max_retries=4,
+                 base_delay=0.5, max_delay=20.0, pool_size=20):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._api_key = api_key
+        self._base_url = base_url
+        self._limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                    keepalive_expiry=60.0)
+        self._http = httpx.Client(limits=self._limits, timeout=httpx.Timeout(timeout, connect=5.0))
+        # Retries are ours (Retry-After aware + breaker); the SDK's own are off
+        self._groq = Groq(api_key=api_key, base_url=base_url, http_client=self._http,
+                          max_retries=0, timeout=timeout)
+        # httpx.AsyncClient is bound to the event loop it was used on: one per loop
+        self._async_groq = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._latency = {}
+        self._ttft = {}
+
+    def chat(self, messages, model=DEFAULT_MODEL, timeout=None, **params):
+        """Blocking completion; returns the message text."""
+        start = time.perf_counter()
+        response = self._with_retries(model, lambda: self._groq.chat.completions.create(
+            model=model, messages=messages, timeout=timeout or self.timeout, **params))
+        self._histogram(self._latency, model).observe(time.perf_counter() - start)
+        return response.choices[0].message.content if response.choices else ""
+
+    def stream_chat(self, messages, model=DEFAULT_MODEL, timeout=None, **params):
+        """Yield text tokens. Failures before the first token are retried."""
+        start = time.perf_counter()
+
+        def open_stream():
+            tokens = groq_tokens(self._groq.chat.completions.create(
+                model=model, messages=messages, stream=True, timeout=timeout or self.timeout, **params))
+            return tokens, next(tokens, None)
+
+        tokens, first = self._with_retries(model, open_stream)
+        self._histogram(self._ttft, model).observe(time.perf_counter() - start)
+        try:
+            if first is not None:
+                yield first
+            yield from tokens
+        finally:
+            tokens.close()
+            self._histogram(self._latency, model).observe(time.perf_counter() - start)
+
+    async def astream_chat(self, messages, model=DEFAULT_MODEL, timeout=None, **params):
+        """Async variant of stream_chat(); same retries, breaker and histograms."""
+        start = time.perf_counter()
+        aclient = self._async_client()
+
+        async def open_stream():
+            tokens = agroq_tokens(await aclient.chat.completions.create(
+                model=model, messages=messages, stream=True, timeout=timeout or self.timeout, **params))
+            return tokens, await anext(tokens, None)
+
+        tokens, first = await self._with_retries_async(model, open_stream)
+        self._histogram(self._ttft, model).observe(time.perf_counter() - start)
+        try:
+            if first is not None:
+                yield first
+            async for token in tokens:
+                yield token
+        finally:
+            await tokens.aclose()
+            self._histogram(self._latency, model).observe(time.perf_counter() - start)
+
+    async def aclose(self):
+        """Close the async connection pool of the running event loop, if any."""
+        with self._lock:
+            aclient = self._async_groq.pop(asyncio.get_running_loop(), None)
+        if aclient is not None:
+            await aclient.close()
+
+    def metrics(self):
+        """Per-model latency/TTFT histograms and breaker state."""
+        with self._lock:
+            models = set(self._latency) | set(self._breakers)
+        return {m: {
+            "breaker": self._breaker(m).state,
+            "latency": self._histogram(self._latency, m).snapshot(),
+            "ttft": self._histogram(self._ttft, m).snapshot(),
+        } for m in sorted(models)}
+
+    def _with_retries(self, model, call):
+        breaker = self._breaker(model)
+        for attempt in range(self.max_retries + 1):
+            probe = breaker.before_call()
+            try:
+                result = call()
+            except RETRYABLE_ERRORS as e:
+                delay = self._backoff(breaker, attempt, e)
+            except groq.APIStatusError:
+                breaker.record_success()  # the provider answered; the request itself was bad
+                raise
+            else:
+                breaker.record_success()
+                return result
+            finally:
+                # Any other error is ours, not the provider's: it says nothing about its health
+                if probe:
+                    breaker.release_probe()
+            time.sleep(delay)
+
+    async def _with_retries_async(self, model, call):
+        breaker = self._breaker(model)
+        for attempt in range(self.max_retries + 1):
+            probe = breaker.before_call()
+            try:
+                result = await call()
+            except RETRYABLE_ERRORS as e:
+                delay = self._backoff(breaker, attempt, e)
+            except groq.APIStatusError:
+                breaker.record_success()
+                raise
+            else:
+                breaker.record_success()
+                return result
+            finally:
+                if probe:
+                    breaker.release_probe()
+            await asyncio.sleep(delay)
+
+    def _backoff(self, breaker, attempt, error):
+        """Record a failed attempt; return the delay before the next, or raise LLMUnavailable."""
+        breaker.record_failure()
+        retry_after = _retry_after(error)
+        if attempt == self.max_retries or (retry_after or 0) > self.max_delay:
+            raise LLMUnavailable(str(error), retry_after) from error
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0)
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            aclient = self._async_groq.get(loop)
+            if aclient is None:
+                aclient = self._async_groq[loop] = AsyncGroq(
+                    api_key=self._api_key, base_url=self._base_url, max_retries=0, timeout=self.timeout,
+                    http_client=httpx.AsyncClient(limits=self._limits,
+                                                  timeout=httpx.Timeout(self.timeout, connect=5.0)))
+            return aclient
+
+    def _breaker(self, model):
+        with self._lock:
+            return self._breakers.setdefault(model, CircuitBreaker())
+
+    def _histogram(self, table, model):
+        with self._lock:
+            return table.setdefault(model, LatencyHistogram())
+
+
+def _retry_after(error):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide LLMClient, configured from GROQ_API_KEY / GROQ_BASE_URL."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=os.getenv("GROQ_BASE_URL"),
+                timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "30")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+            )
+        return _client
@@ -0,0 +1,73 @@
+# llm_stream.py
+"""Streamed rendering of LLM completions for the Streamlit pages.
+
+write_stream() renders tokens as they arrive and records time-to-first-token
+and total latency for every request. If the user navigates away mid-answer,
+Streamlit interrupts the script; the token generator is closed on the way
+out, which closes the upstream HTTP stream, and the request is logged as
+cancelled.
+"""
+
+import logging
+import time
+from collections import deque
+from contextlib import closing
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Most recent requests across all sessions of this server process
+LATENCY_LOG = deque(maxlen=500)
+
+
+def groq_tokens(stream):
+    """Text deltas from a Groq `chat.completions.create(..., stream=True)` stream."""
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()
+
+
+async def agroq_tokens(stream):
+    """Async counterpart of groq_tokens() for AsyncGroq streams."""
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+
+def _timed(tokens, metrics):
+    start = time.perf_counter()
+    try:
+        for token in tokens:
+            if metrics["ttft_s"] is None:
+                metrics["ttft_s"] = time.perf_counter() - start
+            yield token
+    except GeneratorExit:
+        metrics["cancelled"] = True
+        raise
+    finally:
+        metrics["total_s"] = time.perf_counter() - start
+        if hasattr(tokens, "close"):
+            tokens.close()
+
+
+def write_stream(tokens, page):
+    """Render `tokens` incrementally; returns the full text and logs latency."""
+    metrics = {"page": page, "started": time.time(), "ttft_s": None, "total_s": None, "cancelled": False}
+    timed = _timed(tokens, metrics)
+    try:
+        with closing(timed):
+            text = st.write_stream(timed)
+    finally:
+        LATENCY_LOG.append(metrics)
+        logger.info("llm request page=%s ttft=%s total=%.3fs cancelled=%s", page,
+                    f"{metrics['ttft_s']:.3f}s" if metrics["ttft_s"] is not None else "-",
+                    metrics["total_s"] or 0.0, metrics["cancelled"])
+    st.caption(f"⏱️ First token in {metrics['ttft_s'] or 0:.2f}s · complete in {metrics['total_s']:.2f}s")
+    return text if isinstance(text, str) else "".join(map(str, text))
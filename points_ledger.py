@@ -0,0 +1,352 @@
+# points_ledger.py
+"""Persistent, multi-user Eco-Points ledger for EcoGamify.
+
+Every award or spend is a row in an append-only `events` table, and a
+`totals` table holds one materialized row per user (balance, earned, spent,
+event count), so balances and leaderboards never sum the event history.
+
+Writes are write-behind: award() puts the event on a queue and returns.
+One writer thread drains the queue and commits whatever has accumulated
+(up to batch_size events) in a single SQLite transaction, inserting the
+events and upserting each touched user's totals once. Under light load every
+event commits on its own; under heavy load batches grow and the commit cost
+is shared. Until its batch commits, an event is counted in an in-memory
+pending delta, so balance() always includes the user's own recent awards.
+
+The database is in WAL mode, so reads from page sessions never block the
+writer. flush() waits until everything queued so far is on disk. If a commit
+fails for any reason other than another process holding the write lock, the
+ledger stops accepting writes: that batch and everything queued after it are
+dropped, and award(), redeem() and flush() raise LedgerError with the cause.
+subscribe() registers a callback that receives each committed batch, e.g. to
+keep the in-memory leaderboards current without polling the database.
+
+Spending goes through redeem(), which waits for its outcome. A redemption
+rides the same queue as awards, so it sees every award queued before it, and
+is decided inside the batch's BEGIN IMMEDIATE transaction: the balance check,
+the debit and the stock decrement commit together or not at all, also
+against other processes writing the same file. Each redemption carries an
+idempotency key, and a key that was already redeemed is never charged again:
+
+    ledger.redeem("ana", "Eco Badge 🏅", 50, key="ana:badge:<click id>")   # REDEEMED
+    ledger.redeem("ana", "Eco Badge 🏅", 50, key="ana:badge:<click id>")   # ALREADY_REDEEMED
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+REDEEMED = "redeemed"
+ALREADY_REDEEMED = "already_redeemed"
+NOT_ENOUGH_POINTS = "not_enough_points"
+OUT_OF_STOCK = "out_of_stock"
+
+BUSY_RETRIES = 20   # BEGIN IMMEDIATE attempts (each waiting out the busy timeout) before giving up
+
+_STOP = object()
+
+
+class LedgerError(RuntimeError):
+    """The writer failed to commit; queued events since the failure were not saved (see __cause__)."""
+
+
+class _Redemption:
+    """A queued redeem() call; the writer fills in status and sets done."""
+
+    def __init__(self, user, reward, cost, key):
+        self.user, self.reward, self.cost, self.key = user, reward, cost, key
+        self.ts = time.time()
+        self.status = None
+        self.done = threading.Event()
+
+
+class PointsLedger:
+    def __init__(self, path="ecogamify.db", batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._pending_lock = threading.Lock()
+        self._pending = defaultdict(int)   # user -> points queued but not yet committed
+        # Held across "commit + clear pending" and "read totals + pending", so a
+        # reader never sees a batch both in the table and still pending
+        self._commit_lock = threading.Lock()
+        self._subscribers = []
+        self.stats = {"queued": 0, "committed": 0, "batches": 0, "max_batch": 0, "retries": 0,
+                      "redeemed": 0, "rejected": 0, "dropped": 0}
+        self.error = None   # the exception that stopped the writer, if any
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    delta INTEGER NOT NULL,
+                    reason TEXT NOT NULL,
+                    ts REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS events_user ON events(user, id);
+                CREATE INDEX IF NOT EXISTS events_ts ON events(ts);
+                CREATE TABLE IF NOT EXISTS totals (
+                    user TEXT PRIMARY KEY,
+                    points INTEGER NOT NULL DEFAULT 0,
+                    earned INTEGER NOT NULL DEFAULT 0,
+                    spent INTEGER NOT NULL DEFAULT 0,
+                    events INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS redemptions (
+                    key TEXT PRIMARY KEY,
+                    user TEXT NOT NULL,
+                    reward TEXT NOT NULL,
+                    cost INTEGER NOT NULL,
+                    ts REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stock (
+                    reward TEXT PRIMARY KEY,
+                    remaining INTEGER NOT NULL
+                );
+            """)
+        self._writer = threading.Thread(target=self._run, name="points-ledger-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _conn(self):
+        # sqlite3 connections are per thread; Streamlit runs each session in its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def award(self, user, points, reason):
+        """Queue a points event (negative points spend); returns immediately."""
+        self._check()
+        with self._pending_lock:
+            self._pending[user] += points
+            self.stats["queued"] += 1
+        self._queue.put((user, int(points), reason, time.time()))
+
+    def redeem(self, user, reward, cost, key, timeout=30):
+        """Spend cost points on reward, atomically; returns the outcome.
+
+        REDEEMED, or ALREADY_REDEEMED if `key` was redeemed before (nothing is
+        charged), NOT_ENOUGH_POINTS, or OUT_OF_STOCK. Rewards without a stock
+        row (see set_stock()) are unlimited.
+        """
+        self._check()
+        if not self._writer.is_alive():
+            raise RuntimeError("the ledger is closed")
+        request = _Redemption(user, reward, int(cost), key)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError(f"redemption {key!r} not committed after {timeout}s")
+        if request.status is None:
+            self._check()
+        return request.status
+
+    def set_stock(self, reward, remaining, overwrite=False):
+        """Limit reward to `remaining` more redemptions (kept as is if already set, unless overwrite)."""
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        with self._conn() as conn:
+            conn.execute(f"{verb} INTO stock (reward, remaining) VALUES (?, ?)", (reward, remaining))
+
+    def subscribe(self, callback, on_subscribe=None):
+        """Call callback(events) after each commit, events as [(user, delta, reason, ts)].
+
+        on_subscribe(conn), if given, runs first under the commit lock: it can
+        load current state from the database knowing that every later commit
+        will reach the callback and no earlier one will.
+        """
+        with self._commit_lock:
+            if on_subscribe is not None:
+                on_subscribe(self._conn())
+            self._subscribers.append(callback)
+
+    def flush(self, timeout=None):
+        """Block until every event queued before this call is committed.
+
+        Returns False on timeout, or if the ledger is closed with events still
+        queued; raises LedgerError if the writer failed.
+        """
+        self._check()
+        if not self._writer.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            return False
+        self._check()
+        return True
+
+    def _check(self):
+        if self.error is not None:
+            raise LedgerError(f"points ledger writer failed: {self.error}") from self.error
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if isinstance(item, (tuple, _Redemption))]
+            if items and self.error is None:
+                try:
+                    self._commit(items)
+                except Exception as e:
+                    self.error = e
+            if items and self.error is not None:
+                self._drop(items)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif isinstance(item, _Redemption):
+                    item.done.set()
+            if _STOP in batch:
+                return
+
+    def _commit(self, items):
+        conn = self._conn()
+        with self._commit_lock:
+            events = self._commit_batch(conn, items)
+            with self._pending_lock:
+                # Only award() events were counted as pending; redemptions were not
+                for user, delta, _, _ in (item for item in items if isinstance(item, tuple)):
+                    self._pending[user] -= delta
+                    if not self._pending[user]:
+                        del self._pending[user]
+                for item in items:
+                    if isinstance(item, _Redemption):
+                        self.stats["redeemed" if item.status == REDEEMED else "rejected"] += 1
+                self.stats["committed"] += len(events)
+                self.stats["batches"] += 1
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(events))
+            for callback in self._subscribers:
+                try:
+                    callback(events)
+                except Exception:
+                    pass  # a broken view must not stop the ledger
+
+    def _drop(self, items):
+        """Forget items that will never be committed (redemptions keep status None)."""
+        with self._pending_lock:
+            for user, delta, _, _ in (item for item in items if isinstance(item, tuple)):
+                self._pending[user] -= delta
+                if not self._pending[user]:
+                    del self._pending[user]
+            self.stats["dropped"] += len(items)
+
+    def _commit_batch(self, conn, items):
+        """Commit awards and decide redemptions, in queue order, in one transaction; returns the events."""
+        for attempt in range(BUSY_RETRIES):
+            try:
+                conn.execute("BEGIN IMMEDIATE")   # take the write lock before reading balances
+                with conn:
+                    events, redeemed, stock = self._decide(conn, items)
+                    per_user = {}
+                    for user, delta, _, ts in events:
+                        points, earned, spent, count, _ = per_user.get(user, (0, 0, 0, 0, 0))
+                        per_user[user] = (points + delta, earned + max(delta, 0), spent + max(-delta, 0),
+                                          count + 1, ts)
+                    conn.executemany("INSERT INTO events (user, delta, reason, ts) VALUES (?, ?, ?, ?)", events)
+                    conn.executemany("""
+                        INSERT INTO totals (user, points, earned, spent, events, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(user) DO UPDATE SET
+                            points = points + excluded.points,
+                            earned = earned + excluded.earned,
+                            spent = spent + excluded.spent,
+                            events = events + excluded.events,
+                            updated_at = excluded.updated_at
+                    """, [(user,) + row for user, row in per_user.items()])
+                    conn.executemany("INSERT INTO redemptions (key, user, reward, cost, ts) VALUES (?, ?, ?, ?, ?)",
+                                     redeemed)
+                    conn.executemany("UPDATE stock SET remaining = ? WHERE reward = ?",
+                                     [(remaining, reward) for reward, remaining in stock.items()
+                                      if remaining is not None])
+                return events
+            except sqlite3.OperationalError as e:
+                # Only "locked"/"busy" is worth retrying (another process holds the write lock past
+                # the busy timeout); disk I/O errors, a read-only file or a missing table are not
+                message = str(e).lower()
+                if "locked" not in message and "busy" not in message or attempt == BUSY_RETRIES - 1:
+                    raise
+                self.stats["retries"] += 1
+                time.sleep(0.1)
+
+    def _decide(self, conn, items):
+        """(events, redemption rows, stock left) for items, setting each redemption's status."""
+        balances, stock, keys = {}, {}, set()
+        events, redeemed = [], []
+
+        def balance(user):
+            if user not in balances:
+                row = conn.execute("SELECT points FROM totals WHERE user = ?", (user,)).fetchone()
+                balances[user] = row[0] if row else 0
+            return balances[user]
+
+        for item in items:
+            if isinstance(item, tuple):
+                balances[item[0]] = balance(item[0]) + item[1]
+                events.append(item)
+                continue
+            if item.reward not in stock:
+                row = conn.execute("SELECT remaining FROM stock WHERE reward = ?", (item.reward,)).fetchone()
+                stock[item.reward] = row[0] if row else None
+            if item.key in keys or conn.execute(
+                    "SELECT 1 FROM redemptions WHERE key = ?", (item.key,)).fetchone():
+                item.status = ALREADY_REDEEMED
+            elif stock[item.reward] is not None and stock[item.reward] <= 0:
+                item.status = OUT_OF_STOCK
+            elif balance(item.user) < item.cost:
+                item.status = NOT_ENOUGH_POINTS
+            else:
+                item.status = REDEEMED
+                balances[item.user] -= item.cost
+                if stock[item.reward] is not None:
+                    stock[item.reward] -= 1
+                keys.add(item.key)
+                events.append((item.user, -item.cost, f"redeem:{item.reward}", item.ts))
+                redeemed.append((item.key, item.user, item.reward, item.cost, item.ts))
+        return events, redeemed, stock
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def totals(self, user):
+        """{"points", "earned", "spent", "events"} including not-yet-committed events."""
+        with self._commit_lock:
+            row = self._conn().execute(
+                "SELECT points, earned, spent, events FROM totals WHERE user = ?", (user,)).fetchone()
+            with self._pending_lock:
+                pending = self._pending.get(user, 0)
+        points, earned, spent, events = row or (0, 0, 0, 0)
+        return {"points": points + pending, "earned": earned, "spent": spent, "events": events}
+
+    def balance(self, user):
+        return self.totals(user)["points"]
+
+    def stock(self, reward):
+        """Redemptions left for reward, or None if it is unlimited."""
+        row = self._conn().execute("SELECT remaining FROM stock WHERE reward = ?", (reward,)).fetchone()
+        return row[0] if row else None
+
+    def history(self, user, limit=20):
+        """[(delta, reason, ts)] newest first (committed events only)."""
+        return self._conn().execute(
+            "SELECT delta, reason, ts FROM events WHERE user = ? ORDER BY id DESC LIMIT ?", (user, limit)
+        ).fetchall()
@@ -0,0 +1,172 @@
+# query_cache.py
+"""Persistent response cache for the Climate Initiatives Explorer.
+
+Responses live in a SQLite database in WAL mode, so the cache survives
+restarts and is shared by every Streamlit worker process on the machine.
+Keys are normalized queries ("  PARIS " and "paris" hit the same row, and
+aliases like "USA" resolve to "united states"). Entries expire after a TTL
+and the table is kept under max_entries by evicting the least recently used.
+
+get() is a plain read: hit/lookup counters and per-query access times are
+kept in memory and written in one transaction at most every flush_interval
+seconds (and on put() and at exit), so lookups never take SQLite's write lock.
+"""
+
+import atexit
+import re
+import sqlite3
+import threading
+import time
+
+ALIASES = {
+    "usa": "united states",
+    "us": "united states",
+    "u.s": "united states",
+    "u.s.a": "united states",
+    "united states of america": "united states",
+    "america": "united states",
+    "uk": "united kingdom",
+    "u.k": "united kingdom",
+    "britain": "united kingdom",
+    "great britain": "united kingdom",
+    "england": "united kingdom",
+    "uae": "united arab emirates",
+    "eu": "european union",
+    "bharat": "india",
+    "deutschland": "germany",
+    "nyc": "new york city",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "bombay": "mumbai",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+}
+
+
+def normalize_query(query):
+    """Case-fold, collapse whitespace, trim punctuation and resolve aliases.
+
+    Aliases are keyed on the trimmed form, so "U.S.A." looks up "u.s.a".
+    """
+    key = re.sub(r"\s+", " ", query.casefold()).strip(" \t\n?!.,;:'\"")
+    return ALIASES.get(key, key)
+
+
+class QueryCache:
+    def __init__(self, path="initiatives_cache.db", ttl_seconds=7 * 24 * 3600, max_entries=5000,
+                 flush_interval=10.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+        self._accessed = {}   # key -> [last access, hits] not yet written
+        self._last_flush = time.monotonic()
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 1
+                );
+                CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access);
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO counters VALUES ('lookups', 0), ('hits', 0);
+            """)
+        atexit.register(self.flush)
+
+    def _conn(self):
+        # sqlite3 connections are per thread; Streamlit runs each session in its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, query):
+        """Cached response for `query`, or None."""
+        key = normalize_query(query)
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        hit = row is not None and now - row[1] < self.ttl_seconds
+        if row is not None and not hit:
+            with conn:
+                conn.execute("DELETE FROM responses WHERE key = ? AND created_at = ?", (key, row[1]))
+        with self._lock:
+            self._lookups += 1
+            if hit:
+                self._hits += 1
+                access = self._accessed.setdefault(key, [now, 0])
+                access[0] = now
+                access[1] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+        return row[0] if hit else None
+
+    def flush(self):
+        """Write the in-memory counters and access times to the database."""
+        with self._lock:
+            lookups, hits, accessed = self._lookups, self._hits, self._accessed
+            self._lookups, self._hits, self._accessed = 0, 0, {}
+            self._last_flush = time.monotonic()
+        if not lookups:
+            return
+        with self._conn() as conn:
+            conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                             [(lookups, "lookups"), (hits, "hits")])
+            conn.executemany("UPDATE responses SET last_access = MAX(last_access, ?), requests = requests + ? "
+                             "WHERE key = ?", [(last, n, key) for key, (last, n) in accessed.items()])
+
+    def put(self, query, response):
+        key = normalize_query(query)
+        now = time.time()
+        self.flush()   # a write anyway; evict by up-to-date access times
+        with self._conn() as conn:
+            conn.execute("""
+                INSERT INTO responses (key, query, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    response = excluded.response,
+                    created_at = excluded.created_at,
+                    last_access = excluded.last_access,
+                    requests = requests + 1
+            """, (key, query.strip(), response, now, now))
+            (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                conn.execute("""
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_access LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+
+    def stats(self):
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        (entries,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        with self._lock:   # plus this process's counts not flushed yet
+            lookups = counters["lookups"] + self._lookups
+            hits = counters["hits"] + self._hits
+        return {
+            "entries": entries,
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def top_queries(self, n=10):
+        """[(normalized query, requests)] for the most requested cached queries, as of the last flush."""
+        return self._conn().execute(
+            "SELECT key, requests FROM responses ORDER BY requests DESC, last_access DESC LIMIT ?", (n,)
+        ).fetchall()
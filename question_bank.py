@@ -0,0 +1,104 @@
+# question_bank.py
+"""Local bank of validated quiz questions, indexed by difficulty and topic.
+
+Questions are persisted in SQLite (one row each, unique on the normalized
+question text) and held in memory as one list per (difficulty, topic) bucket
+plus one per difficulty for "any topic". sample() is random.sample over a
+bucket, so a quiz is drawn in O(k) without touching the network.
+
+start_replenisher() runs a background thread that tops a bucket back up to
+the high watermark whenever it falls below the low watermark.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+
+from quiz_gen import normalize_question, validate_question
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+TOPICS = ["climate change", "renewable energy", "biodiversity", "oceans", "sustainable living"]
+ANY_TOPIC = None
+
+
+class QuestionBank:
+    def __init__(self, path="quiz_bank.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buckets = {}   # (difficulty, topic or ANY_TOPIC) -> [question dict]
+        self._seen = set()   # normalized question texts
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                difficulty TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                question TEXT NOT NULL,
+                options TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                norm TEXT NOT NULL UNIQUE
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS questions_bucket ON questions(difficulty, topic)")
+        for difficulty, topic, question, options, answer, norm in self._conn.execute(
+                "SELECT difficulty, topic, question, options, answer, norm FROM questions"):
+            self._index({"question": question, "options": json.loads(options), "answer": answer},
+                         difficulty, topic, norm)
+
+    def _index(self, q, difficulty, topic, norm):
+        self._seen.add(norm)
+        self._buckets.setdefault((difficulty, topic), []).append(q)
+        self._buckets.setdefault((difficulty, ANY_TOPIC), []).append(q)
+
+    def add(self, questions, difficulty, topic):
+        """Validate, de-duplicate and store questions; returns how many were new."""
+        added = 0
+        with self._lock, self._conn:
+            for q in questions:
+                q = validate_question(q)
+                if q is None:
+                    continue
+                norm = normalize_question(q["question"])
+                if norm in self._seen:
+                    continue
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO questions (difficulty, topic, question, options, answer, norm) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (difficulty, topic, q["question"], json.dumps(q["options"]), q["answer"], norm))
+                self._index(q, difficulty, topic, norm)
+                added += 1
+        return added
+
+    def count(self, difficulty, topic=ANY_TOPIC):
+        return len(self._buckets.get((difficulty, topic), ()))
+
+    def sample(self, k, difficulty, topic=ANY_TOPIC):
+        """Up to k distinct questions from the bucket, in random order."""
+        with self._lock:
+            bucket = self._buckets.get((difficulty, topic), [])
+            return [dict(q) for q in random.sample(bucket, min(k, len(bucket)))]
+
+    def start_replenisher(self, generate, low_watermark=30, high_watermark=60,
+                          batch_size=10, interval=60.0, max_attempts=10):
+        """Refill buckets in a daemon thread; generate(n, difficulty, topic) -> questions."""
+        def run():
+            while True:
+                for difficulty in DIFFICULTIES:
+                    for topic in TOPICS:
+                        if self.count(difficulty, topic) >= low_watermark:
+                            continue
+                        for _ in range(max_attempts):
+                            if self.count(difficulty, topic) >= high_watermark:
+                                break
+                            try:
+                                self.add(generate(batch_size, difficulty, topic), difficulty, topic)
+                            except Exception:
+                                break  # provider busy or bad output; try again next cycle
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="quiz-bank-replenisher", daemon=True)
+        thread.start()
+        return thread
@@ -2,10 +2,11 @@
 
 import os
 import streamlit as st
-import json
-import re
 from dotenv import load_dotenv
 
+from question_bank import ANY_TOPIC, TOPICS, QuestionBank
+from quiz_gen import generate_questions
+
 # --------------------------
 # Load environment variables
 # --------------------------
@@ -16,12 +17,12 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 # Groq AI Setup
 # --------------------------
 try:
-    from groq import Groq
+    from llm_client import LLMUnavailable, get_client
     if not GROQ_API_KEY:
         st.error("❌ Missing GROQ_API_KEY. Please set it in your .env file or environment variables.")
         groq_client = None
     else:
-        groq_client = Groq(api_key=GROQ_API_KEY)
+        groq_client = get_client()
 except Exception as e:
     st.error(f"Error importing Groq: {e}")
     groq_client = None
@@ -38,6 +39,24 @@ st.subheader("Test your knowledge and learn while having fun!")
 # --------------------------
 num_questions = st.sidebar.slider("Number of questions", 3, 10, 5)
 difficulty = st.sidebar.selectbox("Difficulty", ["easy", "medium", "hard"])
+topic_choice = st.sidebar.selectbox("Topic", ["Any topic"] + TOPICS)
+topic = ANY_TOPIC if topic_choice == "Any topic" else topic_choice
+
+# --------------------------
+# Question Bank (shared, refilled in the background)
+# --------------------------
+@st.cache_resource
+def init_question_bank():
+    bank = QuestionBank("quiz_bank.db")
+    if groq_client:
+        bank.start_replenisher(
+            lambda n, difficulty, topic: generate_questions(groq_client, n, difficulty, topic),
+            low_watermark=int(os.getenv("QUIZ_BANK_LOW_WATERMARK", "30")),
+            high_watermark=int(os.getenv("QUIZ_BANK_HIGH_WATERMARK", "60")),
+        )
+    return bank
+
+bank = init_question_bank()
 
 # Initialize session state
 if "quiz_data" not in st.session_state:
@@ -49,48 +68,39 @@ if "answers" not in st.session_state:
 # Generate Quiz Button
 # --------------------------
 if st.button("Generate Quiz"):
-    if not groq_client:
-        st.error("Groq client not available. Check your API key.")
-    else:
-        with st.spinner("Generating quiz questions..."):
-            prompt = f"""
-Generate {num_questions} multiple-choice questions about climate change.
-Difficulty level: {difficulty}.
-Each question should have 4 options labeled A, B, C, D.
-Provide the correct answer.
-Return ONLY valid JSON as an array of objects:
+    # Hot path: sample from the local bank, no network
+    questions = bank.sample(num_questions, difficulty, topic)
+    if len(questions) < num_questions:
+        # Bank is still warming up for this bucket: generate live once and keep the results
+        if not groq_client:
+            st.error("Groq client not available. Check your API key.")
+        else:
+            # Shards are generated concurrently; show each question as soon as it parses
+            preview_slot = st.empty()
+            preview = preview_slot.container()
+            progress = st.progress(0.0, text="Generating quiz questions...")
 
-[
-  {{
-    "question": "Question text",
-    "options": ["A) ...", "B) ...", "C) ...", "D) ..."],
-    "answer": "A"
-  }}
-]
-"""
-            try:
-                response = groq_client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful climate quiz generator."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=600
-                )
+            def show_question(q):
+                n = len(questions) + 1
+                questions.append(q)
+                preview.markdown(f"**Q{n}: {q['question']}**")
+                progress.progress(min(1.0, len(questions) / num_questions),
+                                  text=f"Generated {len(questions)}/{num_questions} questions...")
 
-                raw_content = response.choices[0].message.content.strip()
-                match = re.search(r"(\[.*\])", raw_content, re.DOTALL)
-                if match:
-                    quiz_json = match.group(1)
-                    st.session_state.quiz_data = json.loads(quiz_json)
-                    st.session_state.answers = {}
-                else:
-                    st.error("Failed to extract JSON from AI response.")
-                    st.session_state.quiz_data = []
+            try:
+                questions = []
+                generate_questions(groq_client, num_questions, difficulty, topic or "climate change",
+                                   on_question=show_question)
+                bank.add(questions, difficulty, topic or "climate change")
+            except LLMUnavailable as e:
+                st.warning(e.user_message())
             except Exception as e:
                 st.error(f"Error generating quiz: {e}")
-                st.session_state.quiz_data = []
+                questions = []
+            progress.empty()
+            preview_slot.empty()
+    st.session_state.quiz_data = questions
+    st.session_state.answers = {}
 
 # --------------------------
 # Display Quiz
@@ -0,0 +1,182 @@
+# quiz_gen.py
+"""LLM quiz question generation and validation, shared by quiz.py and the question bank.
+
+A quiz is split into shards of a few questions that are requested
+concurrently with asyncio. Each shard's token stream goes through an
+incremental JSON parser that emits every question object as soon as its
+closing brace arrives, so callers can render the first questions while the
+rest are still being generated. Malformed or duplicate items are dropped and
+only the missing count is re-requested, instead of failing the whole quiz.
+"""
+
+import asyncio
+import json
+import re
+
+PROMPT_TEMPLATE = """
+Generate {num_questions} multiple-choice questions about {topic}.
+Difficulty level: {difficulty}.
+Each question should have 4 options labeled A, B, C, D.
+Provide the correct answer.
+Return ONLY valid JSON as an array of objects:
+
+[
+  {{
+    "question": "Question text",
+    "options": ["A) ...", "B) ...", "C) ...", "D) ..."],
+    "answer": "A"
+  }}
+]
+"""
+
+LETTERS = ("A", "B", "C", "D")
+SHARD_SIZE = 3
+SHARD_RETRIES = 2
+TOKENS_PER_QUESTION = 150
+
+
+def validate_question(q):
+    """Return a cleaned question dict, or None if it is not a usable 4-option MCQ."""
+    if not isinstance(q, dict):
+        return None
+    question = q.get("question")
+    options = q.get("options")
+    answer = str(q.get("answer", "")).strip().upper()[:1]
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4 or not all(isinstance(o, str) and o.strip() for o in options):
+        return None
+    if answer not in LETTERS:
+        return None
+    return {"question": question.strip(), "options": [o.strip() for o in options], "answer": answer}
+
+
+def normalize_question(text):
+    """De-duplication key: case-folded alphanumerics only."""
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+# --------------------------
+# Incremental JSON parsing
+# --------------------------
+class IncrementalObjectParser:
+    """Feed text chunks; get back each complete top-level {...} object.
+
+    Brace depth is tracked outside of strings (honouring escapes), so text
+    around the objects - "[", commas, prose, code fences - is skipped. An
+    object that does not decode is returned as None.
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        objects = []
+        for ch in text:
+            if self._depth:
+                self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth:
+                self._in_string = True
+            elif ch == "{":
+                if not self._depth:
+                    self._buf = ["{"]
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    try:
+                        objects.append(json.loads("".join(self._buf)))
+                    except json.JSONDecodeError:
+                        objects.append(None)
+                    self._buf = []
+        return objects
+
+
+# --------------------------
+# Sharded generation
+# --------------------------
+def _messages(num_questions, difficulty, topic):
+    return [
+        {"role": "system", "content": "You are a helpful climate quiz generator."},
+        {"role": "user", "content": PROMPT_TEMPLATE.format(
+            num_questions=num_questions, difficulty=difficulty, topic=topic)}
+    ]
+
+
+async def generate_questions_async(client, num_questions, difficulty, topic="climate change",
+                                   shard_size=SHARD_SIZE, shard_retries=SHARD_RETRIES):
+    """Async generator yielding valid, distinct questions as soon as each is parsed."""
+    results = asyncio.Queue()
+    seen = set()
+    errors = []
+    done = object()
+
+    async def run_shard(wanted):
+        for _ in range(shard_retries + 1):
+            if wanted <= 0:
+                break
+            parser = IncrementalObjectParser()
+            try:
+                async for token in client.astream_chat(
+                        messages=_messages(wanted, difficulty, topic),
+                        temperature=0.3,
+                        max_tokens=TOKENS_PER_QUESTION * wanted + 50):
+                    for item in parser.feed(token):
+                        q = validate_question(item)
+                        if q is None or wanted <= 0:
+                            continue
+                        norm = normalize_question(q["question"])
+                        if norm in seen:
+                            continue
+                        seen.add(norm)
+                        wanted -= 1
+                        await results.put(q)
+            except Exception as e:
+                errors.append(e)
+        await results.put(done)
+
+    shards = [min(shard_size, num_questions - i) for i in range(0, num_questions, shard_size)]
+    tasks = [asyncio.create_task(run_shard(n)) for n in shards]
+    produced = 0
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await results.get()
+            if item is done:
+                remaining -= 1
+                continue
+            produced += 1
+            yield item
+        if not produced and errors:
+            raise errors[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.aclose()
+
+
+def generate_questions(client, num_questions, difficulty, topic="climate change", on_question=None):
+    """Blocking wrapper: run the sharded generation and return the questions.
+
+    on_question(q) is called for each question as it arrives, in this thread.
+    """
+    async def collect():
+        questions = []
+        async for q in generate_questions_async(client, num_questions, difficulty, topic):
+            questions.append(q)
+            if on_question:
+                on_question(q)
+        return questions
+
+    return asyncio.run(collect())
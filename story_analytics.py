@@ -0,0 +1,353 @@
+# story_analytics.py
+"""Streaming decision analytics for the Climate Story Game.
+
+Playthroughs are not stored. Each start, choice and finish event is folded
+into fixed-size aggregates per role, so memory and query cost depend on the
+size of the story graph, never on the number of playthroughs:
+
+    started, finished        playthroughs begun / completed
+    reached[scene]           times a scene was shown
+    chosen[choice]           times each choice was taken
+    scores[score]            final eco scores, one bin per possible score
+    players                  HyperLogLog registers: distinct players (~1.6% error)
+
+Every aggregate is mergeable: counts add up and HyperLogLog registers take
+the maximum. That lets each app process write its own shard, and a dashboard
+merges the shards in one pass:
+
+    story_analytics/<shard>.npz     <shard> defaults to <hostname>-<slot>
+    story_analytics/<shard>.lock    held by the process writing that shard
+
+Two processes must never share a shard name, or each would overwrite the
+other's counts. By default a process takes the lowest worker slot whose lock
+no live process holds, and resumes that slot's shard. Locks are released
+when a process exits, so restarts reuse slots and the number of shards stays
+at the most processes that ever ran at once on a host. A fixed `shard` (e.g.
+per server) is used as given, without a lock.
+
+Drop-off at a scene is what reached it minus what chose anything there.
+Aggregates are keyed by scene id and choice label, not by position, so
+shards stay readable after the graph is edited. Counts for scenes or choices
+that no longer exist are dropped on load.
+
+Events are queued and folded in batches by a writer thread, which saves its
+shard atomically every `flush_interval` seconds and on close():
+
+    analytics = StoryAnalytics(compile_story())
+    analytics.start(player, "Mayor")
+    analytics.choice(player, "Mayor", scene, choice)
+    analytics.finish(player, "Mayor", score)
+    summary(analytics.snapshot(), "Mayor")
+"""
+
+import atexit
+import fcntl
+import hashlib
+import os
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+START, CHOICE, FINISH = 0, 1, 2
+HLL_BITS = 12   # 4096 registers per role: ~1.6% standard error
+_STOP = object()
+
+
+# -----------------------------
+# HyperLogLog
+# -----------------------------
+def player_hash(player):
+    return int.from_bytes(hashlib.blake2b(str(player).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hll_update(registers, rows, hashes, bits=HLL_BITS):
+    """Add 64-bit hashes (uint64 array) to registers[rows] in place."""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - bits)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - bits)) - 1)
+    # rank = position of the leftmost 1 in the remaining 64 - bits bits (bit_length by halving)
+    length = np.zeros(len(rest), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = rest >= np.uint64(1 << shift)
+        length += shift * high
+        rest = np.where(high, rest >> np.uint64(shift), rest)
+    length += rest > 0
+    np.maximum.at(registers, (rows, index), (64 - bits - length + 1).astype(np.uint8))
+
+
+def hll_estimate(registers):
+    """Distinct count from one row of registers."""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)   # small-range correction (linear counting)
+    return int(round(estimate))
+
+
+# -----------------------------
+# Aggregates
+# -----------------------------
+class Aggregates:
+    """Mergeable counts for one story graph; every array has a fixed size."""
+
+    def __init__(self, roles, scenes, choice_keys, endings, score_range):
+        self.roles = list(roles)
+        self.scenes = list(scenes)
+        self.choice_keys = list(choice_keys)   # "scene id\x1fchoice label", in story order
+        self.endings = np.asarray(endings, dtype=bool)
+        self.score_range = tuple(score_range)
+        r, low, high = len(self.roles), *self.score_range
+        self.started = np.zeros(r, dtype=np.int64)
+        self.finished = np.zeros(r, dtype=np.int64)
+        self.reached = np.zeros((r, len(self.scenes)), dtype=np.int64)
+        self.chosen = np.zeros((r, len(self.choice_keys)), dtype=np.int64)
+        self.scores = np.zeros((r, high - low + 1), dtype=np.int64)
+        self.players = np.zeros((r, 1 << HLL_BITS), dtype=np.uint8)
+
+    @classmethod
+    def for_story(cls, story):
+        keys = [f"{scene_id}\x1f{label}" for scene_id, choices in zip(story.ids, story.choices)
+                for label, *_ in choices]
+        return cls(story.roles, story.ids, keys, [story.is_ending(i) for i in range(len(story))],
+                   story.score_range)
+
+    def empty_like(self):
+        return Aggregates(self.roles, self.scenes, self.choice_keys, self.endings, self.score_range)
+
+    def merge(self, other):
+        """Add other's counts into self (in place), matching roles, scenes and choices by name."""
+        if (other.roles, other.scenes, other.choice_keys, other.score_range) == \
+                (self.roles, self.scenes, self.choice_keys, self.score_range):
+            self.started += other.started
+            self.finished += other.finished
+            self.reached += other.reached
+            self.chosen += other.chosen
+            self.scores += other.scores
+            np.maximum(self.players, other.players, out=self.players)
+            return self
+        rows, own_rows = _align(other.roles, self.roles)
+        scene_cols, own_scenes = _align(other.scenes, self.scenes)
+        choice_cols, own_choices = _align(other.choice_keys, self.choice_keys)
+        self.started[own_rows] += other.started[rows]
+        self.finished[own_rows] += other.finished[rows]
+        self.reached[np.ix_(own_rows, own_scenes)] += other.reached[np.ix_(rows, scene_cols)]
+        self.chosen[np.ix_(own_rows, own_choices)] += other.chosen[np.ix_(rows, choice_cols)]
+        low, high = self.score_range
+        scores = np.clip(np.arange(other.score_range[0], other.score_range[1] + 1), low, high) - low
+        for row, own in zip(rows, own_rows):
+            np.add.at(self.scores[own], scores, other.scores[row])
+        self.players[own_rows] = np.maximum(self.players[own_rows], other.players[rows])
+        return self
+
+    def copy(self):
+        return self.empty_like().merge(self)
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, roles=np.array(self.roles), scenes=np.array(self.scenes),
+                 choice_keys=np.array(self.choice_keys, dtype=str), endings=self.endings,
+                 score_range=np.array(self.score_range), started=self.started, finished=self.finished,
+                 reached=self.reached, chosen=self.chosen, scores=self.scores, players=self.players)
+        os.replace(tmp, path)   # readers never see half a shard
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            agg = cls(f["roles"].tolist(), f["scenes"].tolist(), f["choice_keys"].tolist(), f["endings"],
+                      f["score_range"].tolist())
+            for name in ("started", "finished", "reached", "chosen", "scores", "players"):
+                getattr(agg, name)[...] = f[name]
+        return agg
+
+
+def _claim_slot(root):
+    """(shard name, open lock file) for the lowest free worker slot on this host."""
+    host = socket.gethostname()
+    slot = 0
+    while True:
+        f = open(os.path.join(root, f"{host}-{slot}.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f"{host}-{slot}", f
+        except BlockingIOError:
+            f.close()
+            slot += 1
+
+
+def _align(theirs, ours):
+    """(their positions, our positions) of the names both sides have."""
+    index = {name: i for i, name in enumerate(ours)}
+    pairs = [(i, index[name]) for i, name in enumerate(theirs) if name in index]
+    return (np.array([p[0] for p in pairs], dtype=np.int64),
+            np.array([p[1] for p in pairs], dtype=np.int64))
+
+
+def load_shards(root, story):
+    """All shards in root merged into one Aggregates for story."""
+    total = Aggregates.for_story(story)
+    for name in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if name.endswith(".npz") and ".tmp" not in name:
+            total.merge(Aggregates.load(os.path.join(root, name)))
+    return total
+
+
+def summary(agg, role=None):
+    """Dashboard numbers for one role (None = all roles).
+
+    {"players", "started", "finished", "completion", "score_counts", "mean_score",
+     "median_score", "scenes": [{"scene", "reached", "choices": [(label, count)], "dropped"}]}
+    """
+    rows = slice(None) if role is None else [agg.roles.index(role)]
+    reached = agg.reached[rows].sum(axis=0)
+    chosen = agg.chosen[rows].sum(axis=0)
+    scores = agg.scores[rows].sum(axis=0)
+    started, finished = int(agg.started[rows].sum()), int(agg.finished[rows].sum())
+    low = agg.score_range[0]
+    values = np.arange(low, low + len(scores))
+    n = int(scores.sum())
+    median = int(values[np.searchsorted(np.cumsum(scores), (n + 1) // 2)]) if n else None
+    scenes, col = [], 0
+    for s, scene_id in enumerate(agg.scenes):
+        labels = []
+        while col < len(agg.choice_keys) and agg.choice_keys[col].split("\x1f", 1)[0] == scene_id:
+            labels.append((agg.choice_keys[col].split("\x1f", 1)[1], int(chosen[col])))
+            col += 1
+        left = int(reached[s]) - (sum(count for _, count in labels) if labels else int(reached[s]))
+        scenes.append({"scene": scene_id, "ending": bool(agg.endings[s]), "reached": int(reached[s]),
+                       "choices": labels, "dropped": max(left, 0)})
+    return {"players": hll_estimate(agg.players[rows].max(axis=0)), "started": started, "finished": finished,
+            "completion": finished / started if started else 0.0, "score_counts": scores,
+            "mean_score": float(values @ scores / n) if n else None, "median_score": median, "scenes": scenes}
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+class StoryAnalytics:
+    def __init__(self, story, root="story_analytics", shard=None, batch_size=10000, flush_interval=5.0,
+                 max_pending=100000):
+        self.story = story
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._slot_lock = None   # held until close() when the shard is a claimed slot
+        if not shard:
+            shard, self._slot_lock = _claim_slot(root)
+        self.path = os.path.join(root, f"{shard}.npz")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._roles = {role: i for i, role in enumerate(story.roles)}
+        # flat choice number = first choice of the scene + choice index
+        self._offsets = np.cumsum([0] + [len(c) for c in story.choices])
+        self._targets = np.array([c[4] for choices in story.choices for c in choices], dtype=np.int64)
+        self._lock = threading.Lock()
+        self._agg = Aggregates.for_story(story)
+        if os.path.exists(self.path):
+            self._agg.merge(Aggregates.load(self.path))
+        self._others = {}   # shard path -> (mtime, Aggregates)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.stats = {"events": 0, "batches": 0, "saves": 0}
+        self._writer = threading.Thread(target=self._run, name="story-analytics-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # -----------------------------
+    # Events
+    # -----------------------------
+    def start(self, player, role):
+        self._queue.put((START, self._roles[role], player_hash(player), 0))
+
+    def choice(self, player, role, scene, choice):
+        """Choice number `choice` of scene index `scene` in the compiled story."""
+        self._queue.put((CHOICE, self._roles[role], int(self._offsets[scene]) + choice, 0))
+
+    def finish(self, player, role, score):
+        low, high = self.story.score_range
+        self._queue.put((FINISH, self._roles[role], min(max(score, low), high) - low, 0))   # histogram bin
+
+    def flush(self, timeout=None):
+        """Block until every event queued before this call is counted and the shard is saved."""
+        if not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        if self._slot_lock:
+            self._slot_lock.close()   # the shard is saved; another process may take the slot
+
+    def _run(self):
+        last_save = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            events = [item for item in batch if isinstance(item, tuple)]
+            if events:
+                self._fold(events)
+                dirty = True
+            waiting = [item for item in batch if isinstance(item, threading.Event)]
+            if dirty and (waiting or _STOP in batch or time.monotonic() - last_save >= self.flush_interval):
+                self._save()
+                last_save, dirty = time.monotonic(), False
+            for item in waiting:
+                item.set()
+            if _STOP in batch:
+                return
+
+    def _fold(self, events):
+        kind, role, value, _ = np.array(events, dtype=np.uint64).T
+        kind, role = kind.astype(np.int64), role.astype(np.int64)
+        starts, choices, finishes = kind == START, kind == CHOICE, kind == FINISH
+        choice_ids = value[choices].astype(np.int64)
+        scores = value[finishes].astype(np.int64)
+        with self._lock:
+            agg = self._agg
+            np.add.at(agg.started, role[starts], 1)
+            np.add.at(agg.reached, (role[starts], self.story.start_scene), 1)
+            hll_update(agg.players, role[starts], value[starts])
+            np.add.at(agg.chosen, (role[choices], choice_ids), 1)
+            np.add.at(agg.reached, (role[choices], self._targets[choice_ids]), 1)
+            np.add.at(agg.finished, role[finishes], 1)
+            np.add.at(agg.scores, (role[finishes], scores), 1)
+            self.stats["events"] += len(events)
+            self.stats["batches"] += 1
+
+    def _save(self):
+        with self._lock:
+            agg = self._agg.copy()
+        agg.save(self.path)
+        self.stats["saves"] += 1
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def snapshot(self):
+        """This process's live aggregates merged with every other shard in root."""
+        with self._lock:
+            total = self._agg.copy()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not name.endswith(".npz") or ".tmp" in name or path == self.path:
+                continue
+            mtime = os.path.getmtime(path)
+            cached = self._others.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = self._others[path] = (mtime, Aggregates.load(path))
+            total.merge(cached[1])
+        return total
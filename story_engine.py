@@ -0,0 +1,260 @@
+# story_engine.py
+"""Data-driven story graph for the Climate Story Game.
+
+Scenes, choices, score deltas and facts live in story_graph.json; a scene
+without choices is an ending. compile_story() validates the whole graph once
+per process (unknown targets, duplicate ids, unreachable scenes, scenes that
+can never reach an ending, malformed fields) and turns it into
+integer-indexed lists, so a decision costs a few list lookups however many
+scenes there are:
+
+    story = compile_story()
+    story.start(st.session_state, "Mayor")
+    st.button(label, on_click=story.choose, args=(st.session_state, scene, i))
+
+The game state is a handful of keys in a mapping (Streamlit's
+session_state): step (scene index, None before the game starts), role,
+eco_score, history (the record of each choice made) and fact (the fact of
+the last choice, shown on the scene it led to). choose() is meant for
+on_click callbacks: it runs before the rerun, so one click is one script run.
+
+Check a graph without starting the app:
+
+    python story_engine.py story_graph.json
+"""
+
+import argparse
+import bisect
+import json
+import os
+from collections import deque
+from functools import lru_cache
+
+STORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "story_graph.json")
+LEVELS = ("success", "info", "warning", "error")
+
+
+def _unique_keys(pairs):
+    # json object_pairs_hook: a repeated scene id would otherwise silently replace the first
+    obj = {}
+    for key, value in pairs:
+        if key in obj:
+            raise ValueError(f"duplicate key {key!r}")
+        obj[key] = value
+    return obj
+
+
+def load_graph(path=STORY_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f, object_pairs_hook=_unique_keys)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_graph(graph):
+    """Every problem with graph, as a list of messages (empty if it is playable).
+
+    Each field is type-checked before it is used, so a malformed graph gives
+    messages, never an exception.
+    """
+    if not isinstance(graph, dict):
+        return ["the graph must be a JSON object"]
+    problems = []
+    scenes = graph.get("scenes")
+    if not isinstance(scenes, dict) or not scenes:
+        return ["'scenes' must be a non-empty object"]
+    start = graph.get("start")
+    if not isinstance(start, str) or start not in scenes:
+        problems.append(f"start scene {start!r} does not exist")
+    score_range = graph.get("score_range", [0, 100])
+    if (isinstance(score_range, list) and len(score_range) == 2 and all(map(_is_int, score_range))
+            and score_range[0] <= score_range[1]):
+        low, high = score_range
+    else:
+        problems.append("'score_range' must be [low, high], two integers with low <= high")
+        low, high = 0, 100
+    initial = graph.get("initial_score")
+    if not _is_int(initial) or not low <= initial <= high:
+        problems.append(f"initial_score must be an integer in {low}..{high}")
+    roles = graph.get("roles")
+    if not isinstance(roles, list) or not roles or not all(isinstance(r, str) and r for r in roles):
+        problems.append("'roles' must be a non-empty list of names")
+    elif len(set(roles)) < len(roles):
+        problems.append("'roles' lists a name twice")
+
+    for scene_id, scene in scenes.items():
+        where = f"scene {scene_id!r}"
+        if not isinstance(scene, dict):
+            problems.append(f"{where}: must be an object")
+            continue
+        if not isinstance(scene.get("title"), str) or not scene["title"]:
+            problems.append(f"{where}: missing title")
+        if not isinstance(scene.get("text", ""), str):
+            problems.append(f"{where}: text must be a string")
+        choices = scene.get("choices", [])
+        if not isinstance(choices, list):
+            problems.append(f"{where}: 'choices' must be a list")
+            continue
+        labels = set()
+        for i, choice in enumerate(choices):
+            at = f"{where} choice {i + 1}"
+            if not isinstance(choice, dict):
+                problems.append(f"{at}: must be an object")
+                continue
+            label = choice.get("label")
+            if not isinstance(label, str) or not label:
+                problems.append(f"{at}: missing label")
+            elif label in labels:
+                problems.append(f"{at}: label {label!r} used twice")
+            else:
+                labels.add(label)
+            if not _is_int(choice.get("delta", 0)):
+                problems.append(f"{at}: delta must be an integer")
+            for field in ("record", "fact"):
+                if choice.get(field) is not None and not isinstance(choice[field], str):
+                    problems.append(f"{at}: {field} must be a string")
+            target = choice.get("next")
+            if not isinstance(target, str) or target not in scenes:
+                problems.append(f"{at}: next scene {target!r} does not exist")
+            unknown = set(choice) - {"label", "record", "delta", "fact", "next"}
+            if unknown:
+                problems.append(f"{at}: unknown fields {sorted(unknown)}")
+
+    outcomes = graph.get("outcomes")
+    if not isinstance(outcomes, list) or not outcomes:
+        problems.append("'outcomes' must be a non-empty list")
+        outcomes = []
+    thresholds = []
+    for i, o in enumerate(outcomes):
+        at = f"outcome {i + 1}"
+        if not isinstance(o, dict):
+            problems.append(f"{at}: must be an object")
+            continue
+        if not _is_int(o.get("min_score")):
+            problems.append(f"{at}: min_score must be an integer")
+        else:
+            thresholds.append(o["min_score"])
+        if o.get("level") not in LEVELS:
+            problems.append(f"{at}: level must be one of {LEVELS}")
+        if not isinstance(o.get("text"), str) or not o["text"]:
+            problems.append(f"{at}: missing text")
+    if thresholds and min(thresholds) > low:
+        problems.append(f"'outcomes' must cover every score down to {low}")
+    if problems:
+        return problems
+
+    # Graph shape: every scene reachable from the start, and every scene able to reach an ending
+    edges = {sid: [c["next"] for c in scene.get("choices", [])] for sid, scene in scenes.items()}
+    reached = _reachable([graph["start"]], edges)
+    reverse = {sid: [] for sid in scenes}
+    for sid, targets in edges.items():
+        for target in targets:
+            reverse[target].append(sid)
+    finishing = _reachable([sid for sid, targets in edges.items() if not targets], reverse)
+    problems += [f"scene {sid!r} is unreachable from the start" for sid in scenes if sid not in reached]
+    problems += [f"scene {sid!r} can never reach an ending" for sid in scenes if sid in reached and sid not in finishing]
+    return problems
+
+
+def _reachable(roots, edges):
+    seen, todo = set(roots), deque(roots)
+    while todo:
+        for target in edges[todo.popleft()]:
+            if target not in seen:
+                seen.add(target)
+                todo.append(target)
+    return seen
+
+
+class CompiledStory:
+    """A validated story graph with scenes numbered 0..n-1."""
+
+    def __init__(self, graph):
+        self.version = graph.get("version")
+        self.ids = list(graph["scenes"])
+        index = {scene_id: i for i, scene_id in enumerate(self.ids)}
+        scenes = [graph["scenes"][scene_id] for scene_id in self.ids]
+        self.titles = [scene["title"] for scene in scenes]
+        self.texts = [scene.get("text", "") for scene in scenes]
+        # (label, record, delta, fact, next scene index) per choice
+        self.choices = [[(c["label"], c.get("record", c["label"]), c.get("delta", 0), c.get("fact"), index[c["next"]])
+                         for c in scene.get("choices", [])] for scene in scenes]
+        self.start_scene = index[graph["start"]]
+        self.initial_score = graph["initial_score"]
+        self.score_range = tuple(graph.get("score_range", (0, 100)))
+        self.roles = list(graph["roles"])
+        outcomes = sorted(graph["outcomes"], key=lambda o: o["min_score"])
+        self._thresholds = [o["min_score"] for o in outcomes]
+        self._outcomes = [(o["level"], o["text"]) for o in outcomes]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_ending(self, scene):
+        return not self.choices[scene]
+
+    def reset(self, state):
+        """Back to role selection (also initializes a fresh session)."""
+        state["step"] = None
+        state["role"] = None
+        state["eco_score"] = self.initial_score
+        state["history"] = []
+        state["fact"] = None
+
+    def start(self, state, role):
+        self.reset(state)
+        state["role"] = role
+        state["step"] = self.start_scene
+
+    def choose(self, state, scene, choice):
+        """Apply choice number `choice` of `scene`.
+
+        Returns False, changing nothing, if the game is no longer on that scene
+        (a second click on a button from an already-answered scene).
+        """
+        if state.get("step") != scene:
+            return False
+        _, record, delta, fact, target = self.choices[scene][choice]
+        low, high = self.score_range
+        state["eco_score"] = min(max(state["eco_score"] + delta, low), high)
+        state["history"].append(record)
+        state["fact"] = fact
+        state["step"] = target
+        return True
+
+    def progress(self, score):
+        """score as a 0..1 fraction of score_range, e.g. for st.progress."""
+        low, high = self.score_range
+        return (score - low) / (high - low) if high > low else 1.0
+
+    def outcome(self, score):
+        """(level, text) of the outcome band score falls in."""
+        return self._outcomes[max(bisect.bisect_right(self._thresholds, score) - 1, 0)]
+
+
+@lru_cache(maxsize=None)
+def compile_story(path=STORY_PATH):
+    """Load, validate and compile a story graph (once per path per process)."""
+    graph = load_graph(path)
+    problems = validate_graph(graph)
+    if problems:
+        raise ValueError(f"Invalid story graph {path}:\n  " + "\n  ".join(problems))
+    return CompiledStory(graph)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a Climate Story Game graph.")
+    parser.add_argument("path", nargs="?", default=STORY_PATH)
+    args = parser.parse_args()
+    try:
+        story = compile_story(args.path)
+    except (OSError, ValueError) as e:   # unreadable file, bad JSON (a ValueError) or an invalid graph
+        raise SystemExit(str(e))
+    endings = sum(story.is_ending(i) for i in range(len(story)))
+    print(f"OK: {len(story)} scenes, {sum(map(len, story.choices))} choices, {endings} endings")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,101 @@
+import os
+import statistics
+import time
+import uuid
+
 import streamlit as st
 
+import story_analytics
+from story_analytics import StoryAnalytics
+from story_engine import STORY_PATH, compile_story
+
+# Scenes, choices and facts come from story_graph.json, validated and compiled once per process
+story = compile_story(os.getenv("STORY_GRAPH", STORY_PATH))
+
+@st.cache_resource
+def init_story_analytics():
+    # One aggregate shard per app process (a reused <hostname>-<slot> unless STORY_ANALYTICS_SHARD names it);
+    # the educator view merges every shard in the directory
+    return StoryAnalytics(story, os.getenv("STORY_ANALYTICS_DIR", "story_analytics"),
+                          shard=os.getenv("STORY_ANALYTICS_SHARD") or None)
+
+analytics = init_story_analytics()
+
 # -------------------------
 # Initialize session state
 # -------------------------
 if "step" not in st.session_state:
-    st.session_state.step = "intro"
-if "role" not in st.session_state:
-    st.session_state.role = None
-if "eco_score" not in st.session_state:
-    st.session_state.eco_score = 50  # start at neutral
-if "history" not in st.session_state:
-    st.session_state.history = []
+    story.reset(st.session_state)   # step, role, eco_score (start at neutral), history, fact
+    st.session_state.runs = 0
+    st.session_state.clicks = 0
+    st.session_state.latencies = []   # seconds from a click to the end of the run that shows its result
+    st.session_state.player = uuid.uuid4().hex   # anonymous id, only used to count distinct players
+st.session_state.runs += 1
+
+# -------------------------
+# Callbacks
+# -------------------------
+# Buttons apply their effect in on_click, which Streamlit runs before the rerun
+# the click triggers, so every click costs exactly one script run.
+def clicked():
+    st.session_state.clicks += 1
+    st.session_state.clicked_at = time.perf_counter()
+
+def start_game():
+    story.start(st.session_state, st.session_state.role_choice)
+    analytics.start(st.session_state.player, st.session_state.role)
+    clicked()
+
+def choose(scene, choice):
+    state = st.session_state
+    if story.choose(state, scene, choice):
+        analytics.choice(state.player, state.role, scene, choice)
+        if story.is_ending(state.step):
+            analytics.finish(state.player, state.role, state.eco_score)
+        clicked()
+
+def play_again():
+    story.reset(st.session_state)
+    clicked()
+
+def score_text(score):
+    low, high = story.score_range
+    return f"{score}/{high}" if low == 0 else f"{score} (of {low} to {high})"
 
 # -------------------------
-# Helper functions
+# Educator view
 # -------------------------
-def add_decision(text, score_change, fact=None):
-    st.session_state.history.append(text)
-    st.session_state.eco_score += score_change
-    if st.session_state.eco_score < 0:
-        st.session_state.eco_score = 0
-    if st.session_state.eco_score > 100:
-        st.session_state.eco_score = 100
-    if fact:
-        st.info(f"🌍 Fact: {fact}")
-
-def go_to_step(step_name):
-    st.session_state.step = step_name
-    try:
-        st.rerun()
-    except AttributeError:  # backward compatibility
-        st.experimental_rerun()
+def educator_view():
+    st.subheader("🎓 Educator View")
+    st.write("How players move through the story, aggregated over every playthrough.")
+    role = st.selectbox("Role", ["All roles"] + story.roles)
+    t0 = time.perf_counter()
+    stats = story_analytics.summary(analytics.snapshot(), None if role == "All roles" else role)
+    seconds = time.perf_counter() - t0
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Players (≈)", f"{stats['players']:,}")
+    col2.metric("Playthroughs", f"{stats['started']:,}")
+    col3.metric("Completed", f"{stats['completion']:.0%}")
+    col4.metric("Median Eco Score", "–" if stats["median_score"] is None else stats["median_score"])
+
+    st.markdown("### 📊 Final Eco Scores")
+    low, high = story.score_range
+    st.bar_chart({"Eco Score": list(range(low, high + 1)), "Playthroughs": stats["score_counts"].tolist()},
+                 x="Eco Score", y="Playthroughs")
+
+    st.markdown("### 🧭 Choices and Drop-off per Scene")
+    rows = []
+    for scene in stats["scenes"]:
+        if scene["ending"]:
+            continue
+        title = story.titles[story.ids.index(scene["scene"])]
+        reached = scene["reached"]
+        for label, count in scene["choices"] + [("🚪 Left the game here", scene["dropped"])]:
+            rows.append({"Scene": title, "Reached": reached, "Choice": label, "Players": count,
+                         "Share": f"{count / reached:.0%}" if reached else "–"})
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    st.caption(f"Answered from constant-size aggregates in {seconds * 1000:.1f} ms")
 
 # -------------------------
 # UI Header
@@ -39,79 +104,58 @@ st.set_page_config(page_title="Climate Story Game", page_icon="🌱", layout="wi
 st.title("🌍 Interactive Climate Story Game")
 st.write("Make choices to protect your world and learn about sustainability.")
 
-st.progress(st.session_state.eco_score / 100)
-st.caption(f"🌱 Eco Score: {st.session_state.eco_score}/100")
+st.progress(story.progress(st.session_state.eco_score))
+st.caption(f"🌱 Eco Score: {score_text(st.session_state.eco_score)}")
 
 # -------------------------
 # Story Steps
 # -------------------------
-if st.session_state.step == "intro":
+step = st.session_state.step
+educator = st.sidebar.toggle("🎓 Educator view")
+if st.session_state.fact and not educator:
+    st.info(f"🌍 Fact: {st.session_state.fact}")
+
+if educator:
+    educator_view()
+
+elif step is None:
     st.subheader("Welcome Hero!")
     st.write("Choose your role for this mission:")
-    role = st.radio("Select your character:", ["Scientist", "Activist", "Mayor"])
-    if st.button("Start Adventure 🚀"):
-        st.session_state.role = role
-        go_to_step("scene1")
-
-elif st.session_state.step == "scene1":
-    st.subheader("Scene 1: The Energy Crisis ⚡")
-    st.write("Your city faces frequent blackouts. What will you propose?")
-    if st.button("Build more coal plants"):
-        add_decision("Built more coal plants", -20,
-                     "Coal energy is the largest contributor to CO2 emissions.")
-        go_to_step("scene2")
-    if st.button("Invest in solar & wind farms"):
-        add_decision("Invested in renewables", +20,
-                     "Renewable energy reduces emissions and creates jobs.")
-        go_to_step("scene2")
-
-elif st.session_state.step == "scene2":
-    st.subheader("Scene 2: Food Choices 🍔🥦")
-    st.write("Dietary habits impact emissions. What campaign do you launch?")
-    if st.button("Promote plant-based meals"):
-        add_decision("Promoted plant-based meals", +15,
-                     "Shifting to plant-based diets can cut food emissions by up to 50%.")
-        go_to_step("scene3")
-    if st.button("Encourage fast-food chains"):
-        add_decision("Encouraged fast food", -15,
-                     "Fast food often relies on high-emission meat production.")
-        go_to_step("scene3")
-
-elif st.session_state.step == "scene3":
-    st.subheader("Scene 3: Transportation 🚗🚲")
-    st.write("The city is clogged with traffic. What’s your solution?")
-    if st.button("Expand highways for more cars"):
-        add_decision("Expanded highways", -20,
-                     "More roads = more cars = more emissions (induced demand).")
-        go_to_step("ending")
-    if st.button("Invest in public transport & cycling"):
-        add_decision("Invested in public transport", +20,
-                     "Public transport reduces emissions and congestion.")
-        go_to_step("ending")
-
-elif st.session_state.step == "ending":
-    st.subheader("🌟 Your Climate Journey Ends Here")
-    st.write("Here’s what you achieved as a", st.session_state.role)
+    st.radio("Select your character:", story.roles, key="role_choice")
+    st.button("Start Adventure 🚀", on_click=start_game)
+
+elif not story.is_ending(step):
+    st.subheader(story.titles[step])
+    st.write(story.texts[step])
+    for i, (label, *_) in enumerate(story.choices[step]):
+        st.button(label, key=f"choice-{step}-{i}", on_click=choose, args=(step, i))
+
+else:
+    st.subheader(story.titles[step])
+    st.write(story.texts[step] or f"Here’s what you achieved as a {st.session_state.role}")
 
     st.markdown("### 📝 Decisions You Made:")
     for i, d in enumerate(st.session_state.history, 1):
         st.write(f"{i}. {d}")
 
-    st.progress(st.session_state.eco_score / 100)
-    st.caption(f"Final Eco Score: {st.session_state.eco_score}/100")
-
-    if st.session_state.eco_score >= 70:
-        st.success("🎉 Amazing! Your city thrives in harmony with nature.")
-    elif st.session_state.eco_score >= 40:
-        st.warning("⚖️ Mixed outcomes. Some progress, but challenges remain.")
-    else:
-        st.error("💀 Disaster! Your city suffers from climate breakdown.")
-
-    if st.button("🔄 Play Again"):
-        st.session_state.step = "intro"
-        st.session_state.eco_score = 50
-        st.session_state.history = []
-        try:
-            st.rerun()
-        except AttributeError:
-            st.experimental_rerun()
+    st.progress(story.progress(st.session_state.eco_score))
+    st.caption(f"Final Eco Score: {score_text(st.session_state.eco_score)}")
+
+    level, text = story.outcome(st.session_state.eco_score)
+    getattr(st, level)(text)
+
+    st.button("🔄 Play Again", on_click=play_again)
+
+# -------------------------
+# Engine stats
+# -------------------------
+clicked_at = st.session_state.pop("clicked_at", None)
+if clicked_at is not None:
+    st.session_state.latencies = (st.session_state.latencies + [time.perf_counter() - clicked_at])[-100:]
+with st.sidebar.expander("⏱️ Engine stats"):
+    latencies = st.session_state.latencies
+    st.write(f"Story: {len(story)} scenes (graph version {story.version})")
+    st.write(f"Script runs: {st.session_state.runs} for {st.session_state.clicks} clicks (+1 initial load)")
+    if latencies:
+        st.write(f"Click to rendered: last {latencies[-1] * 1000:.1f} ms, "
+                 f"median {statistics.median(latencies) * 1000:.1f} ms")
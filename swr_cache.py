@@ -0,0 +1,120 @@
+# swr_cache.py
+"""In-process TTL cache with stale-while-revalidate and single-flight loads.
+
+    cache = SWRCache(ttl=1800, stale_ttl=86400)
+    value = cache.get(key, loader)
+
+- fresh (age < ttl): returned immediately
+- stale (age < ttl + stale_ttl): returned immediately, and one background
+  refresh is started
+- missing/expired: loaded; concurrent callers for the same key wait on the
+  one in-flight load instead of each calling `loader`
+- if a load fails and any old value exists, the old value is served
+
+Ages count from when a value was stored, unless `stored_at(value)` is given
+to read the value's own timestamp (e.g. one loaded from a slower shared tier).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SWRCache:
+    def __init__(self, ttl, stale_ttl=0.0, max_entries=1024, stored_at=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.stored_at = stored_at
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, stored_at)
+        self._inflight = {}             # key -> _Flight
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0,
+                      "coalesced": 0, "errors": 0, "stale_on_error": 0}
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = time.time() - entry[1]
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                    return entry[0]
+                if age < self.ttl + self.stale_ttl:
+                    self.stats["stale_hits"] += 1
+                    self._start_background(key, loader)
+                    return entry[0]
+            self.stats["misses"] += 1
+        return self._load(key, loader)
+
+    def peek(self, key):
+        """(value, age_seconds) without loading, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return (entry[0], time.time() - entry[1]) if entry else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def refresh(self, key, loader):
+        """Reload `key` now (coalesced with any load already in flight)."""
+        return self._load(key, loader)
+
+    def _load(self, key, loader):
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.stats["coalesced"] += 1
+
+        if leader:
+            self._run(key, loader, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is None:
+            return flight.value
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stats["stale_on_error"] += 1
+                return entry[0]
+        raise flight.error
+
+    def _start_background(self, key, loader):
+        # Called with the lock held; at most one load per key is ever in flight
+        if key not in self._inflight:
+            flight = self._inflight[key] = _Flight()
+            threading.Thread(target=self._run, args=(key, loader, flight), daemon=True).start()
+
+    def _run(self, key, loader, flight):
+        try:
+            flight.value = loader()
+            with self._lock:
+                self.stats["loads"] += 1
+                self._store(key, flight.value)
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _store(self, key, value):
+        self._entries[key] = (value, self.stored_at(value) if self.stored_at else time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from footprint_engine import INPUT_COLUMNS, calculate_footprint, compile_profile, compute_columns, run_batch
+
+# Outputs carbon.py and climate_dashboard.py produced with their original
+# hard-coded formulas; the shared factor table must keep reproducing them.
+
+# (km_driven, flights, electricity, meat_meals) -> (car, flight, electricity, diet) kg/year
+CARBON_GOLDEN = [
+    ((0, 0, 0, 0), (0.0, 0.0, 0.0, 0.0)),
+    ((100, 4, 300, 7), (624.0, 1000.0, 1800.0, 6370.0)),
+    ((35.5, 1, 150.0, 3), (221.52, 250.0, 900.0, 2730.0)),
+    ((500, 12, 2000, 21), (3120.0, 3000.0, 12000.0, 19110.0)),
+]
+
+# (miles, meat_meals, electricity, waste_kg) -> (total, breakdown) tons/year
+DASHBOARD_GOLDEN = [
+    ((0, 0, 0, 0), (0.0, {"Transport": 0.0, "Diet": 0.0, "Energy": 0.0, "Waste": 0.0})),
+    ((20, 7, 300, 10), (3.8619892, {"Transport": 0.0029492, "Diet": 0.546, "Energy": 3.312, "Waste": 0.00104})),
+    ((200, 21, 2000, 100), (23.757892, {"Transport": 0.029492, "Diet": 1.638, "Energy": 22.08, "Waste": 0.0104})),
+    ((3, 0, 120, 2), (1.32545038, {"Transport": 0.00044238, "Diet": 0.0, "Energy": 1.3248, "Waste": 0.000208})),
+]
+
+# The second person left "flights" empty: it must count as 0
+CSV_WITH_GAP = "km_driven,flights,electricity,meat_meals\n10,1,100,3\n60,,300,7\n"
+FILLED = {"km_driven": [10.0, 60.0], "flights": [1.0, 0.0], "electricity": [100.0, 300.0], "meat_meals": [3.0, 7.0]}
+
+
+@pytest.mark.parametrize("inputs, expected", CARBON_GOLDEN)
+def test_carbon_tracker_matches_golden(inputs, expected):
+    np.testing.assert_allclose(calculate_footprint(*inputs), expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("inputs, expected", DASHBOARD_GOLDEN)
+def test_climate_dashboard_matches_golden(inputs, expected):
+    total, breakdown = expected
+    got_total, got_breakdown = compile_profile("climate_dashboard").breakdown(*inputs)
+    np.testing.assert_allclose(got_total, total, rtol=1e-12, atol=1e-12)
+    assert list(got_breakdown) == list(breakdown)
+    np.testing.assert_allclose(list(got_breakdown.values()), list(breakdown.values()), rtol=1e-12, atol=1e-12)
+
+
+def test_climate_dashboard_batch_matches_single_profile():
+    batch = np.array([inputs for inputs, _ in DASHBOARD_GOLDEN], dtype=np.float64)
+    _, totals = compile_profile("climate_dashboard").evaluate(batch)
+    np.testing.assert_allclose(totals, [total for _, (total, _) in DASHBOARD_GOLDEN], rtol=1e-12, atol=1e-12)
+
+
+def expected_totals():
+    return compute_columns(*(np.array(FILLED[c]) for c in INPUT_COLUMNS))["total_kg"]
+
+
+def test_run_batch_csv_missing_values_count_as_zero(tmp_path):
+    source = tmp_path / "people.csv"
+    source.write_text(CSV_WITH_GAP)
+    output = tmp_path / "footprints.csv"
+
+    rows, _ = run_batch(str(source), str(output))
+
+    result = pd.read_csv(output)
+    assert rows == 2
+    assert result["flights"].tolist() == FILLED["flights"]
+    np.testing.assert_allclose(result["total_kg"], expected_totals())
+
+
+def test_run_batch_parquet_missing_values_count_as_zero(tmp_path):
+    pytest.importorskip("pyarrow")
+    source = tmp_path / "people.parquet"
+    pd.DataFrame({c: pd.array([None if v == 0 and c == "flights" else v for v in FILLED[c]], dtype="Float64")
+                  for c in INPUT_COLUMNS}).to_parquet(source)
+    output = tmp_path / "footprints.parquet"
+
+    rows, _ = run_batch(str(source), str(output), chunk_rows=1)
+
+    result = pd.read_parquet(output)
+    assert rows == 2
+    np.testing.assert_allclose(result["total_kg"], expected_totals())
@@ -0,0 +1,27 @@
+import pytest
+
+from leaderboard import Board
+
+
+@pytest.fixture
+def board():
+    board = Board()
+    for i in range(10):
+        board.add(f"user{i}", 100 - i)   # user0 is rank 1, user9 is rank 10
+    return board
+
+
+def test_around_clamps_at_the_top(board):
+    assert board.around("user0", 2) == [(1, "user0", 100), (2, "user1", 99), (3, "user2", 98)]
+
+
+def test_around_clamps_at_the_bottom(board):
+    assert board.around("user9", 2) == [(8, "user7", 93), (9, "user8", 92), (10, "user9", 91)]
+
+
+def test_around_middle_has_n_on_each_side(board):
+    assert [rank for rank, _, _ in board.around("user5", 2)] == [4, 5, 6, 7, 8]
+
+
+def test_around_unknown_user(board):
+    assert board.around("nobody", 2) == []
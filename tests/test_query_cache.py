@@ -0,0 +1,12 @@
+import pytest
+
+from query_cache import normalize_query
+
+
+@pytest.mark.parametrize("query", ["U.S.A.", "USA", "usa?", "U.S.", "  united   States of America! "])
+def test_normalize_query_resolves_us_aliases(query):
+    assert normalize_query(query) == "united states"
+
+
+def test_normalize_query_resolves_dotted_uk_alias():
+    assert normalize_query("U.K.") == normalize_query("uk") == "united kingdom"
@@ -2,12 +2,14 @@ import os
 import pickle
 import streamlit as st
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.prompts import PromptTemplate
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import WebBaseLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
+
+import corpus_ingest
+import faiss_store
+from answer_cache import SemanticAnswerCache
+from llm_client import LLMUnavailable, get_client
+from llm_stream import write_stream
 
 # =========================
 # 1️⃣ Load API Key from .env or Environment
@@ -35,44 +37,50 @@ language = st.sidebar.selectbox("Preferred Language", ["English", "Hindi", "Span
 # =========================
 # 3️⃣ Load or Initialize FAISS (Cached)
 # =========================
+INDEX_DIR = corpus_ingest.INDEX_DIR   # split, mmap-able index (see faiss_store.py)
+LEGACY_PICKLE = "climate_faiss.pkl"   # old whole-object pickle, migrated on first run
+
 @st.cache_resource
-def init_retriever():
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    if os.path.exists("climate_faiss.pkl"):
-        with open("climate_faiss.pkl", "rb") as f:
-            vectorstore = pickle.load(f)
-    else:
-        urls = [
-            "https://climate.nasa.gov/evidence/",
-            "https://www.ipcc.ch/report/ar6/syr/",
-            "https://www.unep.org/resources/emissions-gap-report-2023"
-        ]
-        docs = []
-        for url in urls:
-            loader = WebBaseLoader(url)
-            docs.extend(loader.load())
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
-        split_docs = text_splitter.split_documents(docs)
-        vectorstore = FAISS.from_documents(split_docs, embeddings)
-        with open("climate_faiss.pkl", "wb") as f:
-            pickle.dump(vectorstore, f)
-    return vectorstore.as_retriever(search_kwargs={"k": 3})
-
-retriever = init_retriever()
-
-# =========================
-# 4️⃣ Initialize Groq LLM (Cached)
+def init_embeddings():
+    return HuggingFaceEmbeddings(model_name=corpus_ingest.EMBEDDING_MODEL)
+
+@st.cache_resource
+def init_vectorstore():
+    embeddings = init_embeddings()
+    if not faiss_store.exists(INDEX_DIR):
+        if os.path.exists(LEGACY_PICKLE):
+            # No manifest is written, so the next corpus_ingest run rebuilds the index in full
+            with open(LEGACY_PICKLE, "rb") as f:
+                faiss_store.save_vectorstore(pickle.load(f), INDEX_DIR)
+        else:
+            # Indexing is never done inside a request; build it offline first
+            st.error("❌ No climate knowledge index found. Build it with "
+                     "`python corpus_ingest.py --default-urls` (or `--source-dir <folder>`).")
+            st.stop()
+    # Memory-mapped load: every worker shares the same page-cached index
+    return faiss_store.load_vectorstore(INDEX_DIR, embeddings)
+
+embeddings = init_embeddings()
+vectorstore = init_vectorstore()
+
+# =========================
+# 3️⃣b Semantic Answer Cache (shared by all sessions)
 # =========================
 @st.cache_resource
-def init_llm():
-    return ChatGroq(
-        api_key=GROQ_API_KEY,
-        model="llama-3.3-70b-versatile",  # ✅ latest 70B model
-        temperature=temperature,
-        max_tokens=512
+def init_answer_cache():
+    return SemanticAnswerCache(
+        "answer_cache.npz",
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "2000")),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_HOURS", "168")) * 3600,
     )
 
-llm = init_llm()
+answer_cache = init_answer_cache()
+
+# =========================
+# 4️⃣ Shared Groq Client (pooled, retries + circuit breaker)
+# =========================
+llm = get_client()  # GROQ_BASE_URL can point at fake_llm_server.py for local testing
 
 # =========================
 # 5️⃣ Prompt Template
@@ -103,26 +111,56 @@ if st.button("🔎 Get Answer"):
     if not user_prompt.strip():
         st.warning("Please enter a question first.")
     else:
-        with st.spinner("Fetching info and generating AI response (may take time for 70B model)..."):
-            try:
-                # Retrieve relevant docs
-                docs = retriever.invoke(user_prompt)
-                context = "\n\n".join([d.page_content for d in docs])
-
-                # Format prompt
-                final_prompt = prompt.format(
-                    age_group=age_group,
-                    language=language,
-                    context=context,
-                    question=user_prompt
-                )
-
-                # Get AI response
-                response = llm.invoke(final_prompt)
+        try:
+            with st.spinner("Fetching relevant climate knowledge..."):
+                # Embed once: the same vector serves the cache lookup and retrieval
+                query_vector = embeddings.embed_query(user_prompt)
+                cached = answer_cache.lookup(query_vector, age_group, language)
+                if cached is None:
+                    # Retrieve relevant docs
+                    docs = vectorstore.similarity_search_by_vector(query_vector, k=3)
+                    context = "\n\n".join([d.page_content for d in docs])
+
+                    # Format prompt
+                    final_prompt = prompt.format(
+                        age_group=age_group,
+                        language=language,
+                        context=context,
+                        question=user_prompt
+                    )
+
+            if cached is not None:
+                st.success("✅ AI Response (from cache):")
+                st.write(cached)
+            else:
+                # Stream the AI response as it is generated
                 st.success("✅ AI Response:")
-                st.write(response.content)
-            except Exception as e:
-                st.error(f"Error: {e}")
+                tokens = llm.stream_chat(
+                    model="llama-3.3-70b-versatile",  # ✅ latest 70B model
+                    messages=[{"role": "user", "content": final_prompt}],
+                    temperature=temperature,
+                    max_tokens=512
+                )
+                answer = write_stream(tokens, page="tutor")
+                answer_cache.store(query_vector, age_group, language, user_prompt, answer)
+        except LLMUnavailable as e:
+            st.warning(e.user_message())
+        except Exception as e:
+            st.error(f"Error: {e}")
+
+with st.sidebar.expander("📦 Answer cache"):
+    cache_stats = answer_cache.stats()
+    st.write(f"Entries: {cache_stats['entries']}")
+    st.write(f"Hits / misses: {cache_stats['hits']} / {cache_stats['misses']} "
+             f"({cache_stats['hit_rate']:.0%} hit rate)")
+    st.write(f"Avg lookup: {cache_stats['avg_lookup_ms']:.2f} ms")
+
+with st.sidebar.expander("📈 LLM latency"):
+    for model, m in llm.metrics().items():
+        st.write(f"**{model}** · circuit {m['breaker']}")
+        st.write(f"{m['latency']['count']} calls · p50 ≤ {m['latency']['p50_s']}s · "
+                 f"p95 ≤ {m['latency']['p95_s']}s · first token p50 ≤ {m['ttft']['p50_s']}s")
+        st.bar_chart({"calls": m["latency"]["buckets"]})
 
 # =========================
 # 7️⃣ Suggested Questions
@@ -0,0 +1,260 @@
+# weather_client.py
+"""Cached, coalesced OpenWeatherMap client for the Climate Hub.
+
+    client = WeatherClient(api_key, disk_path="weather_cache.db")
+    weather = client.current("Delhi")     # dict, see _summarize()
+
+Lookups go through two tiers before the network:
+
+1. an in-process SWRCache keyed on the normalized city, so concurrent
+   requests for the same city share one upstream call and a stale reading
+   is refreshed in the background
+2. an optional SQLite (WAL) table shared by every worker process on the
+   machine, read before and written after each upstream call
+
+If the upstream call fails or is rate limited (429), the newest reading from
+either tier is served as long as it is within the stale window. After a 429
+no request is sent until its Retry-After has passed. All HTTP goes through one pooled
+requests.Session with connect/read timeouts and retries on 5xx. Point
+OPENWEATHER_BASE_URL at fake_weather_server.py to run without a key.
+"""
+
+import asyncio
+import email.utils
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from swr_cache import SWRCache
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5"
+RATE_LIMIT_BACKOFF = 60.0   # seconds to hold off after a 429 without Retry-After
+
+
+class WeatherError(Exception):
+    """Upstream refused the request (unknown city, bad key), is rate limiting us or is unreachable."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def transient(self):
+        """Unreachable, 5xx or rate limited: a stale reading is a fine answer."""
+        return self.status is None or self.status == 429
+
+
+def normalize_city(city):
+    """Cache key: case-folded, single-spaced city name."""
+    return re.sub(r"\s+", " ", city.casefold()).strip(" ,.")
+
+
+def _summarize(resp):
+    """The fields the pages show, plus when they were fetched."""
+    return {
+        "name": resp["name"],
+        "country": resp.get("sys", {}).get("country", ""),
+        "temp": resp["main"]["temp"],
+        "humidity": resp["main"].get("humidity"),
+        "wind_speed": resp.get("wind", {}).get("speed"),
+        "description": resp["weather"][0]["description"],
+        "fetched_at": time.time(),
+    }
+
+
+class _DiskTier:
+    """Readings shared across processes in a SQLite table."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS weather (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT payload FROM weather WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, weather):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO weather (key, payload, fetched_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(weather), weather["fetched_at"]))
+
+
+class WeatherClient:
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, ttl=600, stale_ttl=3600,
+                 disk_path=None, timeout=(3.05, 10), pool_size=32, max_entries=5000, units="metric"):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.units = units
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size,
+            # A 429 is not slept on here (Retry-After can be minutes): _fetch() backs off and serves stale
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                              allowed_methods=["GET"], raise_on_status=False, respect_retry_after_header=False),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Memory ages count from the reading's own fetch time, so a value
+        # taken from the disk tier is not treated as newer than it is
+        self.cache = SWRCache(ttl, stale_ttl, max_entries, stored_at=lambda w: w["fetched_at"])
+        self.disk = _DiskTier(disk_path) if disk_path else None
+        self.upstream_calls = 0
+        self.disk_hits = 0
+        self.rate_limited = 0
+        self._blocked_until = 0.0   # monotonic time before which a 429 says not to call upstream
+
+    def current(self, city):
+        """Current weather for `city` as a dict; raises WeatherError if nothing usable exists."""
+        key = normalize_city(city)
+        if not key:
+            raise WeatherError("Please enter a city name.")
+        return self.cache.get(key, lambda: self._load(key))
+
+    def age(self, weather):
+        return time.time() - weather["fetched_at"]
+
+    def _load(self, key):
+        cached = self.disk.get(key) if self.disk else None
+        if cached is not None and self.age(cached) < self.ttl:
+            self.disk_hits += 1
+            return cached
+        try:
+            weather = self._fetch(key)
+        except WeatherError as e:
+            if e.transient and cached is not None and self.age(cached) < self.ttl + self.stale_ttl:
+                return cached  # upstream down or throttling: a stale shared reading beats an error
+            raise
+        if self.disk:
+            self.disk.put(key, weather)
+        return weather
+
+    def _fetch(self, city):
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            raise WeatherError("Weather service is rate limiting requests", status=429, retry_after=wait)
+        self.upstream_calls += 1
+        try:
+            resp = self.session.get(f"{self.base_url}/weather",
+                                    params={"q": city, "appid": self.api_key, "units": self.units},
+                                    timeout=self.timeout)
+        except requests.RequestException as e:
+            raise WeatherError(f"Weather service unreachable: {e}") from e
+        if resp.status_code >= 500:
+            raise WeatherError(f"Weather service error {resp.status_code}")
+        if resp.status_code == 429:
+            self._throttled(resp)
+        try:
+            body = resp.json()
+        except ValueError as e:
+            raise WeatherError("Weather service sent an unreadable response") from e
+        if str(body.get("cod")) == "429":
+            self._throttled(resp)
+        if str(body.get("cod")) != "200":
+            # 4xx: the request itself is wrong, so no stale fallback
+            raise WeatherError(body.get("message", "Unknown error"), status=resp.status_code)
+        return _summarize(body)
+
+    def _throttled(self, resp):
+        wait = _retry_after(resp.headers.get("Retry-After"))
+        self._blocked_until = max(self._blocked_until, time.monotonic() + wait)
+        self.rate_limited += 1
+        raise WeatherError("Weather service is rate limiting requests", status=429, retry_after=wait)
+
+    def stats(self):
+        return dict(self.cache.stats, upstream_calls=self.upstream_calls, disk_hits=self.disk_hits,
+                    rate_limited=self.rate_limited)
+
+    def close(self):
+        self.session.close()
+
+
+async def compare_cities(client, cities, concurrency=16):
+    """Fetch many cities at once; yields (city, weather or None, error or None, seconds) as each finishes.
+
+    Each lookup runs through the normal cache path on a thread pool of its own
+    with `concurrency` workers (the loop's default executor is shared and may
+    be smaller), so 50 cities cost about one round-trip per `concurrency`
+    cities rather than 50 in a row. `seconds` is timed inside the worker, so
+    it is the lookup itself, not time spent waiting for a free worker.
+    """
+    loop = asyncio.get_running_loop()
+
+    def one(city):
+        t0 = time.perf_counter()
+        try:
+            return city, client.current(city), None, time.perf_counter() - t0
+        except WeatherError as e:
+            return city, None, e, time.perf_counter() - t0
+
+    pool = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="weather-compare")
+    try:
+        for next_done in asyncio.as_completed([loop.run_in_executor(pool, one, c) for c in cities]):
+            yield await next_done
+    finally:
+        # Abandoned part-way: drop lookups that have not started instead of blocking the loop
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), RATE_LIMIT_BACKOFF if absent."""
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    return RATE_LIMIT_BACKOFF
+
+
+def parse_city_list(text, limit=100):
+    """Distinct cities from comma/newline separated text, first spelling wins."""
+    cities, seen = [], set()
+    for city in re.split(r"[,\n;]+", text):
+        key = normalize_city(city)
+        if key and key not in seen:
+            seen.add(key)
+            cities.append(city.strip())
+    return cities[:limit]
+
+
+def from_env():
+    """A WeatherClient configured from OPENWEATHER_* / WEATHER_* environment variables."""
+    return WeatherClient(
+        os.getenv("OPENWEATHER_API_KEY"),
+        base_url=os.getenv("OPENWEATHER_BASE_URL", DEFAULT_BASE_URL),
+        ttl=float(os.getenv("WEATHER_TTL_SECONDS", "600")),
+        stale_ttl=float(os.getenv("WEATHER_STALE_SECONDS", "3600")),
+        disk_path=os.getenv("WEATHER_DISK_CACHE", "weather_cache.db") or None,
+        timeout=(3.05, float(os.getenv("WEATHER_TIMEOUT_SECONDS", "10"))),
+    )